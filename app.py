@@ -1,7 +1,36 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, g, Response, make_response, message_flashed
+from markupsafe import Markup
 import mysql.connector
 from functools import wraps
 import datetime
+import os
+import random
+import threading
+import time
+
+import click
+
+from db import ConnectionPool, PoolTimeout
+from routing import ReplicaRouter
+from booking import BookingError, reserve_seats
+from cache import LRUCache, TTLCache
+from jobs import Scheduler
+from seatmap import SeatMapCache
+from events import SeatEventHub, format_sse, stream
+from holds import HoldSweeper
+from payments import OUTCOMES, PaymentWorker, enqueue_payment
+from cancellations import CancellationError, cancel_shows, find_shows
+from archive import ARCHIVE_AFTER_DAYS, archive_shows, compact_tables, table_sizes
+from exports import EXPORTS, FORMATS, ExportError, open_export, stream_export
+from scheduling import ScheduleError, date_range, schedule_shows
+from metrics import QueryMetrics
+from rollups import check_rollups, rebuild_rollups, refresh_rollups
+from search import KINDS as SEARCH_KINDS, SearchIndex
+from pagination import PageError, decode_cursor, fetch_page, jsonable, page_size
+import audit
+import statements
+import bench
+import seed
 
 app = Flask(__name__)
 app.secret_key = 'movie_booking_secret_key_2024'
@@ -13,13 +42,322 @@ db_config = {
     'database': 'MovieBookingSystem'
 }
 
+# Connection pool settings. Keep pool_size well under MySQL's max_connections
+# multiplied by the number of worker processes.
+pool_config = {
+    'pool_size': 10,
+    'wait_timeout': 5,        # seconds a request waits for a free connection
+    'recycle_seconds': 1800,  # reopen connections older than this
+    'ping_interval': 30       # ping connections idle for longer than this
+}
+
+db_pool = ConnectionPool(db_config, **pool_config)
+
+# Read replicas for the read-only routes, e.g. [{**db_config, 'host': '10.0.0.12'}].
+# With none configured every request uses db_pool. Set allow_standalone
+# to use a plain second MySQL server (not replicating) as a stand-in.
+replica_configs = []
+db_router = ReplicaRouter(db_pool, [ConnectionPool(c, **pool_config) for c in replica_configs],
+                          max_lag_seconds=2.0, check_interval=1.0, allow_standalone=False)
+
+# After a write, the user's reads stay on the primary this long, so e.g.
+# My Bookings shows a booking that a replica may not have yet
+READ_YOUR_WRITES_SECONDS = db_router.max_lag_seconds + db_router.check_interval
+
+# Every statement run through the pool is timed per request and per
+# normalized statement (see /metrics); anything slower than
+# slow_query_seconds goes to slow_query_log.
+query_metrics = QueryMetrics(slow_query_seconds=0.2, slow_log_path='slow_queries.log',
+                             n_plus_one_threshold=5)
+db_pool.add_listener(query_metrics.listener)
+for replica_pool in db_router.replicas:
+    replica_pool.add_listener(query_metrics.listener)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    query_metrics.begin(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def finish_request_metrics(response):
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    summary = query_metrics.end(response.status_code, elapsed)
+    if summary:
+        response.headers.add('Server-Timing',
+                             f'db;dur={summary["db_seconds"] * 1000:.1f};desc="{summary["queries"]} queries"')
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+    return response
+
+def read_only(view):
+    # Marks a route whose GET requests may be served from a read replica
+    view.read_only = True
+    return view
+
+def is_read_only_request():
+    view = app.view_functions.get(request.endpoint)
+    return getattr(view, 'read_only', False) and request.method in ('GET', 'HEAD')
+
+def request_pool():
+    if is_read_only_request() and session.get('read_primary_until', 0) < time.time():
+        return db_router.read_pool()
+    return db_pool
+
 def get_db_connection():
+    # One pooled connection per request, handed back in close_db_connection()
+    if 'db_conn' not in g:
+        pool = request_pool()
+        try:
+            try:
+                g.db_conn = pool.acquire()
+            except (mysql.connector.Error, PoolTimeout) as err:
+                if pool is db_pool:
+                    raise
+                print(f"Replica connection error, using the primary: {err}")
+                pool = db_pool
+                g.db_conn = pool.acquire()
+            g.db_conn_pool = pool
+        except (mysql.connector.Error, PoolTimeout) as err:
+            print(f"Database connection error: {err}")
+            g.db_failed = True
+            return None
+    return g.db_conn
+
+@app.after_request
+def stick_to_primary(response):
+    # Read-your-writes: a request that may have written on the primary keeps
+    # this user's reads there until the replicas have caught up
+    if (db_router.replicas and 'db_conn' in g and not is_read_only_request()
+            and 'user_id' in session):
+        session['read_primary_until'] = time.time() + READ_YOUR_WRITES_SECONDS
+    return response
+
+@app.teardown_appcontext
+def close_db_connection(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        g.pop('db_conn_pool', db_pool).release(conn)
+
+# Home page data (featured movies, upcoming shows, site stats). The write
+# routes that change any of it call home_cache.invalidate('home').
+home_cache = TTLCache(ttl=300)
+
+# Seat occupancy bitmaps per show, revalidated against SHOWS.Seat_Version
+seat_maps = SeatMapCache(revalidate_after=1.0)
+
+# Rendered catalog fragments (movie grid, shows of a movie, home page, seat
+# grid), keyed by what they show so a new version simply misses
+fragment_cache = LRUCache(max_bytes=32 * 1024 * 1024)
+
+# Upcoming show counts per movie for a search's city/date filter, so
+# typeahead keystrokes don't each group every upcoming show
+search_show_counts = LRUCache(max_bytes=4 * 1024 * 1024, ttl=30)
+
+# CATALOG_VERSION (migration 012) is bumped by triggers on MOVIE and SHOWS;
+# each process re-reads it at most once a second
+catalog_versions = TTLCache(ttl=1)
+
+CATALOG_VERSION_SQL = "SELECT Version, UNIX_TIMESTAMP(Updated_At) FROM CATALOG_VERSION WHERE Name = 'catalog'"
+
+def catalog_version_value(row):
+    return (row[0], float(row[1])) if row else (0, 0.0)
+
+def load_catalog_version():
+    conn = get_db_connection()
+    if not conn:
+        raise mysql.connector.Error("Database connection failed!")
+    cursor = conn.cursor()
     try:
-        # Use buffered=True for safety when fetching multiple result sets or executing multiple statements
-        return mysql.connector.connect(**db_config)
-    except mysql.connector.Error as err:
-        print(f"Database connection error: {err}")
+        cursor.execute(CATALOG_VERSION_SQL)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return catalog_version_value(row)
+
+def catalog_changed():
+    # Admin writes to movies or shows call this, so this process drops the
+    # home data and picks up the new catalog version straight away
+    home_cache.invalidate('home')
+    catalog_versions.invalidate('catalog')
+    search_show_counts.clear()
+
+def fragment_key(name, *key):
+    # Catalog pages add the catalog version and time bucket from @catalog_page
+    return (name, g.get('catalog_key')) + key
+
+def cached_fragment(name, render, *key):
+    # ``render()`` returns the fragment's HTML (or a tuple of strings); it
+    # only runs on a miss, so the queries behind it are skipped too
+    return fragment_cache.get_or_set(fragment_key(name, *key), render)
+
+@message_flashed.connect_via(app)
+def note_flash(sender, message, category):
+    g.flashed = True
+
+def catalog_validators(max_age, version, updated_at):
+    # (etag, last_modified, not_modified) for a catalog page at ``version``
+    bucket = int(time.time() // max_age)
+    g.catalog_key = (version, bucket)
+    etag = f"catalog-{version}-{bucket}-{session.get('user_id', 0)}"
+    last_modified = datetime.datetime.fromtimestamp(int(max(updated_at, bucket * max_age)),
+                                                    datetime.timezone.utc)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(request.if_modified_since) and request.if_modified_since >= last_modified
+    return etag, last_modified, not_modified
+
+def cacheable_catalog_response(response):
+    return response.status_code == 200 and not g.get('flashed') and not g.get('db_failed')
+
+def set_catalog_headers(response, max_age, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    if 'user_id' in session:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    response.vary.add('Cookie')
+    return response
+
+def catalog_page(max_age):
+    # HTTP caching for catalog pages. The ETag combines the catalog version,
+    # a max_age time bucket (seat counts change without a version bump) and
+    # the user, so a matching If-None-Match gets a 304 without touching the
+    # listing queries. Anonymous pages may be stored by shared caches.
+    # asgi.py does the same for its async variants.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            try:
+                version, updated_at = catalog_versions.get_or_set('catalog', load_catalog_version)
+            except mysql.connector.Error:
+                return view(*args, **kwargs)
+            etag, last_modified, not_modified = catalog_validators(max_age, version, updated_at)
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if not cacheable_catalog_response(response):
+                    return response
+            return set_catalog_headers(response, max_age, etag, last_modified)
+        return wrapper
+    return decorator
+
+def load_seat_event(show_id, since):
+    # Builds one live-update event per seat change, shared by every listener
+    with db_pool.connection() as conn:
+        seat_maps.expire(show_id)
+        seat_map = seat_maps.get(conn, show_id)
+    if seat_map is None:
         return None
+    return seat_event(seat_map, since)
+
+def seat_event(seat_map, since):
+    changed = seat_map.changes_since(since) if since is not None else None
+    if changed is None:
+        return {'version': seat_map.version, 'full': True, 'booked': seat_map.booked_seats()}
+    return {'version': seat_map.version, 'full': False,
+            'changes': [[seat_map.seat_number(i), int(seat_map.is_booked(i))] for i in changed]}
+
+def poll_seat_versions(show_ids):
+    # Notices seat changes made by other worker processes
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            placeholders = ','.join(['%s'] * len(show_ids))
+            cursor.execute(f"SELECT Show_ID, Seat_Version FROM SHOWS WHERE Show_ID IN ({placeholders})",
+                           show_ids)
+            return dict(cursor.fetchall())
+        finally:
+            cursor.close()
+
+seat_events = SeatEventHub(load_seat_event, poll_seat_versions, poll_interval=0.5)
+
+# Unpaid bookings hold their seats for this long before the sweeper frees them
+HOLD_SECONDS = 10 * 60
+
+def seats_released(show_ids):
+    for show_id in show_ids:
+        seat_maps.expire(show_id)
+        seat_events.publish(show_id)
+
+hold_sweeper = HoldSweeper(db_pool, on_release=seats_released)
+
+# Applies queued payment outcomes in batches (see payments.py); /pay only
+# records the outcome and wakes it up
+payment_worker = PaymentWorker(db_pool, on_release=seats_released)
+
+scheduler = Scheduler()
+
+@scheduler.job('refresh_show_dates', interval=3600, run_at_start=True)
+def refresh_show_dates():
+    # Keeps the demo data bookable: once most shows are in the past, move
+    # every show to a random day in the coming week. This used to run inside
+    # the / route on every page view.
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT SUM(Show_Date < CURDATE()) as outdated_count, COUNT(*) as total_shows
+                FROM SHOWS
+                WHERE NOT Is_Archived
+            """)
+            result = cursor.fetchone()
+            if result['total_shows'] and result['outdated_count'] > result['total_shows'] * 0.5:
+                print("Auto-refreshing show dates...")
+                # Archived shows have no seat rows left to book
+                cursor.execute("""
+                    UPDATE SHOWS SET Show_Date = DATE_ADD(CURDATE(), INTERVAL FLOOR(RAND() * 7) DAY)
+                    WHERE NOT Is_Archived
+                """)
+                conn.commit()
+                catalog_changed()
+                # Every booking moved to another show date group
+                if rebuild_rollups(conn) is None:
+                    print("Booking rollups are busy; run `flask --app app rollup-refresh --rebuild`")
+        finally:
+            cursor.close()
+
+# Movie, theatre and city search (see search.py). Built at startup and
+# rebuilt whenever CATALOG_VERSION has moved; add_movie indexes its movie
+# straight away in this process.
+catalog_search = SearchIndex()
+search_load_lock = threading.Lock()
+
+@scheduler.job('refresh_search_index', interval=300, run_at_start=True)
+def refresh_search_index():
+    with search_load_lock:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(CATALOG_VERSION_SQL)
+                version = catalog_version_value(cursor.fetchone())[0]
+            finally:
+                cursor.close()
+            if version != catalog_search.version:
+                started = time.perf_counter()
+                catalog_search.load(conn, version)
+                print(f"Search index: {len(catalog_search)} documents in "
+                      f"{time.perf_counter() - started:.2f}s")
+
+# Revenue/booking rollups read by the admin dashboard and /queries. The
+# BOOKING triggers queue the groups that changed; this applies them.
+@scheduler.job('refresh_booking_rollups', interval=30)
+def refresh_booking_rollups():
+    with db_pool.connection() as conn:
+        return refresh_rollups(conn)
+
+@scheduler.job('archive_past_shows', interval=24 * 3600)
+def archive_past_shows():
+    # Compact the seat rows of finished shows (see archive.py)
+    with db_pool.connection() as conn:
+        result = archive_shows(conn)
+    if result['shows_archived']:
+        print(f"Archived {result['shows_archived']} past shows, deleted "
+              f"{result['seat_rows_deleted']} seat rows in {result['elapsed_ms']} ms")
+    return result
 
 def login_required(f):
     @wraps(f)
@@ -47,28 +385,15 @@ def admin_required(f):
 
 # --- CORE ROUTES (Index, Movies, Shows, Bookings) - UNCHANGED ---
 
-@app.route('/')
-def index():
+def load_home_data():
+    # Runs only when the home-page cache is cold. Raises mysql.connector.Error
+    # so a failed load is never cached.
     conn = get_db_connection()
     if not conn:
-        return "Database connection failed! Check your MySQL credentials."
-    
+        raise mysql.connector.Error("Database connection failed! Check your MySQL credentials.")
+
     cursor = conn.cursor(dictionary=True)
-    
     try:
-        # SOLUTION 4: Auto-refresh show dates if most are outdated
-        cursor.execute("SELECT COUNT(*) as outdated_count FROM SHOWS WHERE Show_Date < CURDATE()")
-        result = cursor.fetchone()
-        
-        cursor.execute("SELECT COUNT(*) as total_shows FROM SHOWS")
-        total_shows = cursor.fetchone()['total_shows']
-        
-        if total_shows > 0 and result['outdated_count'] > total_shows * 0.5: 
-            print("Auto-refreshing show dates...")
-            cursor.execute("UPDATE SHOWS SET Show_Date = DATE_ADD(CURDATE(), INTERVAL FLOOR(RAND() * 7) DAY)")
-            conn.commit()
-            flash('Show dates have been automatically updated for better availability!', 'info')
-
         # Get featured movies
         cursor.execute("SELECT * FROM MOVIE ORDER BY Rating DESC LIMIT 3")
         featured_movies = cursor.fetchall()
@@ -80,111 +405,395 @@ def index():
             JOIN MOVIE m ON s.Movie_ID = m.Movie_ID
             JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
             JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
-            WHERE s.Show_Date >= CURDATE()
+            WHERE s.Show_Date >= CURDATE() AND NOT s.Is_Cancelled
             ORDER BY s.Show_Date, s.Show_Time
             LIMIT 6
         """)
         upcoming_shows = cursor.fetchall()
         
-        # Get stats
-        cursor.execute("SELECT COUNT(*) as count FROM MOVIE")
-        movie_count = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM THEATRE")
-        theatre_count = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM USERS")
-        user_count = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM BOOKING")
-        booking_count = cursor.fetchone()['count']
-        
-        stats = {
-            'movie_count': movie_count,
-            'theatre_count': theatre_count,
-            'user_count': user_count,
-            'booking_count': booking_count
-        }
-        
+        # Get stats in one round trip. COUNT(*) reads a whole index, which
+        # is fine here because the result is cached.
+        cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM MOVIE) as movie_count,
+                   (SELECT COUNT(*) FROM THEATRE) as theatre_count,
+                   (SELECT COUNT(*) FROM USERS) as user_count,
+                   (SELECT COUNT(*) FROM BOOKING) as booking_count
+            /* audit: full scan ok */
+        """)
+        stats = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    return {'featured_movies': featured_movies,
+            'upcoming_shows': upcoming_shows,
+            'stats': stats}
+
+@app.route('/')
+@catalog_page(max_age=60)
+def index():
+    def render():
+        home = home_cache.get_or_set('home', load_home_data)
+        return render_template('_home_content.html',
+                               featured_movies=home['featured_movies'],
+                               upcoming_shows=home['upcoming_shows'],
+                               stats=home['stats'])
+    try:
+        home_content = Markup(cached_fragment('home', render))
     except mysql.connector.Error as err:
         flash(f'Database error: {err}', 'error')
-        featured_movies = []
-        upcoming_shows = []
-        stats = {}
+        home_content = Markup(render_template('_home_content.html', featured_movies=[],
+                                              upcoming_shows=[], stats={}))
+    
+    return render_template('home.html', home_content=home_content)
+
+# --- LISTINGS (keyset pagination, see pagination.py) ---
+# Each listing has a stable sort key ending in the primary key. A page
+# carries the key of its last row as an opaque ?after= cursor, so page N
+# costs the same as page 1. Filters are plain equality on indexed columns.
+
+MOVIE_ORDER = [('m.Title', 'ASC'), ('m.Movie_ID', 'ASC')]
+SHOW_ORDER = [('s.Show_Date', 'ASC'), ('s.Show_Time', 'ASC'), ('s.Show_ID', 'ASC')]
+BOOKING_ORDER = [('Show_Date', 'DESC'), ('Booking_ID', 'DESC')]
+
+@app.template_global()
+def page_url(after=None):
+    # Same listing and filters, another page (no cursor = first page)
+    args = request.args.to_dict()
+    args.pop('after', None)
+    if after:
+        args['after'] = after
+    return url_for(request.endpoint, **request.view_args, **args)
+
+def listing_filters(*names):
+    return {name: request.args[name] for name in names if request.args.get(name)}
+
+def show_filter_sql(filters):
+    # Conditions on an aliased SHOWS s / SCREEN sc / THEATRE t / MOVIE m join
+    where, params = ['s.Show_Date >= CURDATE()', 'NOT s.Is_Cancelled'], []
+    if 'date' in filters:
+        where.append('s.Show_Date = %s')
+        params.append(filters['date'])
+    if 'city' in filters:
+        where.append('t.City = %s')
+        params.append(filters['city'])
+    if 'movie_id' in filters:
+        where.append('s.Movie_ID = %s')
+        params.append(filters['movie_id'])
+    for name, column in (('language', 'm.Language'), ('genre', 'm.Genre')):
+        if name in filters:
+            where.append(f'{column} = %s')
+            params.append(filters[name])
+    return where, params
+
+MOVIE_LIST_SQL = """
+    SELECT m.Movie_ID, m.Title, m.Language, m.Genre, m.Duration, m.Rating, m.Image_URL
+    FROM MOVIE m
+"""
+
+def movie_filter_sql(filters):
+    where, params = [], []
+    for name, column in (('language', 'm.Language'), ('genre', 'm.Genre')):
+        if name in filters:
+            where.append(f'{column} = %s')
+            params.append(filters[name])
+    if 'city' in filters or 'date' in filters:
+        # Movies with an upcoming show matching city/date; per movie this is
+        # a range on idx_shows_movie_date
+        show_where, show_params = show_filter_sql({k: v for k, v in filters.items()
+                                                   if k in ('city', 'date')})
+        where.append(f"""EXISTS (SELECT 1 FROM SHOWS s
+                                 JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+                                 JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+                                 WHERE s.Movie_ID = m.Movie_ID AND {' AND '.join(show_where)})""")
+        params.extend(show_params)
+    return where, params
+
+def list_movies(conn, filters, after=None, limit=20):
+    where, params = movie_filter_sql(filters)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return fetch_page(cursor, MOVIE_LIST_SQL, where, params, MOVIE_ORDER, after, limit)
+    finally:
+        cursor.close()
+
+def list_shows(conn, filters, after=None, limit=20):
+    where, params = show_filter_sql(filters)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return fetch_page(cursor, """
+            SELECT s.Show_ID, s.Movie_ID, m.Title, m.Language, m.Genre, t.Name as Theatre, t.City,
+                   s.Show_Date, s.Show_Time, s.Price, s.Available_Seats
+            FROM SHOWS s
+            JOIN MOVIE m ON s.Movie_ID = m.Movie_ID
+            JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+            JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+        """, where, params, SHOW_ORDER, after, limit)
+    finally:
+        cursor.close()
+
+def list_bookings(conn, user_id, after=None, limit=20):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # Using the view we created; User_ID hits the BOOKING.User_ID index
+        return fetch_page(cursor, """
+            SELECT Booking_ID, Movie_Title, Show_Date, Show_Time, Theatre_Name, Seats_Booked, Seat_Numbers,
+                   Total_Amount, Payment_Mode, Payment_State, Booking_Status
+            FROM VIEW_BookingSummary
+        """, ['User_ID = %s'], [user_id], BOOKING_ORDER, after, limit)
     finally:
         cursor.close()
-        conn.close()
-    
-    return render_template('home.html', 
-                           featured_movies=featured_movies, 
-                           upcoming_shows=upcoming_shows,
-                           stats=stats)
+
+FILTER_OPTION_SQL = (
+    ('cities', "SELECT DISTINCT City FROM THEATRE WHERE City IS NOT NULL ORDER BY City"),
+    ('languages', "SELECT DISTINCT Language FROM MOVIE WHERE Language IS NOT NULL ORDER BY Language"),
+    ('genres', "SELECT DISTINCT Genre FROM MOVIE WHERE Genre IS NOT NULL ORDER BY Genre"),
+)
+NO_FILTER_OPTIONS = {'cities': [], 'languages': [], 'genres': []}
+
+def filter_options():
+    # Dropdown values for the listing filters; loose index scans, cached
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise mysql.connector.Error("Database connection failed!")
+        cursor = conn.cursor()
+        try:
+            options = {}
+            for name, sql in FILTER_OPTION_SQL:
+                cursor.execute(sql)
+                options[name] = [row[0] for row in cursor.fetchall()]
+            return options
+        finally:
+            cursor.close()
+    try:
+        return home_cache.get_or_set('filter_options', load)
+    except mysql.connector.Error:
+        return NO_FILTER_OPTIONS
+
+def api_listing(loader, order, *args):
+    # JSON variant of a listing: {"items": [...], "next": cursor or null}
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 503
+    try:
+        after = decode_cursor(request.args.get('after'), len(order))
+        rows, next_cursor = loader(conn, *args, after=after, limit=page_size(request.args.get('limit')))
+    except PageError as err:
+        return jsonify({'error': str(err)}), 400
+    except mysql.connector.Error as err:
+        return jsonify({'error': str(err)}), 500
+    return jsonify({'items': jsonable(rows), 'next': next_cursor})
 
 @app.route('/movies')
+@read_only
+@catalog_page(max_age=60)
 def movies():
     conn = get_db_connection()
     if not conn:
         return "Database connection failed!"
     
-    cursor = conn.cursor(dictionary=True)
+    filters = listing_filters('city', 'language', 'genre', 'date')
     
+    def render():
+        after = decode_cursor(request.args.get('after'), len(MOVIE_ORDER))
+        movies, next_cursor = list_movies(conn, filters, after, page_size(request.args.get('limit')))
+        return render_template('_movie_grid.html', movies=movies, next_cursor=next_cursor)
     try:
-        cursor.execute("SELECT * FROM MOVIE ORDER BY Title")
-        movies = cursor.fetchall()
-    except mysql.connector.Error as err:
+        movie_grid = cached_fragment('movies', render, request.full_path)
+    except (PageError, mysql.connector.Error) as err:
         flash(f'Error loading movies: {err}', 'error')
-        movies = []
+        movie_grid = None
+    
+    return movies_page(filters, movie_grid, filter_options())
+
+def movies_page(filters, movie_grid, options):
+    if movie_grid is None:
+        movie_grid = render_template('_movie_grid.html', movies=[], next_cursor=None)
+    return render_template('movies.html', movie_grid=Markup(movie_grid),
+                           filters=filters, options=options)
+
+@app.route('/shows')
+@read_only
+def shows():
+    conn = get_db_connection()
+    if not conn:
+        return "Database connection failed!"
+
+    filters = listing_filters('city', 'language', 'genre', 'date', 'movie_id')
+    try:
+        after = decode_cursor(request.args.get('after'), len(SHOW_ORDER))
+        shows, next_cursor = list_shows(conn, filters, after, page_size(request.args.get('limit')))
+    except (PageError, mysql.connector.Error) as err:
+        flash(f'Error loading shows: {err}', 'error')
+        shows, next_cursor = [], None
+
+    return render_template('show_list.html', shows=shows, next_cursor=next_cursor,
+                           filters=filters, options=filter_options())
+
+@app.route('/api/movies')
+@read_only
+def api_movies():
+    return api_listing(list_movies, MOVIE_ORDER, listing_filters('city', 'language', 'genre', 'date'))
+
+@app.route('/api/shows')
+@read_only
+def api_shows():
+    return api_listing(list_shows, SHOW_ORDER,
+                       listing_filters('city', 'language', 'genre', 'date', 'movie_id'))
+
+@app.route('/api/my_bookings')
+@read_only
+@login_required
+def api_my_bookings():
+    return api_listing(list_bookings, BOOKING_ORDER, session['user_id'])
+
+# Typeahead search over movie titles, genres and languages, theatres and
+# cities, from the in-memory index:
+#   ?q=dark kni             every word may be a prefix
+#   ?type=movie,theatre     kinds of results (default all)
+#   ?genre= &language=      only movies with that genre/language
+#   ?city= &date=           theatres in the city; movies with an upcoming
+#                           show there/then (joined to SHOWS)
+#   ?upcoming=1             only movies with any upcoming show
+# "total" and the facet counts (genre, language, city) cover every match,
+# unless "total_exact" is false: a very short prefix is only ranked over
+# its first search.MAX_CANDIDATES matches, and they are lower bounds then.
+SEARCH_MAX_LIMIT = 50
+
+def upcoming_show_counts(conn, movie_ids, filters):
+    # Upcoming shows per movie, for ``movie_ids`` or (None) every movie
+    where, params = show_filter_sql({k: v for k, v in filters.items() if k in ('city', 'date')})
+    if movie_ids is not None:
+        where.append(f"s.Movie_ID IN ({','.join(['%s'] * len(movie_ids))})")
+        params.extend(movie_ids)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT s.Movie_ID, COUNT(*)
+            FROM SHOWS s
+            JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+            JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+            WHERE {' AND '.join(where)}
+            GROUP BY s.Movie_ID
+        """, params)
+        return dict(cursor.fetchall())
     finally:
         cursor.close()
-        conn.close()
-    
-    return render_template('movies.html', movies=movies)
+
+def search_result(doc, upcoming):
+    if doc.kind == 'movie':
+        return {'type': 'movie', 'id': doc.key, 'name': doc.name, 'genre': doc.fields['genre'],
+                'language': doc.fields['language'], 'rating': doc.fields['rating'],
+                'upcoming_shows': upcoming.get(doc.key, 0),
+                'url': url_for('shows_by_movie', movie_id=doc.key)}
+    if doc.kind == 'theatre':
+        return {'type': 'theatre', 'id': doc.key, 'name': doc.name, 'city': doc.fields['city'],
+                'location': doc.fields['location'], 'url': url_for('shows', city=doc.fields['city'])}
+    return {'type': 'city', 'name': doc.name, 'url': url_for('shows', city=doc.name)}
+
+@app.route('/api/search')
+@read_only
+def api_search():
+    query = request.args.get('q', '')
+    kinds = tuple(kind for kind in request.args.get('type', '').split(',') if kind in SEARCH_KINDS) or SEARCH_KINDS
+    limit = max(1, min(request.args.get('limit', 10, type=int), SEARCH_MAX_LIMIT))
+    filters = listing_filters('city', 'language', 'genre', 'date')
+    show_filter = 'city' in filters or 'date' in filters or request.args.get('upcoming') == '1'
+
+    if not catalog_search.built:
+        try:
+            refresh_search_index()
+        except (mysql.connector.Error, PoolTimeout) as err:
+            return jsonify({'error': f'Search is not available yet: {err}'}), 503
+
+    upcoming = {}
+    if show_filter:
+        # Every movie with a matching show, so the index filters on it
+        # before ranking and the totals and facets stay right
+        def load():
+            conn = get_db_connection()
+            if not conn:
+                raise mysql.connector.Error("Database connection failed!")
+            return upcoming_show_counts(conn, None, filters)
+        try:
+            upcoming = search_show_counts.get_or_set((filters.get('city'), filters.get('date')), load)
+        except mysql.connector.Error as err:
+            return jsonify({'error': str(err)}), 503
+
+    def where(doc):
+        for name in ('genre', 'language'):
+            if name in filters and doc.fields.get(name) != filters[name]:
+                return False
+        if 'city' in filters and doc.kind != 'movie' and doc.fields.get('city') != filters['city']:
+            return False
+        if show_filter and doc.kind == 'movie' and not upcoming.get(doc.key):
+            return False
+        return True
+
+    hits, total, facets, complete = catalog_search.search(query, kinds, limit, where,
+                                                          facets=('genre', 'language', 'city'))
+    movie_ids = [doc.key for doc in hits if doc.kind == 'movie']
+    if movie_ids and not show_filter:
+        conn = get_db_connection()
+        try:
+            if not conn:
+                raise mysql.connector.Error("Database connection failed!")
+            upcoming = upcoming_show_counts(conn, movie_ids, filters)
+        except mysql.connector.Error as err:
+            print(f"Upcoming show counts failed: {err}")
+
+    return jsonify({'query': query, 'total': total, 'total_exact': complete, 'facets': facets,
+                    'results': [search_result(doc, upcoming) for doc in hits]})
 
 @app.route('/movie/<int:movie_id>/shows')
+@read_only
+@catalog_page(max_age=15)
 def shows_by_movie(movie_id):
     conn = get_db_connection()
     if not conn:
         return "Database connection failed!"
     
-    cursor = conn.cursor(dictionary=True)
+    def render():
+        movie = statements.fetchone(conn, MOVIE_DETAIL_STATEMENT, (movie_id,), dictionary=True)
+        shows = statements.fetchall(conn, MOVIE_SHOWS_STATEMENT, (movie_id,), dictionary=True)
+        return render_movie_shows(movie, shows)
     
     try:
-        # Get movie details
-        cursor.execute("SELECT * FROM MOVIE WHERE Movie_ID = %s", (movie_id,))
-        movie = cursor.fetchone()
-        
-        # Get shows for this movie
-        cursor.execute("""
-            SELECT s.Show_ID, t.Name as Theatre_Name, sc.Screen_Number, 
-                    s.Show_Date, s.Show_Time, s.Price,
-                    sc.Total_Seats - IFNULL((
-                        SELECT SUM(b.Seats_Booked) 
-                        FROM BOOKING b 
-                        WHERE b.Show_ID = s.Show_ID AND b.Status != 'Cancelled'
-                    ), 0) as Available_Seats
-            FROM SHOWS s
-            JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
-            JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
-            WHERE s.Movie_ID = %s AND s.Show_Date >= CURDATE()
-            ORDER BY s.Show_Date, s.Show_Time
-        """, (movie_id,))
-        shows = cursor.fetchall()
-        
+        title, movie_shows = cached_fragment('movie_shows', render, movie_id)
     except mysql.connector.Error as err:
         flash(f'Error loading shows: {err}', 'error')
-        movie = None
-        shows = []
-    finally:
-        cursor.close()
-        conn.close()
-    
-    if not movie:
+        return redirect(url_for('movies'))
+    except LookupError:
         flash('Movie not found!', 'error')
         return redirect(url_for('movies'))
     
-    return render_template('shows.html', movie=movie, shows=shows)
+    return render_template('shows.html', title=title, movie_shows=Markup(movie_shows))
+
+MOVIE_DETAIL_SQL = "SELECT * FROM MOVIE WHERE Movie_ID = %s"
+
+MOVIE_SHOWS_SQL = """
+    SELECT s.Show_ID, t.Name as Theatre_Name, sc.Screen_Number, 
+            s.Show_Date, s.Show_Time, s.Price, s.Available_Seats
+    FROM SHOWS s
+    JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+    JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+    WHERE s.Movie_ID = %s AND s.Show_Date >= CURDATE() AND NOT s.Is_Cancelled
+    ORDER BY s.Show_Date, s.Show_Time
+"""
+
+# Prepared once per pooled connection (see statements.py); asgi.py sends
+# the same SQL through aiomysql
+MOVIE_DETAIL_STATEMENT = statements.declare('movie_detail', MOVIE_DETAIL_SQL)
+MOVIE_SHOWS_STATEMENT = statements.declare('movie_shows', MOVIE_SHOWS_SQL)
+
+def render_movie_shows(movie, shows):
+    # (title, html) of a movie's upcoming shows; LookupError if no such movie
+    if not movie:
+        raise LookupError
+    return movie['Title'], render_template('_movie_shows.html', movie=movie, shows=shows)
 
 @app.route('/book/<int:show_id>', methods=['GET', 'POST'])
+@read_only
 @login_required
 def book_ticket(show_id):
     conn = get_db_connection()
@@ -203,75 +812,22 @@ def book_ticket(show_id):
             return redirect(url_for('book_ticket', show_id=show_id))
         
         try:
-            # Check if seats are still available
-            placeholders = ','.join(['%s'] * len(selected_seats))
-            cursor.execute(f"""
-                SELECT Seat_Number FROM SEAT_RESERVATION 
-                WHERE Show_ID = %s AND Seat_Number IN ({placeholders}) AND Is_Booked = TRUE
-            """, [show_id] + selected_seats)
-            
-            booked_seats = cursor.fetchall()
-            if booked_seats:
-                flash(f'Some seats are already booked: {[s["Seat_Number"] for s in booked_seats]}', 'error')
-                return redirect(url_for('book_ticket', show_id=show_id))
-            
-            # Calculate total amount
-            cursor.execute("SELECT Price FROM SHOWS WHERE Show_ID = %s", (show_id,))
-            show_result = cursor.fetchone()
-            if not show_result:
-                flash('Show not found!', 'error')
-                return redirect(url_for('book_ticket', show_id=show_id))
-            
-            show_price = show_result['Price']
-            total_amount = show_price * len(selected_seats)
-            
-            # Get next booking ID
-            cursor.execute("SELECT IFNULL(MAX(Booking_ID), 300) + 1 as next_id FROM BOOKING")
-            booking_result = cursor.fetchone()
-            booking_id = booking_result['next_id']
-            
-            # Create booking with seat numbers
-            try:
-                cursor.execute("""
-                    INSERT INTO BOOKING (Booking_ID, Show_ID, User_ID, Seats_Booked, Booking_Date, Total_Amount, Status, Seat_Numbers)
-                    VALUES (%s, %s, %s, %s, CURDATE(), %s, 'Pending', %s)
-                """, (booking_id, show_id, session['user_id'], len(selected_seats), total_amount, ','.join(selected_seats)))
-            except mysql.connector.Error:
-                # Fallback if Seat_Numbers column is missing (though it should exist based on DDL)
-                cursor.execute("""
-                    INSERT INTO BOOKING (Booking_ID, Show_ID, User_ID, Seats_Booked, Booking_Date, Total_Amount, Status)
-                    VALUES (%s, %s, %s, %s, CURDATE(), %s, 'Pending')
-                """, (booking_id, show_id, session['user_id'], len(selected_seats), total_amount))
-            
-            # Mark seats as booked
-            for seat in selected_seats:
-                cursor.execute("""
-                    UPDATE SEAT_RESERVATION 
-                    SET Is_Booked = TRUE, Booking_ID = %s 
-                    WHERE Show_ID = %s AND Seat_Number = %s
-                """, (booking_id, show_id, seat))
-            
-            # Get next payment ID
-            cursor.execute("SELECT IFNULL(MAX(Payment_ID), 400) + 1 as next_payment_id FROM PAYMENT")
-            payment_result = cursor.fetchone()
-            payment_id = payment_result['next_payment_id']
-            
-            cursor.execute("""
-                INSERT INTO PAYMENT (Payment_ID, Booking_ID, Amount, Payment_Mode, Payment_State)
-                VALUES (%s, %s, %s, %s, 'Pending')
-            """, (payment_id, booking_id, total_amount, payment_mode))
-            
-            conn.commit()
-            flash(f'Successfully booked seats: {", ".join(selected_seats)}! Payment is Pending.', 'success')
+            booking_id = reserve_seats(conn, show_id, session['user_id'], selected_seats, payment_mode,
+                                       hold_seconds=HOLD_SECONDS)
+            hold_sweeper.track(booking_id, HOLD_SECONDS)
+            home_cache.invalidate('home')
+            seat_maps.expire(show_id)
+            seat_events.publish(show_id)
+            flash(f'Seats {", ".join(selected_seats)} are held for {HOLD_SECONDS // 60} minutes. '
+                  f'Complete the payment from My Bookings to confirm them.', 'success')
             return redirect(url_for('my_bookings'))
-            
+        except BookingError as err:
+            flash(str(err), 'error')
         except mysql.connector.Error as err:
             flash(f'Booking failed: {err}', 'error')
-            conn.rollback()
             print(f"Booking error: {err}")
         finally:
             cursor.close()
-            conn.close()
         return redirect(url_for('book_ticket', show_id=show_id))
     
     # GET REQUEST
@@ -290,111 +846,144 @@ def book_ticket(show_id):
         if not show:
             flash('Show not found!', 'error')
             return redirect(url_for('movies'))
+        if show['Is_Cancelled']:
+            flash('This show has been cancelled.', 'error')
+            return redirect(url_for('shows_by_movie', movie_id=show['Movie_ID']))
+        if show['Is_Archived']:
+            # Its seat rows were archived; don't recreate them below
+            flash('This show is over.', 'error')
+            return redirect(url_for('shows_by_movie', movie_id=show['Movie_ID']))
         
-        # Get seat layout
-        cursor.execute("SELECT Seat_Number, Is_Booked FROM SEAT_RESERVATION WHERE Show_ID = %s ORDER BY Seat_Number", (show_id,))
-        seats = cursor.fetchall()
-        
-        print(f"Seats found for show {show_id}: {len(seats)}")
+        # Get seat layout (cached bitmap, see seatmap.py)
+        seat_map = seat_maps.get(conn, show_id)
         
         # AUTO-CREATE SEATS IF NONE EXIST (Fallback for missing InitializeSeatsForShow call)
-        if not seats:
+        if not seat_map or not seat_map.seat_count:
             print(f"Auto-creating {show['Total_Seats']} seats for show {show_id}")
-            total_seats = show['Total_Seats']
-            
-            seat_values = []
-            for i in range(1, total_seats + 1):
-                row = chr(64 + ((i - 1) // 10 + 1))  # A, B, C, etc.
-                seat_num = (i - 1) % 10 + 1
-                seat_number = f"{row}{seat_num}"
-                seat_values.append((show_id, seat_number, False))
-            
-            cursor.executemany(
-                "INSERT IGNORE INTO SEAT_RESERVATION (Show_ID, Seat_Number, Is_Booked) VALUES (%s, %s, %s)",
-                seat_values
-            )
-            conn.commit()
-            
-            # Get the seats again
-            cursor.execute("SELECT Seat_Number, Is_Booked FROM SEAT_RESERVATION WHERE Show_ID = %s ORDER BY Seat_Number", (show_id,))
-            seats = cursor.fetchall()
-            print(f"After auto-creation: {len(seats)} seats")
+            # On the primary: this GET may be reading from a replica
+            with db_pool.connection() as primary:
+                init_cursor = primary.cursor()
+                try:
+                    init_cursor.callproc('InitializeSeatsForShow', (show_id,))
+                    primary.commit()
+                finally:
+                    init_cursor.close()
+                
+                # Get the seats again
+                seat_maps.expire(show_id)
+                seat_map = seat_maps.get(primary, show_id)
+        
+        seat_version = seat_map.version if seat_map else None
+        # The seat grid is the bulk of the page; reuse it until a booking
+        # or cancellation moves the seat map version
+        seat_grid = Markup(cached_fragment(
+            'seat_grid',
+            lambda: render_template('_seat_grid.html', seat_rows=seat_map.seat_rows() if seat_map else []),
+            show_id, seat_version))
         
     except mysql.connector.Error as err:
         flash(f'Error loading show details: {err}', 'error')
         show = None
-        seats = []
+        seat_grid = Markup(render_template('_seat_grid.html', seat_rows=[]))
+        seat_version = None
         print(f"Database error: {err}")
     finally:
         cursor.close()
-        conn.close()
     
-    return render_template('book_ticket.html', show=show, seats=seats)
+    return render_template('book_ticket.html', show=show, seat_grid=seat_grid, seat_version=seat_version)
  
 @app.route('/my_bookings')
+@read_only
 @login_required
 def my_bookings():
     conn = get_db_connection()
     if not conn:
         return "Database connection failed!"
     
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        # Using the view we created
-        cursor.execute("SELECT * FROM VIEW_BookingSummary WHERE User_Name = %s ORDER BY Show_Date DESC", 
-                      (session['user_name'],))
-        bookings = cursor.fetchall()
-    except mysql.connector.Error as err:
+        after = decode_cursor(request.args.get('after'), len(BOOKING_ORDER))
+        bookings, next_cursor = list_bookings(conn, session['user_id'], after,
+                                              page_size(request.args.get('limit')))
+    except (PageError, mysql.connector.Error) as err:
         flash(f'Error loading bookings: {err}', 'error')
-        bookings = []
-    finally:
-        cursor.close()
-        conn.close()
+        bookings, next_cursor = [], None
     
-    return render_template('bookings.html', bookings=bookings)
+    return render_template('bookings.html', bookings=bookings, next_cursor=next_cursor)
 
 @app.route('/cancel_booking/<int:booking_id>')
 @login_required
 def cancel_booking(booking_id):
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True) # Use dictionary=True to access Seat_Numbers easily
+    if not conn:
+        flash('Database connection failed!', 'error')
+        return redirect(url_for('my_bookings'))
+    cursor = conn.cursor()
     
     try:
-        # First, free up the seats
-        cursor.execute("SELECT Show_ID, Seat_Numbers FROM BOOKING WHERE Booking_ID = %s", (booking_id,))
+        cursor.execute("""
+            SELECT b.Show_ID, s.Is_Archived FROM BOOKING b
+            JOIN SHOWS s ON b.Show_ID = s.Show_ID
+            WHERE b.Booking_ID = %s
+        """, (booking_id,))
         booking = cursor.fetchone()
+        if booking and booking[1]:
+            flash('Bookings for past shows can no longer be cancelled.', 'error')
+            return redirect(url_for('my_bookings'))
         
-        if booking and booking['Seat_Numbers']:
-            show_id = booking['Show_ID']
-            seat_numbers = booking['Seat_Numbers'].split(',')
-            
-            # Use executemany for efficiency
-            seat_updates = [(show_id, seat.strip()) for seat in seat_numbers]
-            cursor.executemany("""
-                UPDATE SEAT_RESERVATION 
-                SET Is_Booked = FALSE, Booking_ID = NULL 
-                WHERE Show_ID = %s AND Seat_Number = %s
-            """, seat_updates)
-
-        
-        # Then cancel the booking using the procedure (handles log and payment status)
-        # Note: callproc requires a simple cursor, not dictionary=True, so re-establish or ensure proper handling
-        cursor.close()
-        cursor = conn.cursor()
+        # The procedure frees the seats, returns them to SHOWS.Available_Seats
+        # and marks the booking and payment in one transaction
         cursor.callproc('CancelBooking', (booking_id,))
         
         conn.commit()
+        if booking:
+            seat_maps.expire(booking[0])
+            seat_events.publish(booking[0])
         flash('Booking cancelled successfully! Seats have been freed up.', 'success')
     except mysql.connector.Error as err:
         flash(f'Cancellation failed: {err}', 'error')
         conn.rollback()
     finally:
         cursor.close()
-        conn.close()
     
     return redirect(url_for('my_bookings'))
 
+@app.route('/pay/<int:booking_id>', methods=['POST'])
+@login_required
+def pay_booking(booking_id):
+    conn = get_db_connection()
+    if not conn:
+        flash('Database connection failed!', 'error')
+        return redirect(url_for('my_bookings'))
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT User_ID FROM BOOKING WHERE Booking_ID = %s", (booking_id,))
+        booking = cursor.fetchone()
+        if not booking or booking[0] != session['user_id']:
+            flash('Booking not found!', 'error')
+            return redirect(url_for('my_bookings'))
+        
+        # The worker confirms the booking (or frees the seats for a failed
+        # payment) in its next batch; paying twice only queues it once
+        outcome = request.form.get('outcome', 'Completed')
+        if outcome not in OUTCOMES:
+            flash('Unknown payment outcome!', 'error')
+            return redirect(url_for('my_bookings'))
+        if enqueue_payment(conn, booking_id, outcome):
+            payment_worker.notify()
+            flash('Payment received! Your booking will be confirmed in a moment.', 'success')
+        else:
+            flash('This payment is already being processed.', 'info')
+    except mysql.connector.Error as err:
+        flash(f'Payment failed: {err.msg}', 'error')
+        conn.rollback()
+    finally:
+        cursor.close()
+    
+    return redirect(url_for('my_bookings'))
+
+LOGIN_STATEMENT = statements.declare('login', "SELECT * FROM USERS WHERE Email = %s AND Password = %s")
+
 # Login and Register routes - UNCHANGED
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -403,11 +992,11 @@ def login():
         password = request.form['password']
         
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
+        if not conn:
+            flash('Database connection failed!', 'error')
+            return render_template('login.html')
         try:
-            cursor.execute("SELECT * FROM USERS WHERE Email = %s AND Password = %s", (email, password))
-            user = cursor.fetchone()
+            user = statements.fetchone(conn, LOGIN_STATEMENT, (email, password), dictionary=True)
             
             if user:
                 session['user_id'] = user['User_ID']
@@ -423,9 +1012,6 @@ def login():
                 flash('Invalid credentials!', 'error')
         except mysql.connector.Error as err:
             flash(f'Login error: {err}', 'error')
-        finally:
-            cursor.close()
-            conn.close()
     
     return render_template('login.html')
 
@@ -438,17 +1024,19 @@ def register():
         password = request.form['password']
         
         conn = get_db_connection()
+        if not conn:
+            flash('Database connection failed!', 'error')
+            return render_template('register.html')
         cursor = conn.cursor()
         
         try:
-            cursor.execute("SELECT IFNULL(MAX(User_ID), 0) + 1 FROM USERS")
-            user_id = cursor.fetchone()[0]
-            
+            # User_ID is allocated by AUTO_INCREMENT (migrations/001)
             cursor.execute(
-                "INSERT INTO USERS (User_ID, Name, Email, Phone_No, Password) VALUES (%s, %s, %s, %s, %s)",
-                (user_id, name, email, phone, password)
+                "INSERT INTO USERS (Name, Email, Phone_No, Password) VALUES (%s, %s, %s, %s)",
+                (name, email, phone, password)
             )
             conn.commit()
+            home_cache.invalidate('home')
             
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
@@ -458,7 +1046,6 @@ def register():
             conn.rollback()
         finally:
             cursor.close()
-            conn.close()
     
     return render_template('register.html')
 
@@ -470,6 +1057,7 @@ def logout():
 
 # Queries demonstration page - UNCHANGED
 @app.route('/queries')
+@read_only
 def queries():
     conn = get_db_connection()
     if not conn:
@@ -482,28 +1070,20 @@ def queries():
         cursor.execute("SELECT Title, Rating FROM MOVIE WHERE Rating > (SELECT AVG(Rating) FROM MOVIE)")
         nested_query = cursor.fetchall()
         
-        # Join Query
-        cursor.execute("""
-            SELECT m.Title, t.Name as Theatre, s.Show_Date, s.Show_Time, s.Price
-            FROM SHOWS s
-            JOIN MOVIE m ON s.Movie_ID = m.Movie_ID
-            JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
-            JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
-            WHERE s.Show_Date >= CURDATE()
-        """)
-        join_query = cursor.fetchall()
+        # Join Query: the first page of upcoming shows; /shows pages the rest
+        join_query, _ = list_shows(conn, {})
         
-        # Aggregate Query
+        # Aggregate Query, over the per-theatre rollup (see rollups.py)
+        # rather than every booking
         cursor.execute("""
             SELECT t.Name as Theatre, 
-                    COUNT(b.Booking_ID) as Total_Bookings,
-                    SUM(b.Total_Amount) as Total_Revenue,
-                    AVG(b.Total_Amount) as Average_Booking_Value
-            FROM BOOKING b
-            JOIN SHOWS s ON b.Show_ID = s.Show_ID
-            JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
-            JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+                    SUM(r.Bookings) as Total_Bookings,
+                    SUM(r.Revenue) as Total_Revenue,
+                    SUM(r.Revenue) / SUM(r.Bookings) as Average_Booking_Value
+            FROM THEATRE_BOOKING_TOTALS r
+            JOIN THEATRE t ON r.Theatre_ID = t.Theatre_ID
             GROUP BY t.Theatre_ID, t.Name
+            HAVING SUM(r.Bookings) > 0
         """)
         aggregate_query = cursor.fetchall()
         
@@ -520,7 +1100,6 @@ def queries():
         avg_rating = 0
     finally:
         cursor.close()
-        conn.close()
     
     return render_template('queries.html',
                             nested_query=nested_query,
@@ -528,30 +1107,134 @@ def queries():
                             aggregate_query=aggregate_query,
                             avg_rating=avg_rating)
 
-# API endpoint to check seat availability - UNCHANGED
+# API endpoint to check seat availability
+#   ?format=json    (default) {"seats": [{"Seat_Number": "A1", "Is_Booked": 0}, ...]}
+#   ?format=packed  layout descriptor plus a base64 occupancy bitmap
+#   ?format=binary  the raw bitmap, layout and version in X-Seat-* headers
+#   ?since=N        only the seats that changed after version N (packed form)
+# Responses carry an ETag on the show's Seat_Version, so pollers that send
+# If-None-Match get a 304 until someone books or cancels.
 @app.route('/api/seats/<int:show_id>')
+@read_only
 def get_seats(show_id):
     conn = get_db_connection()
     if not conn:
         return jsonify({'error': 'Database connection failed'})
     
-    cursor = conn.cursor(dictionary=True)
+    fmt = request.args.get('format', 'json')
+    if fmt not in SEAT_FORMATS:
+        return jsonify({'error': 'format must be json, packed or binary'}), 400
     
     try:
-        cursor.execute("""
-            SELECT Seat_Number, Is_Booked 
-            FROM SEAT_RESERVATION 
-            WHERE Show_ID = %s 
-            ORDER BY Seat_Number
-        """, (show_id,))
-        seats = cursor.fetchall()
-        
-        return jsonify({'seats': seats})
+        seat_map = seat_maps.get(conn, show_id)
     except mysql.connector.Error as err:
         return jsonify({'error': str(err)})
-    finally:
-        cursor.close()
-        conn.close()
+    
+    return seats_response(show_id, seat_map, fmt)
+
+SEAT_FORMATS = ('json', 'packed', 'binary')
+
+def seats_response(show_id, seat_map, fmt):
+    if seat_map is None:
+        return jsonify({'error': 'Show not found'}), 404
+    
+    since = request.args.get('since', type=int)
+    etag = f"seats-{show_id}-v{seat_map.version}-{fmt}" + (f"-since{since}" if since is not None else "")
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    elif since is not None and fmt != 'binary':
+        changed = seat_map.changes_since(since)
+        if changed is None:
+            # Too old for the change history: send everything
+            response = jsonify({'version': seat_map.version, 'full': True,
+                                'layout': seat_map.layout(), 'bitmap': seat_map.packed()})
+        else:
+            response = jsonify({'version': seat_map.version, 'full': False,
+                                'changes': [[seat_map.seat_number(i), int(seat_map.is_booked(i))]
+                                            for i in changed]})
+    elif fmt == 'packed':
+        response = jsonify({'version': seat_map.version, 'layout': seat_map.layout(),
+                            'bitmap': seat_map.packed()})
+    elif fmt == 'binary':
+        response = app.response_class(bytes(seat_map.bitmap), mimetype='application/octet-stream')
+        response.headers['X-Seat-Version'] = str(seat_map.version)
+        response.headers['X-Seat-Layout'] = f"{','.join(seat_map.rows)};{seat_map.seats_per_row};{seat_map.seat_count}"
+    else:
+        response = jsonify({'version': seat_map.version, 'seats': seat_map.seat_list()})
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Best block of adjacent free seats for a party, from the cached seat map:
+#   ?n=4              party size
+#   ?alternatives=2   also the next best blocks (at most 5)
+# Like /api/seats the answer carries an ETag on the show's Seat_Version.
+@app.route('/api/seats/<int:show_id>/recommend')
+@read_only
+def recommend_seats(show_id):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 503
+    
+    try:
+        seat_map = seat_maps.get(conn, show_id)
+    except mysql.connector.Error as err:
+        return jsonify({'error': str(err)}), 503
+    
+    return recommendation_response(show_id, seat_map)
+
+MAX_ALTERNATIVES = 5
+
+def recommendation_response(show_id, seat_map):
+    party_size = request.args.get('n', type=int)
+    if not party_size or party_size < 1:
+        return jsonify({'error': 'n must be the number of seats wanted'}), 400
+    alternatives = max(0, min(request.args.get('alternatives', 0, type=int), MAX_ALTERNATIVES))
+    if seat_map is None:
+        return jsonify({'error': 'Show not found'}), 404
+    
+    etag = f"recommend-{show_id}-v{seat_map.version}-{party_size}-{alternatives}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        blocks = [[seat_map.seat_number(i) for i in block]
+                  for block in seat_map.best_seats(party_size, 1 + alternatives)]
+        response = jsonify({'version': seat_map.version, 'party_size': party_size,
+                            'seats': blocks[0] if blocks else None, 'alternatives': blocks[1:]})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Live seat updates as server-sent events. The stream starts with the
+# changes since the client's Last-Event-ID (or ?since=version) and then
+# pushes one "seats" event per booking or cancellation for the show.
+@app.route('/api/seats/<int:show_id>/events')
+def seat_events_stream(show_id):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 503
+    
+    try:
+        seat_map = seat_maps.get(conn, show_id)
+    except mysql.connector.Error as err:
+        return jsonify({'error': str(err)}), 503
+    if seat_map is None:
+        return jsonify({'error': 'Show not found'}), 404
+    
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', type=int)
+    
+    sub = seat_events.subscribe(show_id, seat_map.version)
+    first = None
+    if since != seat_map.version:
+        first = format_sse(seat_event(seat_map, since), event_type='seats', event_id=seat_map.version)
+    
+    # The generator runs after this view returns, so the pooled connection
+    # goes back to the pool now rather than being held for the whole stream
+    return Response(stream(seat_events, sub, first), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # --- NEW ADMIN ROUTES ---
 
@@ -573,8 +1256,11 @@ def admin_dashboard():
         if request.method == 'POST':
             movie_id = request.form.get('movie_id')
             if movie_id and movie_id.isdigit():
-                # Call the Stored Function
-                cursor.execute(f"SELECT CalculateMovieRevenue({movie_id}) as Revenue")
+                # Same figure as CalculateMovieRevenue(), read from the rollup
+                cursor.execute("""
+                    SELECT IFNULL(SUM(Revenue), 0.00) as Revenue FROM MOVIE_BOOKING_TOTALS
+                    WHERE Movie_ID = %s AND Status = 'Confirmed'
+                """, (movie_id,))
                 revenue_result = cursor.fetchone()
                 current_revenue = revenue_result['Revenue'] if revenue_result else 0.00
         
@@ -591,15 +1277,16 @@ def admin_dashboard():
         cursor.execute("SELECT COUNT(*) as count FROM SHOWS")
         stats['total_shows'] = cursor.fetchone()['count']
         
-        cursor.execute("SELECT COUNT(*) as count FROM BOOKING")
-        stats['total_bookings'] = cursor.fetchone()['count']
-        
-        # Use the revenue function for ALL movies (Movie_ID = 0 is a placeholder)
-        # We need a new function for TOTAL revenue from all movies.
-        # Let's use the Booking table for a simpler, accurate stat.
-        cursor.execute("SELECT SUM(Total_Amount) as total FROM BOOKING WHERE Status = 'Confirmed'")
-        total_rev_result = cursor.fetchone()
-        stats['total_revenue'] = total_rev_result['total'] if total_rev_result['total'] else 0.00
+        # Booking count and confirmed revenue from the per-theatre rollup,
+        # at most one rollup refresh (30s) behind the BOOKING table
+        cursor.execute("""
+            SELECT SUM(Bookings) as bookings,
+                   SUM(CASE WHEN Status = 'Confirmed' THEN Revenue ELSE 0 END) as total
+            FROM THEATRE_BOOKING_TOTALS
+        """)
+        totals = cursor.fetchone()
+        stats['total_bookings'] = totals['bookings'] or 0
+        stats['total_revenue'] = totals['total'] if totals['total'] else 0.00
 
     except mysql.connector.Error as err:
         flash(f'Database error during admin operation: {err}', 'error')
@@ -607,7 +1294,6 @@ def admin_dashboard():
         
     finally:
         cursor.close()
-        conn.close()
         
     return render_template('admin.html', 
                            stats=stats, 
@@ -626,6 +1312,9 @@ def add_movie():
     image_url = request.form.get('image_url') # Get the new image_url field
 
     conn = get_db_connection()
+    if not conn:
+        flash('Database connection failed!', 'error')
+        return redirect(url_for('admin_dashboard'))
     cursor = conn.cursor()
     
     try:
@@ -640,13 +1329,17 @@ def add_movie():
         ))
             
         conn.commit()
+        catalog_changed()
+        cursor.execute("SELECT Movie_ID, Title, Genre, Language, Rating FROM MOVIE WHERE Movie_ID = LAST_INSERT_ID()")
+        movie = dict(zip(cursor.column_names, cursor.fetchone() or ()))
+        if movie:
+            catalog_search.add_movie(movie)
         flash(f'Movie "{title}" added successfully!', 'success')
     except mysql.connector.Error as err:
         flash(f'Error adding movie: {err}', 'error')
         conn.rollback()
     finally:
         cursor.close()
-        conn.close()
         
     return redirect(url_for('admin_dashboard'))
 
@@ -661,14 +1354,18 @@ def add_show():
     price = request.form['price']
 
     conn = get_db_connection()
+    if not conn:
+        flash('Database connection failed!', 'error')
+        return redirect(url_for('admin_dashboard'))
     cursor = conn.cursor()
     
     try:
         # 1. Call the stored procedure to add the show
         cursor.callproc('AddShow', (movie_id, screen_id, show_time, show_date, price))
         
-        # 2. Get the new Show_ID that was just created
-        cursor.execute("SELECT MAX(Show_ID) as last_id FROM SHOWS")
+        # 2. Get the new Show_ID that was just created. LAST_INSERT_ID() is
+        #    per connection, so a concurrent add_show cannot hand us its ID.
+        cursor.execute("SELECT LAST_INSERT_ID()")
         new_show_id = cursor.fetchone()[0]
         
         # 3. IMPORTANT: Initialize the seats for this new show
@@ -676,20 +1373,580 @@ def add_show():
             cursor.callproc('InitializeSeatsForShow', (new_show_id,))
             
         conn.commit()
+        catalog_changed()
         flash('New show added and seats initialized!', 'success')
     except mysql.connector.Error as err:
         flash(f'Error adding show: {err}', 'error')
         conn.rollback()
     finally:
         cursor.close()
-        conn.close()
         
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/schedule_shows', methods=['POST'])
+@admin_required
+def schedule_shows_bulk():
+    # Creates every movie x screen x date x time combination in one go.
+    # Accepts the admin form or a JSON body with the same field names
+    # (movie_ids, screen_ids, start_date, end_date, show_times, price).
+    data = request.get_json(silent=True) or request.form
+    wants_json = request.is_json
+    
+    try:
+        if request.is_json:
+            movie_ids = [int(m) for m in data.get('movie_ids', [])]
+            screen_ids = [int(s) for s in data.get('screen_ids', [])]
+            show_times = [str(t) for t in data.get('show_times', [])]
+        else:
+            movie_ids = [int(m) for m in request.form.getlist('movie_ids')]
+            screen_ids = [int(s) for s in data.get('screen_ids', '').replace(' ', '').split(',') if s]
+            show_times = [t.strip() for t in data.get('show_times', '').split(',') if t.strip()]
+        start_date = datetime.date.fromisoformat(data['start_date'])
+        end_date = datetime.date.fromisoformat(data.get('end_date') or data['start_date'])
+        show_times = [datetime.time.fromisoformat(t) for t in show_times]
+        price = float(data['price'])
+        dates = date_range(start_date, end_date)
+    except (KeyError, ValueError, ScheduleError) as err:
+        message = f'Invalid schedule: {err}'
+        if wants_json:
+            return jsonify({'error': message}), 400
+        flash(message, 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    conn = get_db_connection()
+    if not conn:
+        if wants_json:
+            return jsonify({'error': 'Database connection failed'}), 503
+        flash('Database connection failed!', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    try:
+        result = schedule_shows(conn, movie_ids, screen_ids, dates, show_times, price)
+    except (ScheduleError, mysql.connector.Error) as err:
+        if wants_json:
+            return jsonify({'error': str(err)}), 400
+        flash(f'Error scheduling shows: {err}', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    catalog_changed()
+    if wants_json:
+        return jsonify(result)
+    flash(f"Scheduled {result['shows_created']} shows with {result['seats_created']} seats "
+          f"in {result['elapsed_ms']} ms ({result['shows_per_second']} shows/s).", 'success')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/cancel_shows', methods=['POST'])
+@admin_required
+def cancel_shows_bulk():
+    # Cancels every matching show and all of its bookings, e.g. when a
+    # screen goes down. Accepts the admin form or a JSON body with the same
+    # field names (show_ids, screen_id, theatre_id, start_date, end_date, reason).
+    data = request.get_json(silent=True) or request.form
+    wants_json = request.is_json
+    
+    try:
+        if request.is_json:
+            show_ids = [int(s) for s in data.get('show_ids', [])]
+        else:
+            show_ids = [int(s) for s in data.get('show_ids', '').replace(' ', '').split(',') if s]
+        screen_id = int(data['screen_id']) if data.get('screen_id') else None
+        theatre_id = int(data['theatre_id']) if data.get('theatre_id') else None
+        start_date = datetime.date.fromisoformat(data['start_date']) if data.get('start_date') else None
+        end_date = datetime.date.fromisoformat(data['end_date']) if data.get('end_date') else start_date
+        reason = (data.get('reason') or 'Show cancelled').strip()[:255]
+    except ValueError as err:
+        message = f'Invalid cancellation: {err}'
+        if wants_json:
+            return jsonify({'error': message}), 400
+        flash(message, 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    conn = get_db_connection()
+    if not conn:
+        if wants_json:
+            return jsonify({'error': 'Database connection failed'}), 503
+        flash('Database connection failed!', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    try:
+        matched = find_shows(conn, show_ids, screen_id, theatre_id, start_date, end_date)
+        result = cancel_shows(conn, matched, reason)
+    except (CancellationError, mysql.connector.Error) as err:
+        if wants_json:
+            return jsonify({'error': str(err)}), 400
+        flash(f'Error cancelling shows: {err}', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    catalog_changed()
+    seats_released(matched)
+    if wants_json:
+        return jsonify(result)
+    flash(f"Cancelled {result['shows_cancelled']} shows and {result['bookings_cancelled']} bookings "
+          f"(₹{result['refunded_amount']} to refund) in {result['elapsed_ms']} ms "
+          f"({result['bookings_per_second']} bookings/s).", 'success')
+    return redirect(url_for('admin_dashboard'))
+
+# Finance exports, streamed as they are read (see exports.py):
+#   /admin/export/bookings.csv?start=2025-01-01&end=2025-03-31
+#   /admin/export/payments.ndjson?start=...&end=...&gzip=1
+@app.route('/admin/export/<name>.<fmt>')
+@read_only
+@admin_required
+def export_data(name, fmt):
+    compress = request.args.get('gzip') == '1'
+    try:
+        columns, chunks = open_export(request_pool(), name, fmt,
+                                      request.args.get('start'), request.args.get('end'))
+    except ExportError as err:
+        return jsonify({'error': str(err)}), 400
+    except (mysql.connector.Error, PoolTimeout) as err:
+        return jsonify({'error': str(err)}), 503
+    
+    filename = f"{name}_{request.args['start']}_{request.args['end']}.{fmt}" + ('.gz' if compress else '')
+    return Response(stream_export(columns, chunks, fmt, compress),
+                    mimetype='application/gzip' if compress else FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
+
+@app.route('/admin/db_pool')
+@admin_required
+def db_pool_stats():
+    # Pool size, checkout counts and wait times for the connection pools,
+    # plus the replication lag of each replica
+    return jsonify({**db_pool.stats(), 'replicas': db_router.status()})
+
+# Prometheus scrape endpoint: per-route request/DB histograms, per-statement
+# timings, N+1 and slow-query counters, plus pool and cache gauges
+@app.route('/metrics')
+def metrics():
+    gauges = {f'db_pool_{key}': value for key, value in db_pool.stats().items()}
+    gauges.update({
+        'home_cache_hits': home_cache.hits,
+        'home_cache_misses': home_cache.misses,
+        'fragment_cache_hits': fragment_cache.hits,
+        'fragment_cache_misses': fragment_cache.misses,
+        'fragment_cache_evictions': fragment_cache.evictions,
+        'fragment_cache_bytes': fragment_cache.size,
+        'seat_map_cache_shows': len(seat_maps),
+        'seat_map_cache_evictions': seat_maps.evictions,
+        'seat_event_subscribers': seat_events.subscriber_count(),
+        'hold_sweeper_expired_bookings': hold_sweeper.expired_bookings,
+        'payment_worker_processed': payment_worker.processed,
+        'payment_worker_failures': payment_worker.failures,
+        'replica_reads': db_router.replica_reads,
+        'replica_primary_fallbacks': db_router.primary_fallbacks,
+        'search_index_documents': len(catalog_search),
+    })
+    return Response(query_metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
 # --- END NEW ADMIN ROUTES ---
 
+@scheduler.job('reconcile_available_seats', interval=6 * 3600)
+def reconcile_available_seats(chunk_size=500):
+    # Rebuild SHOWS.Available_Seats from SEAT_RESERVATION, one range of
+    # shows per transaction so live bookings are only briefly blocked
+    corrected = 0
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT IFNULL(MIN(Show_ID), 0), IFNULL(MAX(Show_ID), -1) FROM SHOWS")
+            first_id, last_id = cursor.fetchone()
+            for from_id in range(first_id, last_id + 1, chunk_size):
+                cursor.callproc('ReconcileAvailableSeats', (from_id, from_id + chunk_size - 1))
+                for result in cursor.stored_results():
+                    corrected += result.fetchone()[0]
+                conn.commit()
+        finally:
+            cursor.close()
+    if corrected:
+        print(f"Reconciled available seats for {corrected} shows")
+    return corrected
+
+def start_background_jobs():
+    # Run by the process that serves requests: python app.py, or asgi.py
+    # at startup
+    scheduler.start()
+    hold_sweeper.start()
+    payment_worker.start()
+
+# --- COMMAND LINE TOOLS (run with: flask --app app <command>) ---
+
+@app.cli.command('refresh-show-dates')
+def refresh_show_dates_command():
+    """Run the show-date refresh job once (for cron-driven deployments)."""
+    refresh_show_dates()
+
+@app.cli.command('rollup-refresh')
+@click.option('--rebuild', is_flag=True, help='Recompute everything instead of applying pending changes.')
+def rollup_refresh_command(rebuild):
+    """Bring the booking/revenue rollups up to date."""
+    with db_pool.connection() as conn:
+        if rebuild:
+            if rebuild_rollups(conn) is None:
+                raise click.ClickException("Another process is refreshing the rollups; try again")
+            click.echo("Rebuilt booking rollups")
+        else:
+            applied = refresh_rollups(conn)
+            click.echo("Another process is refreshing the rollups" if applied is None
+                       else f"Applied {applied} booking changes")
+
+@app.cli.command('rollup-check')
+def rollup_check_command():
+    """Compare the rollups with the raw BOOKING table."""
+    with db_pool.connection() as conn:
+        mismatches = check_rollups(conn)
+    for line in mismatches:
+        click.echo(line)
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rollup rows disagree with BOOKING; '
+                                   'run `flask --app app rollup-refresh --rebuild`')
+    click.echo("Rollups match the raw tables")
+
+@app.cli.command('sweep-holds')
+def sweep_holds_command():
+    """Release every expired seat hold now."""
+    freed = hold_sweeper.sweep()
+    click.echo(f"Expired {hold_sweeper.expired_bookings} bookings, freed {sum(freed.values())} seats")
+
+@app.cli.command('process-payments')
+def process_payments_command():
+    """Apply every queued payment outcome now."""
+    freed = payment_worker.drain()
+    click.echo(f"Processed {payment_worker.processed} payments, "
+               f"{payment_worker.failures} failed, freed {sum(freed.values())} seats")
+
+@app.cli.command('cancel-shows')
+@click.option('--show-ids', default='', help='Comma-separated show IDs.')
+@click.option('--screen-id', type=int)
+@click.option('--theatre-id', type=int)
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--reason', default='Show cancelled', show_default=True)
+@click.option('--chunk-size', default=500, show_default=True, help='Bookings per transaction.')
+def cancel_shows_command(show_ids, screen_id, theatre_id, start_date, end_date, reason, chunk_size):
+    """Cancel matching shows and every booking for them."""
+    show_ids = [int(s) for s in show_ids.replace(' ', '').split(',') if s]
+    start_date = start_date.date() if start_date else None
+    end_date = end_date.date() if end_date else start_date
+
+    def progress(result):
+        click.echo(f"  {result['bookings_cancelled']} bookings cancelled, "
+                   f"{result['seats_freed']} seats freed ({result['bookings_per_second']} bookings/s)")
+
+    with db_pool.connection() as conn:
+        try:
+            matched = find_shows(conn, show_ids, screen_id, theatre_id, start_date, end_date)
+        except CancellationError as err:
+            raise click.ClickException(str(err))
+        if not matched:
+            click.echo("No shows match")
+            return
+        click.echo(f"Cancelling {len(matched)} shows...")
+        result = cancel_shows(conn, matched, reason, chunk_size, progress)
+    catalog_changed()
+    seats_released(matched)
+    click.echo(f"Cancelled {result['shows_cancelled']} shows and {result['bookings_cancelled']} bookings, "
+               f"freed {result['seats_freed']} seats, {result['refunded_amount']} to refund "
+               f"in {result['elapsed_ms']} ms")
+
+@app.cli.command('archive-shows')
+@click.option('--days', default=ARCHIVE_AFTER_DAYS, show_default=True, help='Archive shows this many days old.')
+@click.option('--batch-size', default=50, show_default=True, help='Shows per transaction.')
+@click.option('--compact', is_flag=True, help='Then rebuild SEAT_RESERVATION to free its disk space.')
+def archive_shows_command(days, batch_size, compact):
+    """Compact the seat rows of finished shows into SEAT_ARCHIVE."""
+    def progress(result):
+        click.echo(f"  {result['shows_archived']} shows archived, {result['seat_rows_deleted']} seat rows deleted")
+
+    with db_pool.connection() as conn:
+        result = archive_shows(conn, days, batch_size, progress=progress)
+        if compact:
+            click.echo("Rebuilding SEAT_RESERVATION...")
+            compact_tables(conn)
+        sizes = table_sizes(conn)
+    click.echo(f"Archived {result['shows_archived']} shows and {result['bookings_archived']} bookings' seats "
+               f"in {result['elapsed_ms']} ms")
+    for table, size in sizes.items():
+        click.echo(f"{table:<18} {size['rows']:>12} rows {(size['data_bytes'] + size['index_bytes']) / 1024 / 1024:>10.1f} MB")
+
+@app.cli.command('replica-status')
+def replica_status_command():
+    """Show each read replica's lag and whether reads would use it."""
+    if not db_router.replicas:
+        click.echo("No replicas configured; every read uses the primary")
+        return
+    for replica in db_router.status():
+        lag = replica['lag_seconds']
+        usable = lag is not None and lag <= db_router.max_lag_seconds
+        click.echo(f"replica {replica['replica']} ({replica['host']}): "
+                   f"lag {'unknown' if lag is None else f'{lag:.0f}s'} -> "
+                   f"{'serving reads' if usable else 'skipped, reads fall back to the primary'}")
+
+@app.cli.command('export')
+@click.argument('name', type=click.Choice(sorted(EXPORTS)))
+@click.option('--start', required=True, help='First date (YYYY-MM-DD).')
+@click.option('--end', required=True, help='Last date (YYYY-MM-DD).')
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', default='-', help='File to write (default: stdout).')
+def export_command(name, start, end, fmt, compress, output):
+    """Stream a bookings or payments export for a date range."""
+    try:
+        columns, chunks = open_export(db_router.read_pool(), name, fmt, start, end)
+    except ExportError as err:
+        raise click.BadParameter(str(err))
+    stats = {}
+    started = time.perf_counter()
+    with click.open_file(output, 'wb') as f:
+        for chunk in stream_export(columns, chunks, fmt, compress, stats):
+            f.write(chunk)
+    elapsed = time.perf_counter() - started
+    click.echo(f"Exported {stats['rows']} rows in {elapsed:.1f}s", err=True)
+
+@app.cli.command('reconcile-seats')
+def reconcile_seats_command():
+    """Rebuild SHOWS.Available_Seats from SEAT_RESERVATION."""
+    click.echo(f"Corrected {reconcile_available_seats()} shows")
+
+@app.cli.command('explain-audit')
+@click.option('--min-rows', type=int, default=1000, help='Smallest table scan worth reporting.')
+def explain_audit_command(min_rows):
+    """EXPLAIN every query the read paths run and fail on hot full scans.
+
+    Run it against a database seeded with realistic volumes; on a handful
+    of rows MySQL prefers table scans and the plans mean nothing.
+    """
+    with db_pool.connection() as conn:
+        ids = audit.sample_ids(conn)
+    home_cache.clear()
+    fragment_cache.clear()
+    seat_maps.invalidate(ids['show_id'])
+
+    user = ids['user_id']
+    # (label, method, path, form, logged-in user, hot). The POSTs are built
+    # to stop before writing: a seat that does not exist, a booking that
+    # does not exist and a wrong password.
+    routes = [
+        ('home', 'GET', '/', None, None, True),
+        ('movies', 'GET', '/movies', None, None, True),
+        ('movies by genre', 'GET', '/api/movies?genre=Action', None, None, True),
+        ('shows', 'GET', '/shows', None, None, True),
+        ('shows by city', 'GET', '/api/shows?city=Bangalore', None, None, True),
+        ('shows_by_movie', 'GET', f"/movie/{ids['movie_id']}/shows", None, None, True),
+        ('book_ticket', 'GET', f"/book/{ids['show_id']}", None, user, True),
+        ('book_ticket POST', 'POST', f"/book/{ids['show_id']}",
+         {'seats': 'ZZ999', 'payment_mode': 'UPI'}, user, True),
+        ('seats api', 'GET', f"/api/seats/{ids['show_id']}", None, None, True),
+        ('my_bookings', 'GET', '/my_bookings', None, user, True),
+        ('pay_booking', 'POST', '/pay/0', None, user, True),
+        ('login', 'POST', '/login', {'email': ids['email'], 'password': ''}, None, True),
+        ('queries', 'GET', '/queries', None, None, False),
+        ('admin', 'GET', '/admin', None, 1, False),
+    ]
+    report, failures = audit.explain_audit(app, db_pool, routes, min_rows=min_rows)
+    for line in report:
+        click.echo(line)
+    if failures:
+        raise click.ClickException(f'{failures} hot queries do full scans')
+
+@app.cli.command('seed-data')
+@click.option('--scale', type=click.Choice(list(seed.SCALES)), default='small', help='Dataset size preset.')
+@click.option('--seed', 'seed_value', type=int, default=42, help='Random seed; same seed, same data.')
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Shows are spread 30 days either side of this date (default today).')
+def seed_data_command(scale, seed_value, start_date):
+    """Load a deterministic synthetic dataset for benchmarking."""
+    with db_pool.connection() as conn:
+        seed.generate(conn, scale=scale, seed=seed_value,
+                      start_date=start_date.date() if start_date else None, log=click.echo)
+        if rebuild_rollups(conn) is None:
+            click.echo("Rollups are busy; run `flask --app app rollup-refresh --rebuild`")
+    home_cache.clear()
+
+@app.cli.command('load-bench')
+@click.option('--requests', 'requests_per_route', type=int, default=200, help='Timed requests per route.')
+@click.option('--concurrency', type=int, default=8, help='Concurrent clients per route.')
+@click.option('--output', default='benchmarks/baseline.json', help='Where to write the results.')
+@click.option('--compare', default=None, help='Baseline to check p95/p99 against.')
+@click.option('--tolerance', type=float, default=0.2, help='Allowed p95/p99 growth over --compare.')
+def load_bench_command(requests_per_route, concurrency, output, compare, tolerance):
+    """Time every page route and record p50/p95/p99 to a baseline file."""
+    rng = random.Random(42)
+    with db_pool.connection() as conn:
+        targets = bench.sample_targets(conn, rng)
+    movie_ids, show_ids, user_ids = targets['movie_ids'], targets['show_ids'], targets['user_ids']
+
+    # (name, rng -> (path, logged-in user))
+    routes = [
+        ('index', lambda r: ('/', None)),
+        ('movies', lambda r: ('/movies', None)),
+        ('shows', lambda r: ('/shows', None)),
+        ('shows_by_movie', lambda r: (f"/movie/{r.choice(movie_ids)}/shows", None)),
+        ('book_ticket', lambda r: (f"/book/{r.choice(show_ids)}", r.choice(user_ids))),
+        ('seats_api', lambda r: (f"/api/seats/{r.choice(show_ids)}", None)),
+        ('my_bookings', lambda r: ('/my_bookings', r.choice(user_ids))),
+        ('queries', lambda r: ('/queries', None)),
+        ('admin_dashboard', lambda r: ('/admin', 1)),
+    ]
+    results = bench.load_benchmark(app, routes, requests_per_route=requests_per_route,
+                                   concurrency=concurrency)
+    for name, result in results.items():
+        click.echo(f"{name:<16} p50={result['latency_ms_p50']:>9}ms p95={result['latency_ms_p95']:>9}ms "
+                   f"p99={result['latency_ms_p99']:>9}ms {result['requests_per_second']:>8} req/s "
+                   f"errors={result['errors']}")
+
+    regressions = bench.compare_baseline(compare, results, tolerance) if compare else []
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    bench.write_baseline(output, results, {'requests_per_route': requests_per_route,
+                                           'concurrency': concurrency,
+                                           'pool_size': pool_config['pool_size']})
+    click.echo(f"Wrote {output}")
+    if regressions:
+        raise click.ClickException('Latency regressions:\n  ' + '\n  '.join(regressions))
+
+@app.cli.command('serve-bench')
+@click.option('--wsgi-url', default='http://127.0.0.1:5000', help='The sync (WSGI) deployment.')
+@click.option('--asgi-url', default='http://127.0.0.1:8000', help='The async (ASGI) deployment.')
+@click.option('--concurrency', default='10,100,500', help='Comma-separated client counts.')
+@click.option('--requests', 'requests_per_level', type=int, default=2000, help='Requests per route and level.')
+@click.option('--slow-clients', type=int, default=0, help='Half-sent requests held open throughout.')
+@click.option('--output', default='benchmarks/asgi_vs_wsgi.json', help='Where to write the results.')
+def serve_bench_command(wsgi_url, asgi_url, concurrency, requests_per_level, slow_clients, output):
+    """Compare the WSGI and ASGI deployments on the async routes over HTTP."""
+    levels = [int(level) for level in concurrency.split(',')]
+    rng = random.Random(42)
+    with db_pool.connection() as conn:
+        targets = bench.sample_targets(conn, rng)
+    routes = [
+        ('seats_api', [f"/api/seats/{rng.choice(targets['show_ids'])}" for _ in range(200)]),
+        ('movies', ['/movies']),
+        ('shows_by_movie', [f"/movie/{rng.choice(targets['movie_ids'])}/shows" for _ in range(200)]),
+    ]
+    results = {name: {} for name, _ in routes}
+    for deployment, url in (('wsgi', wsgi_url), ('asgi', asgi_url)):
+        deployment_results, opened = bench.http_benchmark(url, routes, levels, requests_per_level,
+                                                          slow_clients)
+        if opened < slow_clients:
+            click.echo(f"{deployment}: only {opened} of {slow_clients} slow clients could connect")
+        for name, by_level in deployment_results.items():
+            results[name][deployment] = by_level
+            for level, result in by_level.items():
+                click.echo(f"{deployment} {name:<15} c={level:<5} p50={result['latency_ms_p50']:>9}ms "
+                           f"p95={result['latency_ms_p95']:>9}ms p99={result['latency_ms_p99']:>9}ms "
+                           f"{result['requests_per_second']:>8} req/s errors={result['errors']}")
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    bench.write_baseline(output, results, {'concurrency': levels, 'requests_per_level': requests_per_level,
+                                           'slow_clients': slow_clients, 'wsgi_url': wsgi_url,
+                                           'asgi_url': asgi_url})
+    click.echo(f"Wrote {output}")
+
+@app.cli.command('sse-bench')
+@click.option('--subscribers', type=int, default=5000, help='Idle listeners to fan out to.')
+@click.option('--rounds', type=int, default=20, help='Seat changes to publish.')
+@click.option('--shows', type=int, default=1, help='Shows the listeners are spread over.')
+def sse_bench_command(subscribers, rounds, shows):
+    """Measure live seat update fan-out latency (no database needed)."""
+    for key, value in bench.sse_fanout(subscribers, rounds=rounds, shows=shows).items():
+        click.echo(f"{key}: {value}")
+
+@app.cli.command('recommend-bench')
+@click.option('--rows', type=int, default=10, help='Rows per screen.')
+@click.option('--seats-per-row', type=int, default=20, help='Seats per row.')
+@click.option('--queries', type=int, default=2000, help='Recommendations per fill level.')
+def recommend_bench_command(rows, seats_per_row, queries):
+    """Time best-adjacent-seat recommendations on fragmented seat maps (no database needed)."""
+    for fill, result in bench.seat_recommendation(rows, seats_per_row, queries=queries).items():
+        click.echo(f"fill={fill:<5} " + ' '.join(f"{key}={value}" for key, value in result.items()))
+
+@app.cli.command('search-bench')
+@click.option('--titles', type=int, default=100000, help='Synthetic movies to index.')
+@click.option('--theatres', type=int, default=2000, help='Synthetic theatres to index.')
+@click.option('--queries', type=int, default=5000, help='Typeahead queries to time.')
+def search_bench_command(titles, theatres, queries):
+    """Measure search index memory and typeahead latency (no database needed)."""
+    for key, value in bench.search_index(titles, theatres, queries).items():
+        click.echo(f"{key}: {value}")
+
+@app.cli.command('export-bench')
+@click.option('--name', type=click.Choice(sorted(EXPORTS)), default='bookings')
+@click.option('--start', required=True, help='First date (YYYY-MM-DD).')
+@click.option('--end', required=True, help='Last date (YYYY-MM-DD).')
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--compare-buffered', is_flag=True, help='Also time fetchall() into memory.')
+def export_bench_command(name, start, end, fmt, compress, compare_buffered):
+    """Measure export rows per second and peak memory."""
+    try:
+        results = bench.export_throughput(db_pool, name, start, end, fmt, compress, compare_buffered)
+    except ExportError as err:
+        raise click.BadParameter(str(err))
+    for mode, result in results.items():
+        click.echo(f"{mode:<10} " + ' '.join(f"{key}={value}" for key, value in result.items()))
+
+@app.cli.command('archive-bench')
+@click.option('--days', default=ARCHIVE_AFTER_DAYS, show_default=True, help='Archive shows this many days old.')
+@click.option('--batch-size', default=50, show_default=True, help='Shows per transaction.')
+@click.option('--no-compact', is_flag=True, help="Don't rebuild SEAT_RESERVATION after archiving.")
+@click.option('--output', default='benchmarks/archive.json', show_default=True)
+def archive_bench_command(days, batch_size, no_compact, output):
+    """Archive past shows and compare table sizes and query latency before and after."""
+    try:
+        results = bench.archive_benchmark(db_pool, days, batch_size, compact=not no_compact)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    for table in results['before']['tables']:
+        before, after = results['before']['tables'][table], results['after']['tables'][table]
+        click.echo(f"{table:<18} rows {before['rows']:>10} -> {after['rows']:<10} "
+                   f"MB {(before['data_bytes'] + before['index_bytes']) / 1024 / 1024:>8.1f} -> "
+                   f"{(after['data_bytes'] + after['index_bytes']) / 1024 / 1024:.1f}")
+    for name in results['before']['latency']:
+        before, after = results['before']['latency'][name], results['after']['latency'][name]
+        click.echo(f"{name:<18} p50 {before['p50_ms']:>7} -> {after['p50_ms']:<7} ms  "
+                   f"p95 {before['p95_ms']:>7} -> {after['p95_ms']} ms")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    bench.write_baseline(output, results, {'days': days, 'batch_size': batch_size, 'compact': not no_compact})
+    click.echo(f"Wrote {output}")
+
+@app.cli.command('prepared-bench')
+@click.option('--samples', default=50, show_default=True, help='Shows, movies and users to query.')
+@click.option('--rounds', default=20, show_default=True, help='Times each query runs per sample.')
+def prepared_bench_command(samples, rounds):
+    """Compare the hot queries as plain text and as prepared statements."""
+    try:
+        results = bench.prepared_statements(db_pool, samples, rounds)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    for label in results['text']['statements']:
+        text, prepared = results['text']['statements'][label], results['prepared']['statements'][label]
+        click.echo(f"{label:<20} text p50 {text['p50_us']:>8}us p95 {text['p95_us']:>8}us   "
+                   f"prepared p50 {prepared['p50_us']:>8}us p95 {prepared['p95_us']:>8}us")
+    for mode, result in results.items():
+        click.echo(f"{mode:<9} server: " + ' '.join(f"{name}={value}" for name, value in result['server'].items())
+                   + f" prepared_on_connection={result['prepared_on_connection']}")
+
+@app.cli.command('stress-booking')
+@click.option('--show-id', type=int, required=True, help='Show to fight over.')
+@click.option('--user-id', type=int, default=1, help='User the bookings are made for.')
+@click.option('--bookings', type=int, default=500, help='Number of booking attempts.')
+@click.option('--workers', type=int, default=50, help='Concurrent buyers.')
+@click.option('--keep', is_flag=True, help='Keep the test bookings instead of deleting them.')
+def stress_booking_command(show_id, user_id, bookings, workers, keep):
+    """Race concurrent bookings for one show and check no seat is sold twice."""
+    result = bench.stress_booking(db_config, show_id, user_id=user_id, bookings=bookings,
+                                  workers=workers, cleanup=not keep)
+    for key, value in result.items():
+        click.echo(f"{key}: {value}")
+    if result['double_sold_seats']:
+        raise click.ClickException('Seats were sold more than once!')
+
 if __name__ == '__main__':
     print("🎬 Starting Movie Booking System...")
     print("📍 Open http://localhost:5000 in your browser")
     # For security, turn debug=False and host='0.0.0.0' when deploying
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    debug = True
+    # With debug on, the reloader runs this file twice; only start the
+    # background jobs in the process that actually serves requests.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_jobs()
+    app.run(debug=debug, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,128 @@
+import time
+
+import mysql.connector
+
+# Shows are archived this many days after their date, well after any
+# seat hold or payment for them has settled
+ARCHIVE_AFTER_DAYS = 7
+
+# Tables whose size the archiver changes (see table_sizes)
+ARCHIVE_TABLES = ('SEAT_RESERVATION', 'SEAT_ARCHIVE', 'SHOWS', 'BOOKING')
+
+
+def archive_shows(conn, days=ARCHIVE_AFTER_DAYS, batch_size=50, max_batches=None, progress=None):
+    """Compact the seat rows of shows more than ``days`` days in the past.
+
+    Per batch of ``batch_size`` shows, in one transaction: each booking's
+    seats become one SEAT_ARCHIVE row, the shows' SEAT_RESERVATION rows
+    are deleted and the shows are flagged Is_Archived. Cancelled shows are
+    archived too. ``progress`` is called with the running summary after
+    every batch. Returns the summary with timings.
+    """
+    started = time.perf_counter()
+    result = {'shows_archived': 0, 'bookings_archived': 0, 'seat_rows_deleted': 0, 'batches': 0}
+    cursor = conn.cursor()
+    previous = None
+    try:
+        # A show has a few hundred seats at most; the default 1024 bytes
+        # would cut off the seat list of a large group booking. The
+        # connection is pooled, so the old value is put back afterwards.
+        cursor.execute("SELECT @@SESSION.group_concat_max_len")
+        previous = cursor.fetchone()[0]
+        cursor.execute("SET SESSION group_concat_max_len = 65535")
+        while max_batches is None or result['batches'] < max_batches:
+            # Walks idx_shows_archived_date; the row locks keep a concurrent
+            # date refresh or cancellation off these shows until commit
+            cursor.execute("""
+                SELECT Show_ID FROM SHOWS
+                WHERE Is_Archived = FALSE AND Show_Date < CURDATE() - INTERVAL %s DAY
+                ORDER BY Show_Date, Show_ID
+                LIMIT %s
+                FOR UPDATE
+            """, (days, batch_size))
+            show_ids = [row[0] for row in cursor.fetchall()]
+            if not show_ids:
+                conn.rollback()
+                break
+            placeholders = ','.join(['%s'] * len(show_ids))
+            cursor.execute(f"""
+                INSERT INTO SEAT_ARCHIVE (Booking_ID, Show_ID, Seat_Numbers)
+                SELECT Booking_ID, Show_ID, GROUP_CONCAT(Seat_Number ORDER BY Reservation_ID SEPARATOR ',')
+                FROM SEAT_RESERVATION
+                WHERE Show_ID IN ({placeholders}) AND Booking_ID IS NOT NULL
+                GROUP BY Booking_ID, Show_ID
+            """, show_ids)
+            result['bookings_archived'] += cursor.rowcount
+            cursor.execute(f"DELETE FROM SEAT_RESERVATION WHERE Show_ID IN ({placeholders})", show_ids)
+            result['seat_rows_deleted'] += cursor.rowcount
+            # The version bump drops cached seat maps of these shows
+            cursor.execute(f"""
+                UPDATE SHOWS SET Is_Archived = TRUE, Seat_Version = Seat_Version + 1
+                WHERE Show_ID IN ({placeholders})
+            """, show_ids)
+            result['shows_archived'] += cursor.rowcount
+            conn.commit()
+            result['batches'] += 1
+            if progress:
+                progress(dict(result))
+            if len(show_ids) < batch_size:
+                break
+    except Exception:
+        try:
+            conn.rollback()
+            if previous is not None:
+                cursor.execute("SET SESSION group_concat_max_len = %s", (previous,))
+        except mysql.connector.Error:
+            # The connection is gone; the pool discards it on the error
+            # raised below, which is the one worth reporting
+            pass
+        raise
+    else:
+        cursor.execute("SET SESSION group_concat_max_len = %s", (previous,))
+    finally:
+        cursor.close()
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def compact_tables(conn, tables=('SEAT_RESERVATION',)):
+    """Rebuild ``tables`` so InnoDB returns the space of deleted rows.
+
+    Deleted rows only leave free pages behind; the table keeps its size on
+    disk until it is rebuilt. InnoDB rebuilds online, so bookings go on,
+    but it reads and rewrites the whole table: run it off-peak.
+    """
+    cursor = conn.cursor()
+    try:
+        for table in tables:
+            cursor.execute(f"OPTIMIZE TABLE {table}")
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def table_sizes(conn, tables=ARCHIVE_TABLES):
+    """Row count and data/index size in bytes of each of ``tables``.
+
+    ANALYZE TABLE first, so the statistics reflect recent deletes; sizes
+    are what InnoDB reports, so they only shrink after compact_tables().
+    """
+    cursor = conn.cursor()
+    try:
+        for table in tables:
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+        sizes = {}
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            rows = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            data_bytes, index_bytes = cursor.fetchone()
+            sizes[table] = {'rows': rows, 'data_bytes': data_bytes, 'index_bytes': index_bytes}
+        conn.commit()
+        return sizes
+    finally:
+        cursor.close()
@@ -0,0 +1,383 @@
+# ASGI entry point: uvicorn asgi:application (see README)
+#
+# The read-heavy endpoints that mostly wait on MySQL -- /api/seats/<id>
+# and its /recommend, /movies and /movie/<id>/shows -- run as coroutines
+# on aiomysql, so a worker holds thousands of pollers and slow clients
+# without a thread each. Live seat event streams (/api/seats/<id>/events)
+# are coroutines too, fed by SeatEventHub through an asyncio queue.
+# Everything else goes to the unchanged Flask app on a thread pool.
+# The async handlers run inside a Flask request context and share the
+# app's templates, session, fragment cache, seat map cache and HTTP
+# caching, so their responses match the sync views byte for byte.
+
+import asyncio
+import contextlib
+import io
+import re
+import sys
+
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from flask import flash, jsonify, make_response, redirect, render_template, request, session, url_for
+from markupsafe import Markup
+
+import app as web
+from events import astream, format_sse
+from pagination import PageError, decode_cursor, page_query, page_rows, page_size
+from seatmap import SEATS_SQL, VERSION_SQL
+
+# Threads for the requests handed to Flask, i.e. the routes not served
+# as coroutines below
+WSGI_THREADS = 64
+
+async_pool_config = {
+    'pool_size': 50,          # MySQL connections per worker process
+    'wait_timeout': 5,
+    'recycle_seconds': 1800,
+}
+
+
+class DatabaseUnavailable(Exception):
+    """No connection could be had within wait_timeout."""
+
+
+class EventStream:
+    """Returned by a handler to answer with a live seat event stream.
+
+    The stream starts after the handler's request context is gone; it
+    only needs the seat map already loaded and the client's version.
+    """
+
+    def __init__(self, show_id, seat_map, since):
+        self.show_id = show_id
+        self.seat_map = seat_map
+        self.since = since
+
+
+class AsyncDatabase:
+    """An aiomysql pool with the same knobs as db.ConnectionPool."""
+
+    def __init__(self, db_config, pool_size=50, wait_timeout=5, recycle_seconds=1800):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.wait_timeout = wait_timeout
+        self.recycle_seconds = recycle_seconds
+        self.pool = None
+        self.timeouts = 0
+
+    async def open(self):
+        # minsize=0: start serving even while MySQL is down, like the sync pool
+        self.pool = await aiomysql.create_pool(
+            host=self.db_config['host'], port=self.db_config.get('port', 3306),
+            user=self.db_config['user'], password=self.db_config['password'],
+            db=self.db_config['database'], minsize=0, maxsize=self.pool_size,
+            pool_recycle=self.recycle_seconds, autocommit=True)
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+
+    @contextlib.asynccontextmanager
+    async def cursor(self, dictionary=False):
+        try:
+            conn = await asyncio.wait_for(self.pool.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DatabaseUnavailable('Timed out waiting for a database connection')
+        except aiomysql.MySQLError as err:
+            raise DatabaseUnavailable(str(err))
+        try:
+            async with conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cursor:
+                yield cursor
+        finally:
+            self.pool.release(conn)
+
+
+def build_environ(scope):
+    """A WSGI environ for an ASGI GET request (no body)."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class AsyncApp:
+    """ASGI app serving the async routes and handing the rest to Flask."""
+
+    def __init__(self, flask_app, db):
+        self.flask_app = flask_app
+        self.db = db
+        # a2wsgi rather than asgiref's WsgiToAsgi: the latter runs every
+        # WSGI request on a single thread
+        self.wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+        self.routes = [
+            (re.compile(r'/api/seats/(\d+)'), self.seats),
+            (re.compile(r'/api/seats/(\d+)/recommend'), self.recommend_seats),
+            (re.compile(r'/api/seats/(\d+)/events'), self.seat_events),
+            (re.compile(r'/movies'), self.movies),
+            (re.compile(r'/movie/(\d+)/shows'), self.shows_by_movie),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    args = [int(arg) for arg in match.groups()]
+                    return await self.dispatch(scope, receive, send, handler, args)
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.db.open()
+                except Exception as err:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(err)})
+                    return
+                web.start_background_jobs()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.db.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def dispatch(self, scope, receive, send, handler, args):
+        # The request context lives in context variables, which are per
+        # task, so concurrent requests on the event loop don't see each
+        # other's. before/after_request hooks are skipped: query_metrics
+        # keeps per-thread state and these routes only read.
+        ctx = self.flask_app.request_context(build_environ(scope))
+        ctx.push()
+        events = None
+        try:
+            try:
+                result = await handler(*args)
+                if isinstance(result, EventStream):
+                    events = result
+                    result = self.flask_app.response_class(
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+                response = make_response(result)
+            except DatabaseUnavailable as err:
+                print(f"Async database connection failed: {err}")
+                response = make_response("Database connection failed!")
+            except Exception as err:
+                response = self.flask_app.handle_exception(err)
+            if not self.flask_app.session_interface.is_null_session(ctx.session):
+                self.flask_app.session_interface.save_session(self.flask_app, ctx.session, response)
+            headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                       for name, value in response.headers.items()
+                       if events is None or name.lower() != 'content-length']
+            body = response.get_data() if events is None else b''
+        finally:
+            ctx.pop()
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        if events is not None:
+            return await self.stream_events(receive, send, events)
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def stream_events(self, receive, send, events):
+        # Waits on the subscription's asyncio queue, so an open stream
+        # costs no thread; ends when the client disconnects
+        seat_map = events.seat_map
+        sub = web.seat_events.subscribe(events.show_id, seat_map.version, loop=asyncio.get_running_loop())
+        first = None
+        if events.since != seat_map.version:
+            first = format_sse(web.seat_event(seat_map, events.since),
+                               event_type='seats', event_id=seat_map.version)
+
+        async def pump():
+            async for message in astream(web.seat_events, sub, first):
+                await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            web.seat_events.unsubscribe(sub)
+
+    # --- CACHED LOOKUPS (shared with the sync views in app.py) ---
+
+    async def catalog_version(self):
+        version = web.catalog_versions.get('catalog')
+        if version is None:
+            async with self.db.cursor() as cursor:
+                await cursor.execute(web.CATALOG_VERSION_SQL)
+                version = web.catalog_version_value(await cursor.fetchone())
+            web.catalog_versions.set('catalog', version)
+        return version
+
+    async def filter_options(self):
+        options = web.home_cache.get('filter_options')
+        if options is None:
+            try:
+                options = {}
+                async with self.db.cursor() as cursor:
+                    for name, sql in web.FILTER_OPTION_SQL:
+                        await cursor.execute(sql)
+                        options[name] = [row[0] for row in await cursor.fetchall()]
+            except (aiomysql.MySQLError, DatabaseUnavailable):
+                return web.NO_FILTER_OPTIONS
+            web.home_cache.set('filter_options', options)
+        return options
+
+    async def seat_map(self, show_id):
+        # SeatMapCache.get() with awaited queries
+        seat_map = web.seat_maps.cached(show_id)
+        if seat_map:
+            return seat_map
+        async with self.db.cursor() as cursor:
+            # The pool's connections autocommit; one snapshot for both reads
+            # keeps a booking committed in between from caching version V
+            # with the seats of V+1
+            await cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            await cursor.execute(VERSION_SQL, (show_id,))
+            row = await cursor.fetchone()
+            seat_map = web.seat_maps.revalidate(show_id, row[0]) if row else None
+            if row and not seat_map:
+                await cursor.execute(SEATS_SQL, (show_id,))
+                seats = await cursor.fetchall()
+            await cursor.connection.commit()
+        if row is None:
+            web.seat_maps.invalidate(show_id)
+            return None
+        return seat_map or web.seat_maps.update(show_id, row[0], seats)
+
+    async def catalog_page(self, max_age, view, *args):
+        # @catalog_page for a coroutine view
+        if session.get('_flashes'):
+            return await view(*args)
+        try:
+            version, updated_at = await self.catalog_version()
+        except aiomysql.MySQLError:
+            return await view(*args)
+        etag, last_modified, not_modified = web.catalog_validators(max_age, version, updated_at)
+        if not_modified:
+            response = self.flask_app.response_class(status=304)
+        else:
+            response = make_response(await view(*args))
+            if not web.cacheable_catalog_response(response):
+                return response
+        return web.set_catalog_headers(response, max_age, etag, last_modified)
+
+    # --- ROUTES (async variants of the views of the same name in app.py) ---
+
+    async def seats(self, show_id):
+        fmt = request.args.get('format', 'json')
+        if fmt not in web.SEAT_FORMATS:
+            return jsonify({'error': 'format must be json, packed or binary'}), 400
+        try:
+            seat_map = await self.seat_map(show_id)
+        except DatabaseUnavailable:
+            return jsonify({'error': 'Database connection failed'})
+        except aiomysql.MySQLError as err:
+            return jsonify({'error': str(err)})
+        return web.seats_response(show_id, seat_map, fmt)
+
+    async def seat_events(self, show_id):
+        # seat_events_stream() in app.py
+        try:
+            seat_map = await self.seat_map(show_id)
+        except DatabaseUnavailable:
+            return jsonify({'error': 'Database connection failed'}), 503
+        except aiomysql.MySQLError as err:
+            return jsonify({'error': str(err)}), 503
+        if seat_map is None:
+            return jsonify({'error': 'Show not found'}), 404
+        since = request.headers.get('Last-Event-ID', type=int)
+        if since is None:
+            since = request.args.get('since', type=int)
+        return EventStream(show_id, seat_map, since)
+
+    async def recommend_seats(self, show_id):
+        try:
+            seat_map = await self.seat_map(show_id)
+        except DatabaseUnavailable:
+            return jsonify({'error': 'Database connection failed'}), 503
+        except aiomysql.MySQLError as err:
+            return jsonify({'error': str(err)}), 503
+        return web.recommendation_response(show_id, seat_map)
+
+    async def movies(self):
+        return await self.catalog_page(60, self.render_movies,
+                                       web.listing_filters('city', 'language', 'genre', 'date'))
+
+    async def render_movies(self, filters):
+        key = web.fragment_key('movies', request.full_path)
+        movie_grid = web.fragment_cache.get(key)
+        if movie_grid is None:
+            try:
+                after = decode_cursor(request.args.get('after'), len(web.MOVIE_ORDER))
+                limit = page_size(request.args.get('limit'))
+                where, params = web.movie_filter_sql(filters)
+                async with self.db.cursor(dictionary=True) as cursor:
+                    await cursor.execute(*page_query(web.MOVIE_LIST_SQL, where, params,
+                                                     web.MOVIE_ORDER, after, limit))
+                    movies, next_cursor = page_rows(await cursor.fetchall(), web.MOVIE_ORDER, limit)
+                movie_grid = render_template('_movie_grid.html', movies=movies, next_cursor=next_cursor)
+                web.fragment_cache.set(key, movie_grid)
+            except (PageError, aiomysql.MySQLError) as err:
+                flash(f'Error loading movies: {err}', 'error')
+        return web.movies_page(filters, movie_grid, await self.filter_options())
+
+    async def shows_by_movie(self, movie_id):
+        return await self.catalog_page(15, self.render_shows_by_movie, movie_id)
+
+    async def render_shows_by_movie(self, movie_id):
+        key = web.fragment_key('movie_shows', movie_id)
+        fragment = web.fragment_cache.get(key)
+        try:
+            if fragment is None:
+                async with self.db.cursor(dictionary=True) as cursor:
+                    await cursor.execute(web.MOVIE_DETAIL_SQL, (movie_id,))
+                    movie = await cursor.fetchone()
+                    await cursor.execute(web.MOVIE_SHOWS_SQL, (movie_id,))
+                    shows = await cursor.fetchall()
+                fragment = web.render_movie_shows(movie, shows)
+                web.fragment_cache.set(key, fragment)
+        except aiomysql.MySQLError as err:
+            flash(f'Error loading shows: {err}', 'error')
+            return redirect(url_for('movies'))
+        except LookupError:
+            flash('Movie not found!', 'error')
+            return redirect(url_for('movies'))
+
+        title, movie_shows = fragment
+        return render_template('shows.html', title=title, movie_shows=Markup(movie_shows))
+
+
+async_db = AsyncDatabase(web.db_config, **async_pool_config)
+application = AsyncApp(web.app, async_db)
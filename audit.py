@@ -0,0 +1,112 @@
+import re
+from contextlib import contextmanager
+
+# EXPLAIN access types that read a whole table or a whole index
+FULL_SCAN_TYPES = ('ALL', 'index')
+
+# Put this comment in a statement that scans by design (e.g. a cached
+# count) so the audit reports it without failing
+FULL_SCAN_OK = '/* audit: full scan ok */'
+
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT\s+INTO\s+\S+\s*(\([^)]*\))?\s*SELECT)\b',
+                          re.IGNORECASE)
+
+
+def _normalise(statement):
+    return ' '.join(statement.split())
+
+
+@contextmanager
+def capture(pool):
+    """Collect every (statement, params) run through ``pool`` in the block."""
+    statements = []
+
+    def listener(statement, params, seconds, rowcount):
+        statements.append((statement, params))
+
+    pool.add_listener(listener)
+    try:
+        yield statements
+    finally:
+        pool.remove_listener(listener)
+
+
+def sample_ids(conn):
+    """Pick real IDs for the audited routes, preferring rows with data behind them."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT s.Movie_ID, s.Show_ID FROM SHOWS s
+            WHERE s.Show_Date >= CURDATE()
+            ORDER BY s.Show_Date, s.Show_Time
+            LIMIT 1
+        """)
+        row = cursor.fetchone() or (0, 0)
+        cursor.execute("SELECT User_ID FROM BOOKING ORDER BY Booking_ID DESC LIMIT 1")
+        user = cursor.fetchone()
+        cursor.execute("SELECT Email FROM USERS WHERE User_ID = %s", (user[0] if user else 1,))
+        email = cursor.fetchone()
+    finally:
+        cursor.close()
+    return {'movie_id': row[0], 'show_id': row[1],
+            'user_id': user[0] if user else 1,
+            'email': email[0] if email else 'nobody@example.com'}
+
+
+def explain(conn, statement, params):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute('EXPLAIN ' + statement, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def explain_audit(app, pool, routes, min_rows=1000):
+    """Drive ``routes`` through the test client and EXPLAIN what they run.
+
+    ``routes`` is a list of ``(label, method, path, form, user_id, hot)``.
+    A plan step that reads a whole table or index of at least ``min_rows``
+    estimated rows is a full scan; full scans in hot routes are failures,
+    elsewhere (and in statements marked FULL_SCAN_OK) they are warnings.
+    Returns ``(report_lines, failures)``.
+    """
+    client = app.test_client()
+    seen = {}
+    for label, method, path, form, user_id, hot in routes:
+        with client.session_transaction() as sess:
+            sess.clear()
+            if user_id is not None:
+                sess['user_id'] = user_id
+                sess['user_name'] = 'explain-audit'
+        with capture(pool) as statements:
+            client.open(path, method=method, data=form)
+        for statement, params in statements:
+            key = _normalise(statement)
+            if key not in seen or (hot and not seen[key][3]):
+                seen[key] = (label, statement, params, hot)
+
+    report = []
+    failures = 0
+    with pool.connection() as conn:
+        for key, (label, statement, params, hot) in seen.items():
+            if not _EXPLAINABLE.match(statement):
+                report.append(f"SKIP  [{label}] {key[:100]}")
+                continue
+            plan = explain(conn, statement, params)
+            scans = [step for step in plan
+                     if step['type'] in FULL_SCAN_TYPES
+                     and not str(step['table']).startswith('<')
+                     and (step['rows'] or 0) >= min_rows]
+            if not scans:
+                status = 'OK'
+            elif hot and FULL_SCAN_OK not in statement:
+                status = 'FAIL'
+                failures += 1
+            else:
+                status = 'WARN'
+            report.append(f"{status:<5} [{label}] {key[:100]}")
+            for step in plan:
+                report.append(f"        {step['table']}: type={step['type']} key={step['key']} "
+                              f"rows={step['rows']} {step['Extra'] or ''}".rstrip())
+    return report, failures
@@ -0,0 +1,812 @@
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import mysql.connector
+
+from archive import archive_shows, compact_tables, table_sizes
+import statements
+from booking import SEAT_CHECK, BookingError, reserve_seats
+from db import ConnectionPool
+from events import SeatEventHub
+from exports import EXPORTS, open_export, parse_range, stream_export
+from search import SearchIndex
+from seatmap import SEATS_SQL, SEATS_STATEMENT, VERSION_STATEMENT, SeatMap
+
+
+def stress_booking(db_config, show_id, user_id=1, bookings=500, workers=50,
+                   max_party=4, hot_seats=40, cleanup=True):
+    """Fire ``bookings`` concurrent reservations at one show.
+
+    Buyers pick seats from the first ``hot_seats`` seats of the show so
+    they fight over the same rows. Afterwards every booking made during the
+    run is checked against SEAT_RESERVATION to prove no seat was sold twice.
+    """
+    pool = ConnectionPool(db_config, pool_size=workers, wait_timeout=60)
+
+    conn = pool.acquire()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT Seat_Number FROM SEAT_RESERVATION
+        WHERE Show_ID = %s AND Is_Booked = FALSE
+        ORDER BY Reservation_ID
+    """, (show_id,))
+    seats = [r['Seat_Number'] for r in cursor.fetchall()][:hot_seats]
+    cursor.execute("SELECT IFNULL(MAX(Booking_ID), 0) as max_id FROM BOOKING")
+    first_booking_id = cursor.fetchone()['max_id'] + 1
+    cursor.close()
+    pool.release(conn)
+
+    if not seats:
+        raise ValueError(f'Show {show_id} has no free seats to fight over')
+
+    counts = {'booked': 0, 'conflicts': 0, 'errors': 0}
+    claimed = {}
+    counts_lock = threading.Lock()
+
+    def attempt(_):
+        party = random.sample(seats, random.randint(1, min(max_party, len(seats))))
+        conn = pool.acquire()
+        try:
+            booking_id = reserve_seats(conn, show_id, user_id, party, 'UPI')
+            with counts_lock:
+                claimed[booking_id] = party
+            outcome = 'booked'
+        except BookingError:
+            outcome = 'conflicts'
+        except mysql.connector.Error as err:
+            print(f"Stress booking error: {err}")
+            outcome = 'errors'
+        finally:
+            pool.release(conn)
+        with counts_lock:
+            counts[outcome] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(attempt, range(bookings)))
+    elapsed = time.perf_counter() - started
+
+    conn = pool.acquire()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT Seat_Number, Booking_ID FROM SEAT_RESERVATION
+            WHERE Show_ID = %s AND Booking_ID >= %s
+        """, (show_id, first_booking_id))
+        seat_owner = {r['Seat_Number']: r['Booking_ID'] for r in cursor.fetchall()}
+
+        # Every seat a successful reservation was told it got must be owned
+        # by that booking, and by no other
+        sold = {}
+        double_sold = []
+        for booking_id, party in claimed.items():
+            for seat in party:
+                if seat in sold or seat_owner.get(seat) != booking_id:
+                    double_sold.append(seat)
+                sold[seat] = booking_id
+
+        if cleanup:
+            cursor.execute("""
+                UPDATE SEAT_RESERVATION SET Is_Booked = FALSE, Booking_ID = NULL
+                WHERE Show_ID = %s AND Booking_ID >= %s
+            """, (show_id, first_booking_id))
+            # reserve_seats() took these off the show's free-seat counter; the
+            # version bump makes seat map caches and live viewers reload
+            cursor.execute("""
+                UPDATE SHOWS
+                SET Available_Seats = Available_Seats + %s, Seat_Version = Seat_Version + 1
+                WHERE Show_ID = %s
+            """, (cursor.rowcount, show_id))
+            # Only this show's test bookings; real bookings made elsewhere
+            # during the run keep their payments
+            cursor.execute("""
+                DELETE FROM PAYMENT WHERE Booking_ID IN (
+                    SELECT Booking_ID FROM BOOKING WHERE Show_ID = %s AND Booking_ID >= %s)
+            """, (show_id, first_booking_id))
+            cursor.execute("DELETE FROM BOOKING WHERE Show_ID = %s AND Booking_ID >= %s",
+                           (show_id, first_booking_id))
+            conn.commit()
+    finally:
+        cursor.close()
+        pool.release(conn)
+
+    return {
+        'attempts': bookings,
+        'workers': workers,
+        'booked': counts['booked'],
+        'conflicts': counts['conflicts'],
+        'errors': counts['errors'],
+        'seconds': round(elapsed, 3),
+        'bookings_per_second': round(counts['booked'] / elapsed, 1) if elapsed else 0.0,
+        'attempts_per_second': round(bookings / elapsed, 1) if elapsed else 0.0,
+        'double_sold_seats': sorted(set(double_sold)),
+    }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def sse_fanout(subscribers=5000, rounds=20, shows=1, readers=8):
+    """Measure how long a seat event takes to reach every idle subscriber.
+
+    Runs the real SeatEventHub with an in-memory event source, so no
+    database or HTTP server is involved: the numbers are the hub's own
+    publish -> dispatch -> mailbox cost. ``readers`` threads drain the
+    mailboxes, standing in for the SSE response generators.
+    """
+    versions = {show_id: 0 for show_id in range(shows)}
+
+    def load_event(show_id, since):
+        return {'version': versions[show_id], 'sent_at': time.perf_counter()}
+
+    hub = SeatEventHub(load_event, poll_versions=None, max_queue=rounds + 1)
+    subs = [hub.subscribe(i % shows, 0) for i in range(subscribers)]
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def drain(chunk):
+        local = []
+        for _ in range(rounds):
+            for sub in chunk:
+                message = sub.get(timeout=30)
+                received = time.perf_counter()
+                sent_at = float(message.split('"sent_at": ')[1].split('}')[0])
+                local.append((received - sent_at) * 1000)
+        with latencies_lock:
+            latencies.extend(local)
+
+    chunks = [subs[i::readers] for i in range(readers)]
+    threads = [threading.Thread(target=drain, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for show_id in versions:
+            versions[show_id] += 1
+            hub.publish(show_id)
+        # Let the dispatcher finish a round before the next publish
+        while hub.published < sum(versions.values()):
+            time.sleep(0.0005)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for sub in subs:
+        hub.unsubscribe(sub)
+
+    latencies.sort()
+    return {
+        'subscribers': subscribers,
+        'shows': shows,
+        'rounds': rounds,
+        'messages_delivered': len(latencies),
+        'deliveries_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'fanout_latency_ms_p50': round(_percentile(latencies, 50), 3),
+        'fanout_latency_ms_p95': round(_percentile(latencies, 95), 3),
+        'fanout_latency_ms_p99': round(_percentile(latencies, 99), 3),
+        'fanout_latency_ms_max': round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+def _fragmented_seats(rng, rows, seats_per_row, fill):
+    # Occupancy built the way it happens: parties of 1-6 booking a random
+    # free stretch, so free seats end up in short broken runs
+    names = [f"{chr(65 + r)}{n + 1}" for r in range(rows) for n in range(seats_per_row)]
+    booked = set()
+    target = int(len(names) * fill)
+    while len(booked) < target:
+        party = rng.randint(1, 6)
+        start = rng.randrange(len(names))
+        row_end = (start // seats_per_row + 1) * seats_per_row
+        block = [i for i in range(start, min(start + party, row_end)) if i not in booked]
+        booked.update(block[:target - len(booked)])
+    return [(name, int(i in booked)) for i, name in enumerate(names)]
+
+
+def seat_recommendation(rows=10, seats_per_row=20, fills=(0.25, 0.5, 0.75, 0.9),
+                        maps=200, queries=2000, seed=42):
+    """Time SeatMap.best_seats() over randomly fragmented occupancy.
+
+    For each fill level, ``maps`` shows are filled by random group
+    bookings and asked for the best block of 1-8 seats: cold (free-run
+    index built by the query), warm (index and answer already cached, as
+    under polling) and after one seat changed (one row re-indexed, as
+    after a booking). No database is involved.
+    """
+    rng = random.Random(seed)
+    results = {}
+    for fill in fills:
+        seat_maps = [SeatMap(i, 1, _fragmented_seats(rng, rows, seats_per_row, fill)) for i in range(maps)]
+        timings = {'cold': [], 'warm': [], 'after_change': []}
+        found = 0
+        for q in range(queries):
+            seat_map = seat_maps[q % maps]
+            party_size = rng.randint(1, 8)
+            phases = ['warm'] if q >= maps else ['cold', 'warm']
+            for phase in phases:
+                started = time.perf_counter()
+                blocks = seat_map.best_seats(party_size)
+                timings[phase].append((time.perf_counter() - started) * 1e6)
+            found += bool(blocks)
+
+            # The generated layouts have no missing seats
+            index = rng.randrange(seat_map.seat_count)
+            seat_map.set_booked(index, not seat_map.is_booked(index))
+            started = time.perf_counter()
+            seat_map.best_seats(party_size)
+            timings['after_change'].append((time.perf_counter() - started) * 1e6)
+
+        result = {'seats': rows * seats_per_row, 'queries': queries,
+                  'found_ratio': round(found / queries, 3)}
+        for phase, values in timings.items():
+            values.sort()
+            result[f'{phase}_us_p50'] = round(_percentile(values, 50), 2)
+            result[f'{phase}_us_p99'] = round(_percentile(values, 99), 2)
+        results[str(fill)] = result
+    return results
+
+
+def _synthetic_catalog(rng, titles, theatres):
+    syllables = ['ka', 'ra', 'mi', 'to', 'shi', 'an', 'dor', 'el', 'vin', 'lu', 'zen', 'pa',
+                 'qu', 'ri', 'son', 'mar', 'ta', 'ne', 'bo', 'gal', 'ti', 'ya', 'or', 'us']
+    words = sorted({''.join(rng.choice(syllables) for _ in range(rng.randint(1, 4))) for _ in range(20000)})
+    words += ['the', 'of', 'night', 'love', 'return', 'dark', 'king', 'last', 'city', 'war']
+    genres = ['Action', 'Drama', 'Comedy', 'Thriller', 'Romance', 'Horror', 'Sci-Fi', 'Animation']
+    languages = ['English', 'Hindi', 'Kannada', 'Tamil', 'Telugu', 'Malayalam', 'French']
+    cities = [f"{rng.choice(words).title()}pur" for _ in range(100)]
+    movies = [{'Movie_ID': i, 'Title': ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))).title(),
+               'Genre': rng.choice(genres), 'Language': rng.choice(languages),
+               'Rating': round(rng.uniform(1, 10), 1)} for i in range(titles)]
+    halls = [{'Theatre_ID': i, 'Name': f"{rng.choice(words).title()} Cinemas",
+              'Location': f"{rng.choice(words).title()} Mall", 'City': rng.choice(cities)}
+             for i in range(theatres)]
+    return movies, halls
+
+
+def search_index(titles=100000, theatres=2000, queries=5000, seed=42):
+    """Build the catalog search index over synthetic titles and time typeahead.
+
+    Queries are what someone types: one or two words of a random title,
+    the last one cut to 1-6 characters. No database is involved. Memory
+    is what building the index allocated and kept (tracemalloc).
+    """
+    rng = random.Random(seed)
+    movies, halls = _synthetic_catalog(rng, titles, theatres)
+
+    # Built twice: tracemalloc slows the build down several times over
+    tracemalloc.start()
+    measured = SearchIndex()
+    measured.rebuild(movies, halls, version=1)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del measured
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.rebuild(movies, halls, version=1)
+    build_seconds = time.perf_counter() - started
+
+    latencies = {'short': [], 'long': []}
+    matched = 0
+    for _ in range(queries):
+        words = rng.choice(movies)['Title'].split()
+        start = rng.randrange(len(words))
+        typed = words[start:start + rng.randint(1, 2)]
+        typed[-1] = typed[-1][:rng.randint(1, 6)]
+        query = ' '.join(typed)
+        started = time.perf_counter()
+        hits, _, _, _ = index.search(query, limit=10, facets=('genre', 'language'))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        latencies['short' if len(query) <= 2 else 'long'].append(elapsed_ms)
+        matched += bool(hits)
+
+    result = {
+        'documents': len(index),
+        'distinct_words': len(index._terms),
+        'build_seconds': round(build_seconds, 3),
+        'memory_mb': round(allocated / 1024 / 1024, 1),
+        'queries': queries,
+        'matched_ratio': round(matched / queries, 3),
+    }
+    for name, values in latencies.items():
+        values.sort()
+        result[f'{name}_prefix_queries'] = len(values)
+        result[f'{name}_prefix_ms_p50'] = round(_percentile(values, 50), 3)
+        result[f'{name}_prefix_ms_p99'] = round(_percentile(values, 99), 3)
+    return result
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Not Linux: the process's peak so far rather than its current size
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _PeakRSS:
+    """Samples the process's resident set size until stopped."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_bytes = _rss_bytes()
+        self.peak_bytes = self.start_bytes
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, _rss_bytes())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, _rss_bytes())
+        return {'rss_start_mb': round(self.start_bytes / 1024 / 1024, 1),
+                'rss_peak_mb': round(self.peak_bytes / 1024 / 1024, 1),
+                'rss_growth_mb': round((self.peak_bytes - self.start_bytes) / 1024 / 1024, 1)}
+
+
+def export_throughput(pool, name, start, end, fmt='csv', compress=False, compare_buffered=False):
+    """Stream an export into a byte counter and report rows/s and peak RSS.
+
+    With ``compare_buffered`` the same query is then also run the old way,
+    fetchall() and encoding in memory, for contrast; it runs last because
+    the memory it takes is not necessarily given back to the OS.
+    """
+    results = {}
+    rss = _PeakRSS()
+    started = time.perf_counter()
+    stats = {}
+    size = 0
+    columns, chunks = open_export(pool, name, fmt, start, end)
+    for chunk in stream_export(columns, chunks, fmt, compress, stats):
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    results['streaming'] = {
+        'rows': stats['rows'],
+        'bytes': size,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(stats['rows'] / elapsed, 1) if elapsed else 0.0,
+        **rss.stop(),
+    }
+
+    if compare_buffered:
+        rss = _PeakRSS()
+        started = time.perf_counter()
+        with pool.connection() as conn:
+            cursor = conn.cursor(buffered=True)
+            try:
+                cursor.execute(EXPORTS[name], parse_range(start, end))
+                rows = cursor.fetchall()
+                columns = [column[0] for column in cursor.description]
+            finally:
+                cursor.close()
+        data = b''.join(stream_export(columns, (batch for batch in [rows]), fmt, compress))
+        elapsed = time.perf_counter() - started
+        results['buffered'] = {
+            'rows': len(rows),
+            'bytes': len(data),
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(len(rows) / elapsed, 1) if elapsed else 0.0,
+            **rss.stop(),
+        }
+    return results
+
+
+def sample_targets(conn, rng, count=50):
+    """Random movie, show and user IDs that have data behind them."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT Movie_ID, Show_ID FROM SHOWS
+            WHERE Show_Date >= CURDATE()
+            ORDER BY Show_Date, Show_Time
+            LIMIT 5000
+        """)
+        shows = cursor.fetchall()
+        cursor.execute("SELECT User_ID FROM BOOKING ORDER BY Booking_ID DESC LIMIT 5000")
+        users = sorted({row[0] for row in cursor.fetchall()})
+    finally:
+        cursor.close()
+    if not shows or not users:
+        raise ValueError('Need upcoming shows and bookings; run `flask --app app seed-data` first')
+    picked = rng.sample(shows, min(count, len(shows)))
+    return {'movie_ids': [m for m, _ in picked],
+            'show_ids': [s for _, s in picked],
+            'user_ids': rng.sample(users, min(count, len(users)))}
+
+
+# Queries whose latency the archiver should improve (seat lookups on the
+# smaller SEAT_RESERVATION) or leave alone (upcoming shows, booking history)
+ARCHIVE_QUERIES = {
+    'seat_lookup': (SEATS_SQL, 'show_ids'),
+    'upcoming_shows': ("""
+        SELECT Show_ID, Show_Date, Show_Time, Available_Seats FROM SHOWS
+        WHERE Movie_ID = %s AND Show_Date >= CURDATE() AND NOT Is_Cancelled
+    """, 'movie_ids'),
+    'booking_history': ("""
+        SELECT Booking_ID, Movie_Title, Show_Date, Seat_Numbers, Total_Amount, Booking_Status
+        FROM VIEW_BookingSummary
+        WHERE User_ID = %s
+        ORDER BY Show_Date DESC, Booking_ID DESC
+        LIMIT 20
+    """, 'user_ids'),
+}
+
+
+def _query_latencies(conn, targets, rounds):
+    cursor = conn.cursor()
+    try:
+        results = {}
+        for name, (sql, target) in ARCHIVE_QUERIES.items():
+            latencies = []
+            for _ in range(rounds):
+                for value in targets[target]:
+                    started = time.perf_counter()
+                    cursor.execute(sql, (value,))
+                    cursor.fetchall()
+                    latencies.append((time.perf_counter() - started) * 1000)
+            latencies.sort()
+            results[name] = {'p50_ms': round(_percentile(latencies, 50), 3),
+                             'p95_ms': round(_percentile(latencies, 95), 3)}
+        conn.commit()
+        return results
+    finally:
+        cursor.close()
+
+
+def archive_benchmark(pool, days=7, batch_size=50, compact=True, samples=50, rounds=5, seed=42):
+    """Table sizes and query latencies before and after archiving past shows.
+
+    Runs the archiver for real. With ``compact`` SEAT_RESERVATION is
+    rebuilt afterwards, otherwise its size on disk does not change.
+    """
+    with pool.connection() as conn:
+        targets = sample_targets(conn, random.Random(seed), samples)
+        before = {'tables': table_sizes(conn), 'latency': _query_latencies(conn, targets, rounds)}
+        archived = archive_shows(conn, days, batch_size)
+        if compact:
+            started = time.perf_counter()
+            compact_tables(conn)
+            archived['compact_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        after = {'tables': table_sizes(conn), 'latency': _query_latencies(conn, targets, rounds)}
+    return {'before': before, 'archive': archived, 'after': after}
+
+
+_SERVER_COUNTERS = ('Com_stmt_prepare', 'Com_stmt_execute', 'Com_stmt_reset', 'Com_stmt_close', 'Questions')
+
+
+def _server_counters(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW SESSION STATUS WHERE Variable_name IN (%s, %s, %s, %s, %s)", _SERVER_COUNTERS)
+        return {name: int(value) for name, value in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _statement_cases(conn, targets, rng):
+    # (label, statement or InListStatement, [params, ...]) for the hot
+    # read and lock paths, with realistic parameters
+    show_ids, movie_ids = targets['show_ids'], targets['movie_ids']
+    cursor = conn.cursor()
+    try:
+        placeholders = ','.join(['%s'] * len(targets['user_ids']))
+        cursor.execute(f"SELECT Email, Password FROM USERS WHERE User_ID IN ({placeholders})", targets['user_ids'])
+        logins = cursor.fetchall()
+        seat_lists = []
+        for show_id in show_ids:
+            cursor.execute(SEATS_SQL, (show_id,))
+            seat_names = [row[0] for row in cursor.fetchall()]
+            if seat_names:
+                party = rng.sample(seat_names, min(len(seat_names), rng.randint(1, 10)))
+                seat_lists.append((show_id, sorted(party)))
+        conn.rollback()
+    finally:
+        cursor.close()
+
+    # Declared by app.py
+    return [
+        ('seat_version', VERSION_STATEMENT, [(show_id,) for show_id in show_ids]),
+        ('seat_map', SEATS_STATEMENT, [(show_id,) for show_id in show_ids]),
+        ('movie_detail', statements.declared('movie_detail'), [(movie_id,) for movie_id in movie_ids]),
+        ('movie_shows', statements.declared('movie_shows'), [(movie_id,) for movie_id in movie_ids]),
+        ('login', statements.declared('login'), [tuple(login) for login in logins]),
+        ('booking_seat_check', SEAT_CHECK, seat_lists),
+    ]
+
+
+def _run_statement_cases(conn, cases, rounds, prepared):
+    timings = {}
+    cursor = conn.cursor()
+    try:
+        for label, statement, param_sets in cases:
+            latencies = []
+            for _ in range(rounds):
+                for params in param_sets:
+                    if isinstance(statement, statements.InListStatement):
+                        show_id, seats = params
+                        if prepared:
+                            bound, seat_params = statement.bind(seats)
+                        else:
+                            # What the text protocol used to send: one
+                            # statement text per seat count
+                            bound, seat_params = statements.Statement(None, statement.expand(len(seats))), seats
+                        params = [show_id] + seat_params
+                    else:
+                        bound = statement
+                    started = time.perf_counter()
+                    if prepared:
+                        statements.fetchall(conn, bound, params)
+                    else:
+                        cursor.execute(bound.sql, params)
+                        cursor.fetchall()
+                    latencies.append((time.perf_counter() - started) * 1e6)
+                # Drop the row locks FOR UPDATE took
+                conn.rollback()
+            latencies.sort()
+            timings[label] = {
+                'calls': len(latencies),
+                'p50_us': round(_percentile(latencies, 50), 1),
+                'p95_us': round(_percentile(latencies, 95), 1),
+                'mean_us': round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            }
+    finally:
+        cursor.close()
+    return timings
+
+
+def prepared_statements(pool, samples=50, rounds=20, seed=42):
+    """Per-call latency of the hot queries as plain text vs prepared.
+
+    The prepared run starts with nothing prepared on its connection, so
+    the cost of preparing is included. Also reports how many
+    prepare/execute/reset commands the server saw in each mode.
+    """
+    rng = random.Random(seed)
+    with pool.connection() as conn:
+        targets = sample_targets(conn, rng, samples)
+        cases = _statement_cases(conn, targets, rng)
+
+        # Untimed pass, so neither mode pays for a cold buffer pool
+        _run_statement_cases(conn, cases, 1, prepared=False)
+
+    results = {}
+    for mode in ('text', 'prepared'):
+        with pool.connection() as conn:
+            before = _server_counters(conn)
+            timings = _run_statement_cases(conn, cases, rounds, prepared=(mode == 'prepared'))
+            after = _server_counters(conn)
+            results[mode] = {
+                'statements': timings,
+                # Less the one SHOW STATUS that read ``before``
+                'server': {name: after[name] - before[name] - (name == 'Questions') for name in _SERVER_COUNTERS},
+                'prepared_on_connection': statements.prepared_count(conn),
+            }
+    return results
+
+
+def load_benchmark(app, routes, requests_per_route=200, concurrency=8, warmup=10, seed=42):
+    """Drive each route through the Flask test client and time it.
+
+    ``routes`` is a list of ``(name, make_request)`` where
+    ``make_request(rng)`` returns ``(path, user_id)``; ``user_id`` (or
+    None) is put in the session first. Routes run one at a time with
+    ``concurrency`` threads each, so the numbers of one route are not
+    skewed by another. Responses of 500 and above count as errors.
+    """
+    results = {}
+    for name, make_request in routes:
+        rng = random.Random(f"{seed}-{name}")
+        plan = [make_request(rng) for _ in range(warmup + requests_per_route)]
+        warm, timed = plan[:warmup], plan[warmup:]
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+        local = threading.local()
+
+        def hit(request):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = app.test_client()
+            path, user_id = request
+            with client.session_transaction() as sess:
+                sess.clear()
+                if user_id is not None:
+                    sess['user_id'] = user_id
+                    sess['user_name'] = 'load-benchmark'
+            started = time.perf_counter()
+            response = client.get(path)
+            response.get_data()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            return elapsed_ms, response.status_code
+
+        for request in warm:
+            hit(request)
+
+        def timed_hit(request):
+            nonlocal errors
+            elapsed_ms, status = hit(request)
+            with lock:
+                latencies.append(elapsed_ms)
+                if status >= 500:
+                    errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed_hit, timed))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        results[name] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'latency_ms_mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'latency_ms_p50': round(_percentile(latencies, 50), 3),
+            'latency_ms_p95': round(_percentile(latencies, 95), 3),
+            'latency_ms_p99': round(_percentile(latencies, 99), 3),
+        }
+    return results
+
+
+async def _http_get(reader, writer, host, path):
+    # One keep-alive GET; returns (status, connection still usable)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: identity\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    if status in (204, 304) or status < 200:
+        pass
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+async def _http_level(host, port, paths, concurrency, requests, timeout):
+    latencies = []
+    errors = 0
+    turn = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        reader = writer = None
+        for i in turn:
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                status, keep_alive = await asyncio.wait_for(
+                    _http_get(reader, writer, f"{host}:{port}", paths[i % len(paths)]), timeout)
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                status, keep_alive = 599, False
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 500:
+                errors += 1
+            if not keep_alive and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms_mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'latency_ms_p50': round(_percentile(latencies, 50), 3),
+        'latency_ms_p95': round(_percentile(latencies, 95), 3),
+        'latency_ms_p99': round(_percentile(latencies, 99), 3),
+        'latency_ms_max': round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+async def _http_benchmark(base_url, routes, concurrency_levels, requests_per_level, slow_clients, timeout):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    # Slow clients send half a request and then sit on the connection,
+    # like idle phones on bad networks; a thread-per-request server keeps
+    # a worker busy for each of them
+    idle = []
+    for _ in range(slow_clients):
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            break
+        writer.write(f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\n".encode())
+        idle.append(writer)
+    try:
+        results = {}
+        for name, paths in routes:
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                results[name][str(concurrency)] = await _http_level(host, port, paths, concurrency,
+                                                                    requests_per_level, timeout)
+        return results, len(idle)
+    finally:
+        for writer in idle:
+            writer.close()
+
+
+def http_benchmark(base_url, routes, concurrency_levels=(10, 100, 500), requests_per_level=2000,
+                   slow_clients=0, timeout=30.0):
+    """Load a running server over real HTTP at rising concurrency.
+
+    ``routes`` is a list of ``(name, paths)``; each route runs once per
+    concurrency level with that many keep-alive clients cycling through
+    its paths. Unlike load_benchmark this includes the server itself
+    (threads, event loop, connection handling), so two deployments of the
+    same app can be compared. Returns ``(results, slow_clients_opened)``
+    with ``results[name][concurrency]`` like load_benchmark's; requests
+    that fail or take longer than ``timeout`` count as errors.
+    """
+    return asyncio.run(_http_benchmark(base_url, routes, concurrency_levels, requests_per_level,
+                                       slow_clients, timeout))
+
+
+def write_baseline(path, results, settings):
+    baseline = {
+        'recorded_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'settings': settings,
+        'routes': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare_baseline(path, results, tolerance=0.2):
+    """Routes whose p95 or p99 grew by more than ``tolerance`` over the baseline."""
+    with open(path) as f:
+        baseline = json.load(f)['routes']
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ('latency_ms_p95', 'latency_ms_p99'):
+            if before[metric] and current[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {before[metric]} -> {current[metric]}")
+    return regressions
@@ -0,0 +1,117 @@
+import random
+import time
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import statements
+from statements import InListStatement
+
+# Lock conflicts that are safe to retry from the top of the transaction
+RETRYABLE_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+MAX_ATTEMPTS = 3
+
+# Prepared once per pooled connection (see statements.py). The seat lists
+# are IN lists, bucketed so any party size reuses one of a few statements.
+SEAT_CHECK = InListStatement('booking_seat_check', """
+    SELECT Seat_Number, Is_Booked FROM SEAT_RESERVATION
+    WHERE Show_ID = %s AND Seat_Number IN ({in})
+    ORDER BY Seat_Number
+    FOR UPDATE
+""")
+SHOW_LOCK = statements.declare('booking_show_lock',
+                               "SELECT Price, Is_Cancelled FROM SHOWS WHERE Show_ID = %s FOR UPDATE")
+SEAT_TAKE = InListStatement('booking_seat_take', """
+    UPDATE SEAT_RESERVATION
+    SET Is_Booked = TRUE, Booking_ID = %s
+    WHERE Show_ID = %s AND Seat_Number IN ({in}) AND Is_Booked = FALSE
+""")
+BOOKING_INSERT = statements.declare('booking_insert', """
+    INSERT INTO BOOKING (Show_ID, User_ID, Seats_Booked, Booking_Date, Total_Amount, Status, Hold_Expires_At)
+    VALUES (%s, %s, %s, CURDATE(), %s, 'Pending', DATE_ADD(NOW(), INTERVAL %s SECOND))
+""")
+PAYMENT_INSERT = statements.declare('booking_payment', """
+    INSERT INTO PAYMENT (Booking_ID, Amount, Payment_Mode, Payment_State)
+    VALUES (%s, %s, %s, 'Pending')
+""")
+SHOW_SEATS_TAKEN = statements.declare('booking_show_seats', """
+    UPDATE SHOWS
+    SET Available_Seats = Available_Seats - %s, Seat_Version = Seat_Version + 1
+    WHERE Show_ID = %s
+""")
+
+
+class BookingError(Exception):
+    """Raised when a booking cannot go ahead; the message is user-facing."""
+
+
+class SeatsUnavailable(BookingError):
+    """Raised when some of the requested seats are already taken."""
+
+    def __init__(self, seats):
+        super().__init__(f'Some seats are already booked: {seats}')
+        self.seats = seats
+
+
+def _reserve(conn, show_id, user_id, seats, payment_mode, hold_seconds):
+    # Lock the requested seat rows so a concurrent buyer waits on us
+    # instead of reading the same "free" state.
+    statement, seat_params = SEAT_CHECK.bind(seats)
+    rows = statements.fetchall(conn, statement, [show_id] + seat_params, dictionary=True)
+    free = {r['Seat_Number'] for r in rows if not r['Is_Booked']}
+    taken = [s for s in seats if s not in free]
+    if taken:
+        raise SeatsUnavailable(taken)
+
+    # Locking read: a bulk cancellation flags the show under the same
+    # row lock, so it either sees this booking or we see the flag
+    show_result = statements.fetchone(conn, SHOW_LOCK, (show_id,), dictionary=True)
+    if not show_result:
+        raise BookingError('Show not found!')
+    if show_result['Is_Cancelled']:
+        raise BookingError('This show has been cancelled.')
+    total_amount = show_result['Price'] * len(seats)
+
+    booking_id = statements.insert(conn, BOOKING_INSERT,
+                                   (show_id, user_id, len(seats), total_amount, hold_seconds))
+
+    # One conditional UPDATE for the whole seat set. The affected-row
+    # count is the final word on whether we got every seat.
+    statement, seat_params = SEAT_TAKE.bind(seats)
+    if statements.execute(conn, statement, [booking_id, show_id] + seat_params) != len(seats):
+        raise SeatsUnavailable(seats)
+
+    statements.insert(conn, PAYMENT_INSERT, (booking_id, total_amount, payment_mode))
+
+    # Keep the denormalised counter in step with the seats we just took,
+    # and bump the seat map version that /api/seats ETags are keyed on
+    statements.execute(conn, SHOW_SEATS_TAKEN, (len(seats), show_id))
+
+    conn.commit()
+    return booking_id
+
+
+def reserve_seats(conn, show_id, user_id, seats, payment_mode, hold_seconds=None):
+    """Atomically book ``seats`` for ``show_id`` and create a pending payment.
+
+    With ``hold_seconds`` the seats are only held that long: unless the
+    payment is completed first, the hold sweeper (holds.py) expires the
+    booking and frees them again.
+
+    Returns the new Booking_ID. Raises SeatsUnavailable if any seat is
+    already taken and BookingError if the show does not exist. Deadlocks
+    and lock wait timeouts are retried a few times before the
+    mysql.connector error is passed on to the caller.
+    """
+    seats = sorted(set(seats))
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return _reserve(conn, show_id, user_id, seats, payment_mode, hold_seconds)
+        except BookingError:
+            conn.rollback()
+            raise
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno not in RETRYABLE_ERRORS or attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0.01, 0.05) * attempt)
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process cache whose entries expire after ``ttl`` seconds.
+
+    Write paths call ``invalidate()`` for the keys they make stale, so the
+    TTL only bounds how old data can get if an invalidation is missed
+    (for example a change made directly in MySQL Workbench).
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Return the cached value, calling ``loader()`` to fill a miss.
+
+        Loads are serialised so a burst of requests on a cold cache runs
+        the loader once instead of once per request.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._load_lock:
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None and entry[1] > time.monotonic():
+                    return entry[0]
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _sizeof(value):
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, int):
+        return 8
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return len(value)
+
+
+class LRUCache:
+    """Thread-safe cache of strings (or tuples/dicts of strings and ints) bounded by their total size.
+
+    Keys are expected to carry a version (for example the catalog version),
+    so stale entries are never looked up again and simply age out: the
+    least recently used entries are evicted once the cached values add up
+    to more than ``max_bytes``. ``ttl`` optionally bounds an entry's age.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (value, size, expires_at), least recently used first
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._data[key] = (value, size, expires_at)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= evicted[1]
+                self.evictions += 1
+
+    def get_or_set(self, key, loader, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
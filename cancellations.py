@@ -0,0 +1,139 @@
+import time
+
+from holds import release_bookings
+
+# Upper bound on one admin request; a month of 4 shows a day on 30 screens
+MAX_SHOWS_PER_REQUEST = 5000
+
+
+class CancellationError(Exception):
+    """Raised for an invalid bulk cancellation; the message is user-facing."""
+
+
+def find_shows(conn, show_ids=None, screen_id=None, theatre_id=None, start_date=None, end_date=None):
+    """IDs of the shows still on sale that match every given filter."""
+    where, params = ['NOT s.Is_Cancelled', 'NOT s.Is_Archived'], []
+    if show_ids:
+        where.append(f"s.Show_ID IN ({','.join(['%s'] * len(show_ids))})")
+        params.extend(show_ids)
+    if screen_id:
+        where.append('s.Screen_ID = %s')
+        params.append(screen_id)
+    if theatre_id:
+        where.append('sc.Theatre_ID = %s')
+        params.append(theatre_id)
+    if start_date:
+        where.append('s.Show_Date >= %s')
+        params.append(start_date)
+    if end_date:
+        where.append('s.Show_Date <= %s')
+        params.append(end_date)
+    if len(where) == 2:
+        # Never cancel every show because a form field was left empty
+        raise CancellationError('Pick the shows, a screen, a theatre or a date range to cancel')
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT s.Show_ID FROM SHOWS s
+            JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+            WHERE {' AND '.join(where)}
+            ORDER BY s.Show_ID
+        """, params)
+        found = [row[0] for row in cursor.fetchall()]
+        conn.rollback()
+    finally:
+        cursor.close()
+    if len(found) > MAX_SHOWS_PER_REQUEST:
+        raise CancellationError(f'{len(found)} shows match; the limit is {MAX_SHOWS_PER_REQUEST} per request')
+    return found
+
+
+def cancel_shows(conn, show_ids, reason, chunk_size=500, progress=None):
+    """Cancel ``show_ids`` and every live booking for them.
+
+    The shows are flagged cancelled first, so no new bookings come in.
+    Then up to ``chunk_size`` bookings at a time have their seats freed,
+    are marked 'Cancelled' with their payments 'Refunded' (as
+    CancelBooking() does) and get one CANCEL_LOG row, in one short
+    transaction per chunk. ``progress`` is called with the running
+    summary after every chunk. Returns the summary with timings.
+    """
+    if not show_ids:
+        raise CancellationError('No shows to cancel')
+
+    started = time.perf_counter()
+    result = {'shows_cancelled': 0, 'bookings_cancelled': 0, 'seats_freed': 0,
+              'refunded_amount': 0.0, 'chunks': 0}
+    cursor = conn.cursor()
+
+    def report():
+        elapsed = time.perf_counter() - started
+        result['elapsed_ms'] = round(elapsed * 1000, 1)
+        result['bookings_per_second'] = round(result['bookings_cancelled'] / elapsed, 1) if elapsed else 0.0
+        if progress:
+            progress(dict(result))
+
+    def flush(booking_ids):
+        placeholders = ','.join(['%s'] * len(booking_ids))
+        cursor.execute(f"""
+            SELECT IFNULL(SUM(Total_Amount), 0) FROM BOOKING
+            WHERE Booking_ID IN ({placeholders}) AND Status = 'Confirmed'
+        """, booking_ids)
+        refunded = cursor.fetchone()[0]
+        # Logged first: trg_AfterBookingCancel skips bookings that already
+        # have a CANCEL_LOG row, so they are not logged twice
+        cursor.execute(f"""
+            INSERT INTO CANCEL_LOG (Booking_ID, Reason)
+            SELECT Booking_ID, %s FROM BOOKING WHERE Booking_ID IN ({placeholders})
+        """, [reason] + booking_ids)
+        freed = release_bookings(cursor, booking_ids, 'Cancelled', 'Refunded')
+        conn.commit()
+        result['bookings_cancelled'] += len(booking_ids)
+        result['seats_freed'] += sum(freed.values())
+        result['refunded_amount'] += float(refunded)
+        result['chunks'] += 1
+        report()
+
+    try:
+        # Stop sales first. Bookings read the flag with the SHOWS row
+        # locked, so once this commits no booking for these shows can land.
+        for offset in range(0, len(show_ids), chunk_size):
+            chunk = show_ids[offset:offset + chunk_size]
+            cursor.execute(f"""
+                UPDATE SHOWS SET Is_Cancelled = TRUE, Seat_Version = Seat_Version + 1
+                WHERE Show_ID IN ({','.join(['%s'] * len(chunk))}) AND NOT Is_Cancelled
+            """, chunk)
+            result['shows_cancelled'] += cursor.rowcount
+            conn.commit()
+
+        pending = []
+        for show_id in show_ids:
+            while True:
+                wanted = chunk_size - len(pending)
+                # Walks idx_booking_show_status; LIMIT bounds the rows locked
+                cursor.execute("""
+                    SELECT Booking_ID FROM BOOKING
+                    WHERE Show_ID = %s AND Status IN ('Pending', 'Confirmed')
+                    LIMIT %s
+                    FOR UPDATE
+                """, (show_id, wanted))
+                rows = cursor.fetchall()
+                pending.extend(row[0] for row in rows)
+                if len(pending) >= chunk_size:
+                    flush(pending)
+                    pending = []
+                if len(rows) < wanted:
+                    break
+        if pending:
+            flush(pending)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    report()
+    result['refunded_amount'] = round(result['refunded_amount'], 2)
+    return result
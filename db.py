@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the wait timeout."""
+
+
+class TracedCursor:
+    """Cursor proxy that reports every statement to the pool's listeners."""
+
+    def __init__(self, cursor, listeners):
+        self._cursor = cursor
+        self._listeners = listeners
+
+    def _notify(self, statement, params, started):
+        elapsed = time.perf_counter() - started
+        for listener in self._listeners:
+            listener(statement, params, elapsed, self._cursor.rowcount)
+
+    def execute(self, operation, params=None, multi=False):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, multi)
+        finally:
+            self._notify(operation, params, started)
+
+    def executemany(self, operation, seq_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            self._notify(operation, seq_params, started)
+
+    def callproc(self, procname, args=()):
+        started = time.perf_counter()
+        try:
+            return self._cursor.callproc(procname, args)
+        finally:
+            self._notify(f"CALL {procname}", args, started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    """Connection proxy whose cursors are TracedCursors."""
+
+    def __init__(self, conn, listeners):
+        self.raw = conn
+        self._listeners = listeners
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self.raw.cursor(*args, **kwargs), self._listeners)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class ConnectionPool:
+    """A small bounded pool of MySQL connections.
+
+    At most ``pool_size`` connections exist at any time. Idle connections
+    are reused most-recently-used first, pinged if they have been idle for
+    longer than ``ping_interval`` and thrown away once they are older than
+    ``recycle_seconds`` so MySQL's ``wait_timeout`` never bites us.
+    """
+
+    def __init__(self, db_config, pool_size=10, wait_timeout=5.0,
+                 recycle_seconds=1800, ping_interval=30):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.wait_timeout = wait_timeout
+        self.recycle_seconds = recycle_seconds
+        self.ping_interval = ping_interval
+
+        # Callables notified as listener(statement, params, seconds, rowcount)
+        self.listeners = []
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        # Each idle entry is (connection, created_at, last_used_at)
+        self._idle = deque()
+        self._created = {}
+
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connections_opened': 0,
+            'connections_recycled': 0,
+            'connections_broken': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.db_config)
+        with self._lock:
+            self._created[id(conn)] = time.monotonic()
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn, reason):
+        with self._lock:
+            self._created.pop(id(conn), None)
+            self._stats[reason] += 1
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _healthy(self, conn, created_at, last_used_at):
+        now = time.monotonic()
+        if now - created_at > self.recycle_seconds:
+            self._discard(conn, 'connections_recycled')
+            return False
+        if now - last_used_at > self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except mysql.connector.Error:
+                self._discard(conn, 'connections_broken')
+                return False
+        return True
+
+    def acquire(self):
+        """Check a connection out of the pool, waiting up to ``wait_timeout``."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(
+                f'No database connection free after {self.wait_timeout}s '
+                f'(pool size {self.pool_size})')
+
+        try:
+            conn = None
+            while conn is None:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    conn = self._open()
+                elif self._healthy(*entry):
+                    conn = entry[0]
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_ms'] += waited_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], waited_ms)
+        if self.listeners:
+            return TracedConnection(conn, self.listeners)
+        return conn
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def release(self, conn, broken=False):
+        """Return a connection, ending any transaction the request left open.
+
+        With ``broken`` the connection is closed instead, e.g. when a
+        streamed result was abandoned half-read.
+        """
+        conn = getattr(conn, 'raw', conn)
+        try:
+            if broken:
+                self._discard(conn, 'connections_broken')
+                return
+            try:
+                # Skip the round trip when the request never opened a transaction
+                if conn.in_transaction:
+                    conn.rollback()
+            except mysql.connector.Error:
+                self._discard(conn, 'connections_broken')
+                return
+            with self._lock:
+                created_at = self._created.get(id(conn), time.monotonic())
+                self._idle.append((conn, created_at, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection outside a request, e.g. from a background job."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except mysql.connector.Error:
+            # The session may be left in any state, e.g. with a setting the
+            # job could not restore; the next job gets a fresh connection
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['open'] = len(self._created)
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['pool_size'] = self.pool_size
+        stats['wait_timeout'] = self.wait_timeout
+        stats['avg_wait_ms'] = (stats['total_wait_ms'] / stats['checkouts']
+                                if stats['checkouts'] else 0.0)
+        return stats
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+import traceback
+
+
+class Subscription:
+    """One SSE client's mailbox. Slow clients overflow and get a resync."""
+
+    def __init__(self, show_id, max_queue):
+        self.show_id = show_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class AsyncSubscription(Subscription):
+    """A Subscription read by a coroutine on ``loop`` rather than a thread."""
+
+    def __init__(self, show_id, max_queue, loop):
+        self.show_id = show_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def deliver(self, message):
+        # Runs on the dispatcher thread; asyncio queues are not thread-safe
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass    # the loop has shut down
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class SeatEventHub:
+    """In-process pub/sub for seat changes, fanned out per show.
+
+    Writers call ``publish(show_id)`` after committing a seat change; one
+    dispatcher thread then builds the event once (via ``load_event``) and
+    drops it into every subscriber's queue, so the cost of a change does
+    not depend on how many clients are listening.
+
+    Changes made by other worker processes are picked up by ``poll_versions``:
+    every ``poll_interval`` seconds one query per process compares the
+    Seat_Version of the shows that have subscribers with the last version
+    published. That is the stand-in for a real broker such as Redis pub/sub.
+    """
+
+    def __init__(self, load_event, poll_versions=None, poll_interval=0.5, max_queue=32):
+        self.load_event = load_event
+        self.poll_versions = poll_versions
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+
+        self._lock = threading.Lock()
+        self._subscribers = {}   # show_id -> set of Subscription
+        self._versions = {}      # show_id -> last version published
+        self._dirty = set()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, show_id, version, loop=None):
+        """Subscribe to ``show_id``; with an event ``loop``, for a coroutine."""
+        if loop is None:
+            sub = Subscription(show_id, self.max_queue)
+        else:
+            sub = AsyncSubscription(show_id, self.max_queue, loop)
+        with self._lock:
+            self._subscribers.setdefault(show_id, set()).add(sub)
+            self._versions.setdefault(show_id, version)
+        self.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.show_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.show_id]
+                    self._versions.pop(sub.show_id, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, show_id):
+        """Note that ``show_id``'s seats changed; cheap enough for request paths."""
+        with self._lock:
+            if show_id not in self._subscribers:
+                return
+            self._dirty.add(show_id)
+        self._wakeup.set()
+
+    def broadcast(self, show_id, message):
+        """Fan a ready-made message out to every subscriber of ``show_id``."""
+        with self._lock:
+            subs = list(self._subscribers.get(show_id, ()))
+        for sub in subs:
+            sub.deliver(message)
+        self.published += 1
+        self.delivered += len(subs)
+
+    def _dispatch(self, show_id):
+        with self._lock:
+            since = self._versions.get(show_id)
+        if since is None:
+            return
+        event = self.load_event(show_id, since)
+        if event is None or event['version'] <= since:
+            return
+        with self._lock:
+            if show_id in self._versions:
+                self._versions[show_id] = event['version']
+        self.broadcast(show_id, format_sse(event, event_type='seats', event_id=event['version']))
+
+    def _poll(self):
+        with self._lock:
+            known = dict(self._versions)
+        if not known:
+            return
+        for show_id, version in self.poll_versions(list(known)).items():
+            if version > known[show_id]:
+                with self._lock:
+                    self._dirty.add(show_id)
+
+    def _loop(self):
+        next_poll = time.monotonic() + self.poll_interval
+        while True:
+            self._wakeup.wait(max(next_poll - time.monotonic(), 0))
+            self._wakeup.clear()
+            try:
+                if self.poll_versions and time.monotonic() >= next_poll:
+                    next_poll = time.monotonic() + self.poll_interval
+                    self._poll()
+                with self._lock:
+                    dirty, self._dirty = self._dirty, set()
+                for show_id in dirty:
+                    self._dispatch(show_id)
+            except Exception:
+                print("Seat event dispatcher error:")
+                traceback.print_exc()
+                time.sleep(self.poll_interval)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='seat-events', daemon=True)
+                self._thread.start()
+
+
+def format_sse(data, event_type=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event_type:
+        lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream(hub, sub, first_message=None, heartbeat=15):
+    """Generator for a text/event-stream response body."""
+    try:
+        if first_message:
+            yield first_message
+        while True:
+            if sub.overflowed:
+                # The client fell too far behind; tell it to refetch the map
+                sub.overflowed = False
+                yield format_sse({'resync': True}, event_type='resync')
+            try:
+                yield sub.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+    finally:
+        hub.unsubscribe(sub)
+
+
+async def astream(hub, sub, first_message=None, heartbeat=15):
+    """stream() for an AsyncSubscription, as an async generator."""
+    try:
+        if first_message:
+            yield first_message
+        while True:
+            if sub.overflowed:
+                sub.overflowed = False
+                yield format_sse({'resync': True}, event_type='resync')
+            try:
+                yield await sub.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,146 @@
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from pagination import plain_value
+
+CHUNK_ROWS = 1000
+
+# Seconds MySQL keeps an unbuffered result open for a client that reads
+# slowly (a download over a bad link) before aborting it; the default is 60
+NET_WRITE_TIMEOUT = 600
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Each export takes (start_date, end_date), inclusive
+EXPORTS = {
+    # Bookings by show date. No ORDER BY: sorting millions of rows would
+    # make MySQL build the whole result before sending the first row.
+    'bookings': """
+        SELECT Booking_ID, User_ID, User_Name, Movie_Title, Show_Date, Show_Time, Theatre_Name,
+               Seats_Booked, Seat_Numbers, Total_Amount, Payment_Mode, Payment_State, Booking_Status
+        FROM VIEW_BookingSummary
+        WHERE Show_Date BETWEEN %s AND %s
+    """,
+    # Payments by booking date, in idx_booking_date order (migration 013)
+    'payments': """
+        SELECT p.Payment_ID, p.Booking_ID, b.Booking_Date, b.Show_ID, b.User_ID, b.Seats_Booked,
+               b.Total_Amount, p.Amount, p.Payment_Mode, p.Payment_State, b.Status AS Booking_Status
+        FROM BOOKING b
+        JOIN PAYMENT p ON p.Booking_ID = b.Booking_ID
+        WHERE b.Booking_Date BETWEEN %s AND %s
+        ORDER BY b.Booking_Date, b.Booking_ID
+    """,
+}
+
+
+class ExportError(Exception):
+    """Raised for a bad export request; the message is user-facing."""
+
+
+def parse_range(start, end):
+    try:
+        start_date = datetime.date.fromisoformat(start)
+        end_date = datetime.date.fromisoformat(end)
+    except (TypeError, ValueError):
+        raise ExportError('start and end must be dates (YYYY-MM-DD)')
+    if end_date < start_date:
+        raise ExportError('end must not be before start')
+    return start_date, end_date
+
+
+def export_rows(pool, name, start_date, end_date, chunk_rows=CHUNK_ROWS):
+    """Yield the column names of export ``name``, then lists of rows.
+
+    Rows come from an unbuffered cursor, so MySQL streams them and only
+    ``chunk_rows`` are in Python at a time. The connection is held until
+    the generator is exhausted or closed; closed early, the half-read
+    result makes the connection unusable, so it is dropped from the pool.
+    """
+    if name not in EXPORTS:
+        raise ExportError(f"Unknown export '{name}' (one of: {', '.join(sorted(EXPORTS))})")
+    conn = pool.acquire()
+    finished = False
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET SESSION net_write_timeout = %s", (NET_WRITE_TIMEOUT,))
+        cursor.close()
+
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(EXPORTS[name], (start_date, end_date))
+        yield [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+
+        cursor = conn.cursor()
+        cursor.execute("SET SESSION net_write_timeout = DEFAULT")
+        cursor.close()
+        finished = True
+    finally:
+        pool.release(conn, broken=not finished)
+
+
+def _csv_chunks(columns, chunks, stats):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows([plain_value(value) for value in row] for row in rows)
+        stats['rows'] += len(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_chunks(columns, chunks, stats):
+    for rows in chunks:
+        lines = [json.dumps(dict(zip(columns, map(plain_value, row))), separators=(',', ':'))
+                 for row in rows]
+        stats['rows'] += len(rows)
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # 31: gzip framing
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(columns, chunks, fmt, compress=False, stats=None):
+    """Encode the rows from export_rows() as CSV or NDJSON byte chunks.
+
+    ``chunks`` is the export_rows() generator after its column names.
+    ``stats['rows']`` counts the rows written so far.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('rows', 0)
+    try:
+        encoded = (_csv_chunks if fmt == 'csv' else _ndjson_chunks)(columns, chunks, stats)
+        yield from _gzipped(encoded) if compress else encoded
+    finally:
+        chunks.close()
+
+
+def open_export(pool, name, fmt, start, end, chunk_rows=CHUNK_ROWS):
+    """Validate an export request and start its query.
+
+    Returns ``(columns, chunks)`` for stream_export(). Bad input raises
+    ExportError; database problems surface here, before any byte is sent.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}' (one of: {', '.join(FORMATS)})")
+    start_date, end_date = parse_range(start, end)
+    chunks = export_rows(pool, name, start_date, end_date, chunk_rows)
+    return next(chunks), chunks
@@ -0,0 +1,156 @@
+import heapq
+import threading
+import time
+import traceback
+from collections import Counter
+
+import mysql.connector
+
+
+def release_bookings(cursor, booking_ids, booking_status, payment_state):
+    """Free the seats of locked, unpaid bookings and close them.
+
+    The caller holds the BOOKING row locks and commits. Seats go back to
+    SHOWS.Available_Seats, the bookings get ``booking_status`` and their
+    payments ``payment_state``. Returns ``{show_id: seats_freed}``.
+    """
+    placeholders = ','.join(['%s'] * len(booking_ids))
+    cursor.execute(f"""
+        SELECT Show_ID, COUNT(*) FROM SEAT_RESERVATION
+        WHERE Booking_ID IN ({placeholders})
+        GROUP BY Show_ID
+    """, booking_ids)
+    freed = Counter(dict(cursor.fetchall()))
+
+    cursor.execute(f"""
+        UPDATE SEAT_RESERVATION SET Is_Booked = FALSE, Booking_ID = NULL
+        WHERE Booking_ID IN ({placeholders})
+    """, booking_ids)
+    for show_id, seats in freed.items():
+        cursor.execute("""
+            UPDATE SHOWS
+            SET Available_Seats = Available_Seats + %s, Seat_Version = Seat_Version + 1
+            WHERE Show_ID = %s
+        """, (seats, show_id))
+    cursor.execute(f"""
+        UPDATE BOOKING SET Status = %s, Hold_Expires_At = NULL
+        WHERE Booking_ID IN ({placeholders})
+    """, [booking_status] + booking_ids)
+    cursor.execute(f"""
+        UPDATE PAYMENT SET Payment_State = %s
+        WHERE Booking_ID IN ({placeholders})
+    """, [payment_state] + booking_ids)
+    return dict(freed)
+
+
+def release_expired_holds(conn, batch_size=500):
+    """Expire one batch of unpaid bookings whose hold has run out.
+
+    Frees their seats, gives them back to SHOWS.Available_Seats, marks the
+    bookings 'Expired' and the payments 'Failed', all in one short
+    transaction. Bookings with a payment waiting in PAYMENT_QUEUE are left
+    for the payment worker. Returns ``(bookings_expired, {show_id: seats_freed})``.
+    """
+    cursor = conn.cursor()
+    try:
+        # SKIP LOCKED: a booking that is being paid right now keeps its lock
+        # and is simply looked at again on the next sweep
+        cursor.execute("""
+            SELECT b.Booking_ID FROM BOOKING b
+            WHERE b.Status = 'Pending' AND b.Hold_Expires_At <= NOW()
+              AND NOT EXISTS (SELECT 1 FROM PAYMENT_QUEUE q
+                              WHERE q.Booking_ID = b.Booking_ID AND q.Status = 'Queued')
+            ORDER BY b.Hold_Expires_At
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        booking_ids = [row[0] for row in cursor.fetchall()]
+        if not booking_ids:
+            conn.rollback()
+            return 0, {}
+
+        freed = release_bookings(cursor, booking_ids, 'Expired', 'Failed')
+        conn.commit()
+        return len(booking_ids), freed
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+class HoldSweeper:
+    """Background thread that releases expired seat holds.
+
+    Holds made by this process are pushed onto a min-heap keyed on expiry,
+    so the sweeper wakes up right when the next one runs out. The indexed
+    BOOKING(Status, Hold_Expires_At) query is the source of truth, which
+    also catches holds made by other workers (or before a restart) within
+    ``idle_interval`` seconds.
+    """
+
+    def __init__(self, pool, on_release=None, batch_size=500, idle_interval=30):
+        self.pool = pool
+        self.on_release = on_release
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.expired_bookings = 0
+
+    def track(self, booking_id, hold_seconds):
+        with self._lock:
+            heapq.heappush(self._heap, (time.monotonic() + hold_seconds, booking_id))
+        self._wakeup.set()
+
+    def sweep(self):
+        """Release every expired hold, one batch per transaction."""
+        released = Counter()
+        with self.pool.connection() as conn:
+            while True:
+                expired, freed = release_expired_holds(conn, self.batch_size)
+                if not expired:
+                    break
+                self.expired_bookings += expired
+                released.update(freed)
+        if released and self.on_release:
+            self.on_release(list(released))
+        return dict(released)
+
+    def _next_wait(self):
+        # Half a second of grace so MySQL's NOW() is past the expiry too
+        now = time.monotonic() - 0.5
+        with self._lock:
+            due = False
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+                due = True
+            if due:
+                return 0
+            if self._heap:
+                return self._heap[0][0] - now
+        return self.idle_interval
+
+    def _loop(self):
+        next_full_sweep = time.monotonic() + self.idle_interval
+        while True:
+            wait = min(self._next_wait(), next_full_sweep - time.monotonic())
+            if wait > 0:
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+                continue
+            next_full_sweep = time.monotonic() + self.idle_interval
+            try:
+                self.sweep()
+            except Exception:
+                print("Hold sweeper error:")
+                traceback.print_exc()
+                time.sleep(1)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='hold-sweeper', daemon=True)
+            self._thread.start()
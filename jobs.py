@@ -0,0 +1,56 @@
+import threading
+import time
+import traceback
+
+
+class Scheduler:
+    """Runs maintenance jobs at fixed intervals on one background thread.
+
+    Jobs are plain functions taking no arguments. A job that raises is
+    logged and retried at its next interval; it never stops the others.
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, interval, func, run_at_start=False):
+        next_run = time.monotonic() if run_at_start else time.monotonic() + interval
+        self._jobs.append({'name': name, 'interval': interval, 'func': func,
+                           'next_run': next_run})
+
+    def job(self, name, interval, run_at_start=False):
+        """Decorator form of add_job()."""
+        def decorator(func):
+            self.add_job(name, interval, func, run_at_start)
+            return func
+        return decorator
+
+    def run_pending(self):
+        now = time.monotonic()
+        for job in self._jobs:
+            if job['next_run'] <= now:
+                job['next_run'] = now + job['interval']
+                try:
+                    job['func']()
+                except Exception:
+                    print(f"Job {job['name']} failed:")
+                    traceback.print_exc()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            if self._jobs:
+                wait = min(job['next_run'] for job in self._jobs) - time.monotonic()
+            else:
+                wait = 1
+            self._stop.wait(max(wait, 0.05))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,195 @@
+import datetime
+import re
+import threading
+from collections import Counter, defaultdict
+
+# Prometheus' default latency buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+def normalize_sql(statement):
+    """Fingerprint a statement: literals become ?, IN and VALUES lists fold.
+
+    ``SELECT ... WHERE Seat_Number IN (%s, %s, %s)`` and the same query with
+    ten seats both become ``SELECT ... WHERE Seat_Number IN (...)``.
+    """
+    sql = _COMMENT.sub(' ', statement)
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = ' '.join(sql.split())
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _VALUES_LIST.sub(r'\1, ...', sql)
+    return sql
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.total}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.total}')
+        return lines
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class QueryMetrics:
+    """Per-request database instrumentation fed by ConnectionPool listeners.
+
+    ``begin(route)``/``end(status, seconds)`` bracket a request; every statement
+    run through the pool in between is recorded against it. ``end()``
+    returns that request's summary (for the Server-Timing header) and folds
+    it into per-route and per-statement aggregates for ``render()``.
+    Statements outside a request (background jobs) count under the route
+    ``background``.
+
+    A statement slower than ``slow_query_seconds`` is appended to
+    ``slow_log_path``. A request that runs the same statement fingerprint
+    ``n_plus_one_threshold`` or more times is reported as a likely N+1.
+    """
+
+    def __init__(self, slow_query_seconds=0.2, slow_log_path='slow_queries.log', n_plus_one_threshold=5):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_log_path = slow_log_path
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._statements = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'rows': 0,
+                                                'histogram': Histogram()})
+        self._n_plus_one = Counter()
+        self.slow_queries = 0
+
+    def begin(self, route):
+        self._local.route = route
+        self._local.queries = []
+
+    def listener(self, statement, params, seconds, rowcount):
+        sql = normalize_sql(statement)
+        rows = rowcount if rowcount and rowcount > 0 else 0
+        queries = getattr(self._local, 'queries', None)
+        if queries is not None:
+            queries.append((sql, seconds, rows))
+            route = self._local.route
+        else:
+            route = 'background'
+
+        with self._lock:
+            entry = self._statements[sql]
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['rows'] += rows
+            entry['histogram'].observe(seconds)
+        if seconds >= self.slow_query_seconds:
+            self._log_slow(route, sql, seconds, rows)
+
+    def _log_slow(self, route, sql, seconds, rows):
+        # Normalised SQL only: bind values include emails and passwords
+        line = (f"{datetime.datetime.now().isoformat(timespec='milliseconds')} "
+                f"route={route} time_ms={seconds * 1000:.1f} rows={rows} sql={sql}")
+        with self._lock:
+            self.slow_queries += 1
+        if not self.slow_log_path:
+            print(f"Slow query: {line}")
+            return
+        with self._lock:
+            with open(self.slow_log_path, 'a') as f:
+                f.write(line + '\n')
+
+    def end(self, status, seconds):
+        queries = getattr(self._local, 'queries', None)
+        route = getattr(self._local, 'route', None)
+        self._local.queries = None
+        if queries is None:
+            return None
+
+        db_seconds = sum(q[1] for q in queries)
+        repeats = Counter(q[0] for q in queries)
+        suspects = [(sql, n) for sql, n in repeats.items() if n >= self.n_plus_one_threshold]
+        for sql, n in suspects:
+            print(f"Possible N+1 in {route}: {n}x {sql[:120]}")
+
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'requests': Counter(),
+                    'duration': Histogram(),
+                    'db_duration': Histogram(),
+                    'queries': Histogram(QUERY_COUNT_BUCKETS),
+                }
+            stats['requests'][status] += 1
+            stats['duration'].observe(seconds)
+            stats['db_duration'].observe(db_seconds)
+            stats['queries'].observe(len(queries))
+            for sql, n in suspects:
+                self._n_plus_one[(route, sql)] += 1
+
+        return {'queries': len(queries), 'db_seconds': db_seconds, 'n_plus_one': suspects}
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of everything recorded so far."""
+        lines = []
+        with self._lock:
+            lines.append('# TYPE http_requests_total counter')
+            for route, stats in sorted(self._routes.items()):
+                for status, count in sorted(stats['requests'].items()):
+                    lines.append(f'http_requests_total{{route="{_label(route)}",status="{status}"}} {count}')
+            for metric, key, help_text in (
+                    ('http_request_duration_seconds', 'duration', 'Wall time per request'),
+                    ('db_request_duration_seconds', 'db_duration', 'Database time per request'),
+                    ('db_queries_per_request', 'queries', 'Statements per request')):
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for route, stats in sorted(self._routes.items()):
+                    lines.extend(stats[key].render(metric, f'route="{_label(route)}"'))
+
+            lines.append('# HELP db_statement_duration_seconds Time per normalized statement')
+            lines.append('# TYPE db_statement_duration_seconds histogram')
+            for sql, entry in sorted(self._statements.items()):
+                lines.extend(entry['histogram'].render('db_statement_duration_seconds',
+                                                       f'sql="{_label(sql[:200])}"'))
+            lines.append('# TYPE db_statement_rows_total counter')
+            for sql, entry in sorted(self._statements.items()):
+                lines.append(f'db_statement_rows_total{{sql="{_label(sql[:200])}"}} {entry["rows"]}')
+
+            lines.append('# HELP db_n_plus_one_requests_total Requests that repeated one statement')
+            lines.append('# TYPE db_n_plus_one_requests_total counter')
+            for (route, sql), count in sorted(self._n_plus_one.items()):
+                lines.append(f'db_n_plus_one_requests_total{{route="{_label(route)}",sql="{_label(sql[:200])}"}} '
+                             f'{count}')
+
+            lines.append('# TYPE db_slow_queries_total counter')
+            lines.append(f'db_slow_queries_total {self.slow_queries}')
+
+        for name, value in (gauges or {}).items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,97 @@
+-- Migration 001: Let MySQL allocate primary keys
+--
+-- BOOKING, PAYMENT, USERS, SHOWS and MOVIE used to get their IDs from
+-- SELECT MAX(id) + 1, which collides under concurrent inserts and costs an
+-- extra index scan per insert. AUTO_INCREMENT hands out IDs without either
+-- problem. Existing rows keep their IDs and each counter starts after the
+-- current maximum (or at the old base value for empty tables).
+
+USE MovieBookingSystem;
+
+-- The columns are referenced by foreign keys, which MySQL refuses to
+-- modify while the checks are on.
+SET FOREIGN_KEY_CHECKS = 0;
+
+ALTER TABLE MOVIE   MODIFY Movie_ID   INT NOT NULL AUTO_INCREMENT, AUTO_INCREMENT = 101;
+ALTER TABLE SHOWS   MODIFY Show_ID    INT NOT NULL AUTO_INCREMENT, AUTO_INCREMENT = 201;
+ALTER TABLE USERS   MODIFY User_ID    INT NOT NULL AUTO_INCREMENT, AUTO_INCREMENT = 1;
+ALTER TABLE BOOKING MODIFY Booking_ID INT NOT NULL AUTO_INCREMENT, AUTO_INCREMENT = 301;
+ALTER TABLE PAYMENT MODIFY Payment_ID INT NOT NULL AUTO_INCREMENT, AUTO_INCREMENT = 401;
+
+SET FOREIGN_KEY_CHECKS = 1;
+
+-- app.py passes a poster URL to AddNewMovie; older databases may not have
+-- the column yet.
+SET @has_image_url = (SELECT COUNT(*) FROM information_schema.COLUMNS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'MOVIE'
+                        AND COLUMN_NAME = 'Image_URL');
+SET @ddl = IF(@has_image_url = 0,
+              'ALTER TABLE MOVIE ADD COLUMN Image_URL VARCHAR(500) NULL',
+              'SELECT 1');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Procedures now leave the ID to AUTO_INCREMENT. Callers read the new ID
+-- with LAST_INSERT_ID() on the same connection.
+DROP PROCEDURE IF EXISTS AddNewMovie;
+DROP PROCEDURE IF EXISTS AddShow;
+DROP PROCEDURE IF EXISTS BookTicket;
+
+DELIMITER //
+CREATE PROCEDURE AddNewMovie(
+    IN p_Title VARCHAR(200),
+    IN p_Language VARCHAR(50),
+    IN p_Genre VARCHAR(50),
+    IN p_Duration INT,
+    IN p_Rating DECIMAL(2,1),
+    IN p_ImageURL VARCHAR(500)
+)
+BEGIN
+    INSERT INTO MOVIE (Title, Language, Genre, Duration, Rating, Image_URL)
+    VALUES (p_Title, p_Language, p_Genre, p_Duration, p_Rating, p_ImageURL);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE AddShow(
+    IN p_MovieID INT,
+    IN p_ScreenID INT,
+    IN p_Time TIME,
+    IN p_Date DATE,
+    IN p_Price DECIMAL(8,2)
+)
+BEGIN
+    INSERT INTO SHOWS (Movie_ID, Screen_ID, Show_Time, Show_Date, Price)
+    VALUES (p_MovieID, p_ScreenID, p_Time, p_Date, p_Price);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE BookTicket(
+    IN p_ShowID INT,
+    IN p_UserID INT,
+    IN p_Seats INT,
+    IN p_PaymentMode VARCHAR(50)
+)
+BEGIN
+    DECLARE v_Total DECIMAL(10,2);
+    DECLARE v_BookingID INT;
+
+    -- Check seat availability
+    IF GetAvailableSeats(p_ShowID) < p_Seats THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not enough seats available!';
+    END IF;
+
+    -- Calculate total amount
+    SET v_Total = CalculateTotalAmount(p_ShowID, p_Seats);
+
+    INSERT INTO BOOKING (Show_ID, User_ID, Seats_Booked, Booking_Date, Total_Amount, Status)
+    VALUES (p_ShowID, p_UserID, p_Seats, CURDATE(), v_Total, 'Pending');
+    SET v_BookingID = LAST_INSERT_ID();
+
+    -- Payment
+    INSERT INTO PAYMENT (Booking_ID, Amount, Payment_Mode, Payment_State)
+    VALUES (v_BookingID, v_Total, p_PaymentMode, 'Pending');
+END //
+DELIMITER ;
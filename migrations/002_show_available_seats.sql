@@ -0,0 +1,136 @@
+-- Migration 002: Per-show available seat counter
+--
+-- SHOWS.Available_Seats replaces the SUM(Seats_Booked) aggregate that
+-- shows_by_movie, GetAvailableSeats() and trg_BeforeBookingInsert ran over
+-- BOOKING on every call. It is kept up to date in the same transaction as
+-- the seat changes:
+--   * booking.reserve_seats() subtracts the seats it books,
+--   * CancelBooking() adds back the seats it frees,
+--   * InitializeSeatsForShow() resets it to the screen size,
+-- and ReconcileAvailableSeats() rebuilds it from SEAT_RESERVATION.
+
+USE MovieBookingSystem;
+
+ALTER TABLE SHOWS ADD COLUMN Available_Seats INT NULL;
+
+-- Backfill: free seat rows where the seat map exists, otherwise the screen size
+UPDATE SHOWS s
+JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+LEFT JOIN (
+    SELECT Show_ID, SUM(Is_Booked = FALSE) as Free_Seats
+    FROM SEAT_RESERVATION
+    GROUP BY Show_ID
+) r ON r.Show_ID = s.Show_ID
+SET s.Available_Seats = IFNULL(r.Free_Seats, sc.Total_Seats);
+
+-- New shows start with every seat of their screen available. The column
+-- stays nullable so inserts that omit it reach this trigger.
+DELIMITER //
+CREATE TRIGGER trg_BeforeShowInsert
+BEFORE INSERT ON SHOWS
+FOR EACH ROW
+BEGIN
+    DECLARE v_ScreenSeats INT;
+    IF NEW.Available_Seats IS NULL THEN
+        SELECT Total_Seats INTO v_ScreenSeats FROM SCREEN WHERE Screen_ID = NEW.Screen_ID;
+        SET NEW.Available_Seats = v_ScreenSeats;
+    END IF;
+END //
+DELIMITER ;
+
+DROP FUNCTION IF EXISTS GetAvailableSeats;
+DROP PROCEDURE IF EXISTS InitializeSeatsForShow;
+DROP PROCEDURE IF EXISTS CancelBooking;
+
+DELIMITER //
+CREATE FUNCTION GetAvailableSeats(p_ShowID INT)
+RETURNS INT
+READS SQL DATA
+BEGIN
+    DECLARE available INT;
+    SELECT Available_Seats INTO available FROM SHOWS WHERE Show_ID = p_ShowID;
+    RETURN available;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE InitializeSeatsForShow(IN p_ShowID INT)
+BEGIN
+    DECLARE total_seats INT;
+    DECLARE i INT DEFAULT 1;
+    DECLARE rows1 INT DEFAULT 1;
+    DECLARE seats_per_row INT DEFAULT 10;
+    DECLARE seat_number VARCHAR(10);
+    
+    -- Get total seats for the screen
+    SELECT Total_Seats INTO total_seats 
+    FROM SCREEN sc 
+    JOIN SHOWS sh ON sc.Screen_ID = sh.Screen_ID 
+    WHERE sh.Show_ID = p_ShowID;
+    
+    -- Calculate rows and seats per row
+    SET seats_per_row = 10;
+    SET rows1 = CEIL(total_seats / seats_per_row);
+    
+    -- Delete existing seats for this show
+    DELETE FROM SEAT_RESERVATION WHERE Show_ID = p_ShowID;
+    
+    -- Insert new seats
+    WHILE i <= total_seats DO
+        SET seat_number = CONCAT(CHAR(64 + CEIL(i / seats_per_row)), MOD(i-1, seats_per_row) + 1);
+        INSERT INTO SEAT_RESERVATION (Show_ID, Seat_Number, Is_Booked) 
+        VALUES (p_ShowID, seat_number, FALSE);
+        SET i = i + 1;
+    END WHILE;
+
+    -- Every seat is free again
+    UPDATE SHOWS SET Available_Seats = total_seats WHERE Show_ID = p_ShowID;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE CancelBooking(IN p_BookingID INT)
+BEGIN
+    DECLARE v_ShowID INT;
+    DECLARE v_Status VARCHAR(50);
+
+    -- Lock the booking so two cancellations cannot both hand the seats back
+    SELECT Show_ID, Status INTO v_ShowID, v_Status
+    FROM BOOKING WHERE Booking_ID = p_BookingID
+    FOR UPDATE;
+
+    IF v_ShowID IS NOT NULL AND v_Status != 'Cancelled' THEN
+        UPDATE SEAT_RESERVATION
+        SET Is_Booked = FALSE, Booking_ID = NULL
+        WHERE Show_ID = v_ShowID AND Booking_ID = p_BookingID;
+
+        UPDATE SHOWS SET Available_Seats = Available_Seats + ROW_COUNT()
+        WHERE Show_ID = v_ShowID;
+
+        UPDATE BOOKING SET Status = 'Cancelled' WHERE Booking_ID = p_BookingID;
+        UPDATE PAYMENT SET Payment_State = 'Refunded' WHERE Booking_ID = p_BookingID;
+    END IF;
+END //
+DELIMITER ;
+
+-- Rebuilds the counter for a range of shows from SEAT_RESERVATION and
+-- returns how many shows had drifted. Run in ranges so each call only
+-- locks a slice of the seat table.
+DELIMITER //
+CREATE PROCEDURE ReconcileAvailableSeats(IN p_FromShowID INT, IN p_ToShowID INT)
+BEGIN
+    UPDATE SHOWS s
+    JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+    LEFT JOIN (
+        SELECT Show_ID, SUM(Is_Booked = FALSE) as Free_Seats
+        FROM SEAT_RESERVATION
+        WHERE Show_ID BETWEEN p_FromShowID AND p_ToShowID
+        GROUP BY Show_ID
+    ) r ON r.Show_ID = s.Show_ID
+    SET s.Available_Seats = IFNULL(r.Free_Seats, sc.Total_Seats)
+    WHERE s.Show_ID BETWEEN p_FromShowID AND p_ToShowID
+      AND s.Available_Seats <> IFNULL(r.Free_Seats, sc.Total_Seats);
+
+    SELECT ROW_COUNT() as Corrected;
+END //
+DELIMITER ;
@@ -0,0 +1,80 @@
+-- Migration 003: Per-show seat map version
+--
+-- SHOWS.Seat_Version goes up by one in the same transaction as every change
+-- to a show's SEAT_RESERVATION rows. /api/seats uses it as the ETag and
+-- as the "since" cursor for delta responses, and seatmap.SeatMapCache uses
+-- it to tell whether its cached bitmap is still current.
+--
+-- CancelBooking also keeps ROW_COUNT() of the seat UPDATE in v_Freed
+-- before using it, rather than reading it inside the next UPDATE.
+
+USE MovieBookingSystem;
+
+ALTER TABLE SHOWS ADD COLUMN Seat_Version INT NOT NULL DEFAULT 0;
+
+DROP PROCEDURE IF EXISTS InitializeSeatsForShow;
+DROP PROCEDURE IF EXISTS CancelBooking;
+
+DELIMITER //
+CREATE PROCEDURE InitializeSeatsForShow(IN p_ShowID INT)
+BEGIN
+    DECLARE total_seats INT;
+    DECLARE i INT DEFAULT 1;
+    DECLARE rows1 INT DEFAULT 1;
+    DECLARE seats_per_row INT DEFAULT 10;
+    DECLARE seat_number VARCHAR(10);
+    
+    -- Get total seats for the screen
+    SELECT Total_Seats INTO total_seats 
+    FROM SCREEN sc 
+    JOIN SHOWS sh ON sc.Screen_ID = sh.Screen_ID 
+    WHERE sh.Show_ID = p_ShowID;
+    
+    -- Calculate rows and seats per row
+    SET seats_per_row = 10;
+    SET rows1 = CEIL(total_seats / seats_per_row);
+    
+    -- Delete existing seats for this show
+    DELETE FROM SEAT_RESERVATION WHERE Show_ID = p_ShowID;
+    
+    -- Insert new seats
+    WHILE i <= total_seats DO
+        SET seat_number = CONCAT(CHAR(64 + CEIL(i / seats_per_row)), MOD(i-1, seats_per_row) + 1);
+        INSERT INTO SEAT_RESERVATION (Show_ID, Seat_Number, Is_Booked) 
+        VALUES (p_ShowID, seat_number, FALSE);
+        SET i = i + 1;
+    END WHILE;
+
+    -- Every seat is free again
+    UPDATE SHOWS SET Available_Seats = total_seats, Seat_Version = Seat_Version + 1
+    WHERE Show_ID = p_ShowID;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE CancelBooking(IN p_BookingID INT)
+BEGIN
+    DECLARE v_ShowID INT;
+    DECLARE v_Status VARCHAR(50);
+    DECLARE v_Freed INT;
+
+    -- Lock the booking so two cancellations cannot both hand the seats back
+    SELECT Show_ID, Status INTO v_ShowID, v_Status
+    FROM BOOKING WHERE Booking_ID = p_BookingID
+    FOR UPDATE;
+
+    IF v_ShowID IS NOT NULL AND v_Status != 'Cancelled' THEN
+        UPDATE SEAT_RESERVATION
+        SET Is_Booked = FALSE, Booking_ID = NULL
+        WHERE Show_ID = v_ShowID AND Booking_ID = p_BookingID;
+        SET v_Freed = ROW_COUNT();
+
+        UPDATE SHOWS
+        SET Available_Seats = Available_Seats + v_Freed, Seat_Version = Seat_Version + 1
+        WHERE Show_ID = v_ShowID;
+
+        UPDATE BOOKING SET Status = 'Cancelled' WHERE Booking_ID = p_BookingID;
+        UPDATE PAYMENT SET Payment_State = 'Refunded' WHERE Booking_ID = p_BookingID;
+    END IF;
+END //
+DELIMITER ;
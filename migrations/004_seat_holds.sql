@@ -0,0 +1,71 @@
+-- Migration 004: Time-boxed seat holds for unpaid bookings
+--
+-- A new booking holds its seats until BOOKING.Hold_Expires_At. Completing
+-- the payment through UpdatePaymentStatus() promotes the hold to a
+-- confirmed booking; otherwise the hold sweeper (holds.py) marks the
+-- booking 'Expired', the payment 'Failed' and frees the seats.
+-- Bookings made before this migration have no expiry and are left alone.
+
+USE MovieBookingSystem;
+
+ALTER TABLE BOOKING ADD COLUMN Hold_Expires_At DATETIME NULL;
+
+-- The sweeper's "what has expired?" query is a range scan on this index
+CREATE INDEX idx_booking_hold ON BOOKING (Status, Hold_Expires_At);
+
+DROP PROCEDURE IF EXISTS UpdatePaymentStatus;
+DROP PROCEDURE IF EXISTS CancelBooking;
+
+DELIMITER //
+CREATE PROCEDURE UpdatePaymentStatus(IN p_BookingID INT, IN p_State VARCHAR(50))
+BEGIN
+    DECLARE v_Status VARCHAR(50);
+
+    -- Serialises with the hold sweeper, which locks expired bookings
+    SELECT Status INTO v_Status FROM BOOKING
+    WHERE Booking_ID = p_BookingID
+    FOR UPDATE;
+
+    IF p_State = 'Completed' THEN
+        IF v_Status IS NULL OR v_Status NOT IN ('Pending', 'Confirmed') THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Booking is no longer awaiting payment (the seat hold may have expired)';
+        END IF;
+        UPDATE PAYMENT SET Payment_State = p_State WHERE Booking_ID = p_BookingID;
+        UPDATE BOOKING SET Status = 'Confirmed', Hold_Expires_At = NULL
+        WHERE Booking_ID = p_BookingID;
+    ELSE
+        UPDATE PAYMENT SET Payment_State = p_State WHERE Booking_ID = p_BookingID;
+        UPDATE BOOKING SET Status = 'Pending' WHERE Booking_ID = p_BookingID AND Status != 'Expired';
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE CancelBooking(IN p_BookingID INT)
+BEGIN
+    DECLARE v_ShowID INT;
+    DECLARE v_Status VARCHAR(50);
+    DECLARE v_Freed INT;
+
+    -- Lock the booking so two cancellations cannot both hand the seats back
+    SELECT Show_ID, Status INTO v_ShowID, v_Status
+    FROM BOOKING WHERE Booking_ID = p_BookingID
+    FOR UPDATE;
+
+    -- Expired holds have already released their seats and were never paid
+    IF v_Status IN ('Pending', 'Confirmed') THEN
+        UPDATE SEAT_RESERVATION
+        SET Is_Booked = FALSE, Booking_ID = NULL
+        WHERE Show_ID = v_ShowID AND Booking_ID = p_BookingID;
+        SET v_Freed = ROW_COUNT();
+
+        UPDATE SHOWS
+        SET Available_Seats = Available_Seats + v_Freed, Seat_Version = Seat_Version + 1
+        WHERE Show_ID = v_ShowID;
+
+        UPDATE BOOKING SET Status = 'Cancelled' WHERE Booking_ID = p_BookingID;
+        UPDATE PAYMENT SET Payment_State = 'Refunded' WHERE Booking_ID = p_BookingID;
+    END IF;
+END //
+DELIMITER ;
@@ -0,0 +1,53 @@
+-- Migration 005: Set-based seat map generation
+--
+-- InitializeSeatsForShow used to insert one seat per WHILE iteration.
+-- SEAT_NUMBERS is a small helper table of the integers 1..1000, so a whole
+-- seat map (or the seat maps of a whole batch of shows) is generated by a
+-- single INSERT ... SELECT joined against it.
+
+USE MovieBookingSystem;
+
+CREATE TABLE SEAT_NUMBERS (
+    n INT PRIMARY KEY
+);
+
+INSERT INTO SEAT_NUMBERS (n)
+SELECT a.d + b.d * 10 + c.d * 100 + 1
+FROM (SELECT 0 AS d UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9) a,
+     (SELECT 0 AS d UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9) b,
+     (SELECT 0 AS d UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9) c;
+
+DROP PROCEDURE IF EXISTS InitializeSeatsForShow;
+DROP PROCEDURE IF EXISTS InitializeSeatsForShows;
+
+-- (Re)creates the seat maps of every show with an ID in the range, ten
+-- seats per row: A1..A10, B1..B10, ...
+DELIMITER //
+CREATE PROCEDURE InitializeSeatsForShows(IN p_FromShowID INT, IN p_ToShowID INT)
+BEGIN
+    DELETE FROM SEAT_RESERVATION
+    WHERE Show_ID BETWEEN p_FromShowID AND p_ToShowID;
+
+    INSERT INTO SEAT_RESERVATION (Show_ID, Seat_Number, Is_Booked)
+    SELECT s.Show_ID,
+           CONCAT(CHAR(64 + CEIL(n.n / 10)), MOD(n.n - 1, 10) + 1),
+           FALSE
+    FROM SHOWS s
+    JOIN SCREEN sc ON sc.Screen_ID = s.Screen_ID
+    JOIN SEAT_NUMBERS n ON n.n <= sc.Total_Seats
+    WHERE s.Show_ID BETWEEN p_FromShowID AND p_ToShowID;
+
+    -- Every seat is free again
+    UPDATE SHOWS s
+    JOIN SCREEN sc ON sc.Screen_ID = s.Screen_ID
+    SET s.Available_Seats = sc.Total_Seats, s.Seat_Version = s.Seat_Version + 1
+    WHERE s.Show_ID BETWEEN p_FromShowID AND p_ToShowID;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE InitializeSeatsForShow(IN p_ShowID INT)
+BEGIN
+    CALL InitializeSeatsForShows(p_ShowID, p_ShowID);
+END //
+DELIMITER ;
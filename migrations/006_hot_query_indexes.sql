@@ -0,0 +1,56 @@
+-- Migration 006: Indexes for the hot queries in app.py
+--
+-- The base schema only has primary keys, unique_seat_show and the indexes
+-- InnoDB creates for foreign keys, so the home page, the show listing and
+-- the revenue stats scanned whole tables. Each index below is named after
+-- the query it serves; `flask --app app explain-audit` checks the plans.
+--
+-- USERS needs nothing new: Email is UNIQUE, so the login lookup
+-- (Email = ? AND Password = ?) is already a single-row const read.
+
+USE MovieBookingSystem;
+
+-- Home page "upcoming shows": WHERE Show_Date >= CURDATE()
+-- ORDER BY Show_Date, Show_Time LIMIT 6 reads the first six index entries
+CREATE INDEX idx_shows_date_time ON SHOWS (Show_Date, Show_Time);
+
+-- shows_by_movie: WHERE Movie_ID = ? AND Show_Date >= CURDATE()
+-- ORDER BY Show_Date, Show_Time, with no filesort
+CREATE INDEX idx_shows_movie_date ON SHOWS (Movie_ID, Show_Date, Show_Time);
+
+-- CalculateMovieRevenue() and per-show booking lookups by status; covers
+-- SUM(Total_Amount) so the rows themselves are never read
+CREATE INDEX idx_booking_show_status ON BOOKING (Show_ID, Status, Total_Amount);
+
+-- Admin total revenue: SUM(Total_Amount) WHERE Status = 'Confirmed'
+CREATE INDEX idx_booking_status_amount ON BOOKING (Status, Total_Amount);
+
+-- Featured movies (ORDER BY Rating DESC LIMIT 3) and the Title-ordered
+-- movie lists read these indexes in order instead of sorting
+CREATE INDEX idx_movie_rating ON MOVIE (Rating);
+CREATE INDEX idx_movie_title ON MOVIE (Title);
+
+-- my_bookings now filters on User_ID (the FK index on BOOKING.User_ID)
+-- instead of the user's name, so the view has to expose it
+CREATE OR REPLACE VIEW VIEW_BookingSummary AS
+SELECT
+    b.Booking_ID,
+    b.User_ID,
+    u.Name AS User_Name,
+    m.Title AS Movie_Title,
+    sh.Show_Date,
+    sh.Show_Time,
+    t.Name AS Theatre_Name,
+    b.Seats_Booked,
+    b.Seat_Numbers,
+    b.Total_Amount,
+    p.Payment_Mode,
+    p.Payment_State,
+    b.Status AS Booking_Status
+FROM BOOKING b
+JOIN USERS u ON b.User_ID = u.User_ID
+JOIN SHOWS sh ON b.Show_ID = sh.Show_ID
+JOIN MOVIE m ON sh.Movie_ID = m.Movie_ID
+JOIN SCREEN sc ON sh.Screen_ID = sc.Screen_ID
+JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+JOIN PAYMENT p ON b.Booking_ID = p.Booking_ID;
@@ -0,0 +1,115 @@
+-- Migration 007: Pre-aggregated booking and revenue rollups
+--
+-- The admin dashboard and /queries used to aggregate the whole BOOKING
+-- table on every page view. They now read these rollups instead:
+--
+--   BOOKING_ROLLUP           bookings, seats and revenue per
+--                            (movie, theatre, show date, status)
+--   MOVIE_BOOKING_TOTALS     the same per (movie, status)
+--   THEATRE_BOOKING_TOTALS   the same per (theatre, status)
+--
+-- Triggers on BOOKING append the (movie, theatre, show date) group of every
+-- inserted, updated or deleted booking to BOOKING_CHANGES. The delta job in
+-- rollups.py recomputes just those groups from the raw tables and applies
+-- the difference to the totals, so the booking path never waits on a
+-- shared rollup row. Moving a show to another date or screen outside the
+-- app needs `flask --app app rollup-refresh --rebuild`.
+
+USE MovieBookingSystem;
+
+CREATE TABLE BOOKING_ROLLUP (
+    Movie_ID INT NOT NULL,
+    Theatre_ID INT NOT NULL,
+    Show_Date DATE NOT NULL,
+    Status VARCHAR(50) NOT NULL,
+    Bookings INT NOT NULL DEFAULT 0,
+    Seats INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Movie_ID, Theatre_ID, Show_Date, Status),
+    INDEX idx_rollup_theatre_date (Theatre_ID, Show_Date),
+    INDEX idx_rollup_date (Show_Date)
+);
+
+CREATE TABLE MOVIE_BOOKING_TOTALS (
+    Movie_ID INT NOT NULL,
+    Status VARCHAR(50) NOT NULL,
+    Bookings INT NOT NULL DEFAULT 0,
+    Seats INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Movie_ID, Status)
+);
+
+CREATE TABLE THEATRE_BOOKING_TOTALS (
+    Theatre_ID INT NOT NULL,
+    Status VARCHAR(50) NOT NULL,
+    Bookings INT NOT NULL DEFAULT 0,
+    Seats INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (Theatre_ID, Status)
+);
+
+CREATE TABLE BOOKING_CHANGES (
+    Change_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Movie_ID INT NOT NULL,
+    Theatre_ID INT NOT NULL,
+    Show_Date DATE NOT NULL,
+    Changed_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+DELIMITER //
+CREATE TRIGGER trg_AfterBookingInsertRollup
+AFTER INSERT ON BOOKING
+FOR EACH ROW
+BEGIN
+    INSERT INTO BOOKING_CHANGES (Movie_ID, Theatre_ID, Show_Date)
+    SELECT s.Movie_ID, sc.Theatre_ID, s.Show_Date
+    FROM SHOWS s JOIN SCREEN sc ON sc.Screen_ID = s.Screen_ID
+    WHERE s.Show_ID = NEW.Show_ID;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterBookingUpdateRollup
+AFTER UPDATE ON BOOKING
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.Status <=> OLD.Status) OR NEW.Total_Amount <> OLD.Total_Amount
+       OR NEW.Seats_Booked <> OLD.Seats_Booked OR NEW.Show_ID <> OLD.Show_ID THEN
+        INSERT INTO BOOKING_CHANGES (Movie_ID, Theatre_ID, Show_Date)
+        SELECT s.Movie_ID, sc.Theatre_ID, s.Show_Date
+        FROM SHOWS s JOIN SCREEN sc ON sc.Screen_ID = s.Screen_ID
+        WHERE s.Show_ID IN (OLD.Show_ID, NEW.Show_ID);
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterBookingDeleteRollup
+AFTER DELETE ON BOOKING
+FOR EACH ROW
+BEGIN
+    INSERT INTO BOOKING_CHANGES (Movie_ID, Theatre_ID, Show_Date)
+    SELECT s.Movie_ID, sc.Theatre_ID, s.Show_Date
+    FROM SHOWS s JOIN SCREEN sc ON sc.Screen_ID = s.Screen_ID
+    WHERE s.Show_ID = OLD.Show_ID;
+END //
+DELIMITER ;
+
+-- Backfill from the existing bookings
+INSERT INTO BOOKING_ROLLUP (Movie_ID, Theatre_ID, Show_Date, Status, Bookings, Seats, Revenue)
+SELECT s.Movie_ID, sc.Theatre_ID, s.Show_Date, IFNULL(b.Status, 'Pending'),
+       COUNT(*), SUM(b.Seats_Booked), SUM(b.Total_Amount)
+FROM BOOKING b
+JOIN SHOWS s ON b.Show_ID = s.Show_ID
+JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+GROUP BY s.Movie_ID, sc.Theatre_ID, s.Show_Date, IFNULL(b.Status, 'Pending');
+
+INSERT INTO MOVIE_BOOKING_TOTALS (Movie_ID, Status, Bookings, Seats, Revenue)
+SELECT Movie_ID, Status, SUM(Bookings), SUM(Seats), SUM(Revenue)
+FROM BOOKING_ROLLUP
+GROUP BY Movie_ID, Status;
+
+INSERT INTO THEATRE_BOOKING_TOTALS (Theatre_ID, Status, Bookings, Seats, Revenue)
+SELECT Theatre_ID, Status, SUM(Bookings), SUM(Seats), SUM(Revenue)
+FROM BOOKING_ROLLUP
+GROUP BY Theatre_ID, Status;
@@ -0,0 +1,12 @@
+-- Migration 008: Indexes for the paginated, filtered listings
+--
+-- /movies and /api/movies page through MOVIE in (Title, Movie_ID) order,
+-- optionally filtered by language or genre; /shows filters on theatre city.
+-- InnoDB secondary indexes end with the primary key, so each of these
+-- also covers the Movie_ID/Theatre_ID tie-breaker of the sort key.
+
+USE MovieBookingSystem;
+
+CREATE INDEX idx_movie_language_title ON MOVIE (Language, Title);
+CREATE INDEX idx_movie_genre_title ON MOVIE (Genre, Title);
+CREATE INDEX idx_theatre_city ON THEATRE (City);
@@ -0,0 +1,29 @@
+-- Migration 009: Queue payment outcomes and apply them in batches
+--
+-- /pay used to call UpdatePaymentStatus() inside the request. It now
+-- records the outcome in PAYMENT_QUEUE and returns; the payment worker
+-- (payments.py) applies queued outcomes a batch per short transaction.
+-- One row per booking, so a double-submitted payment is queued once.
+--
+-- trg_AfterPaymentUpdate is dropped: it re-ran an UPDATE BOOKING for
+-- every payment row, and every path that completes a payment
+-- (UpdatePaymentStatus and the worker) now sets BOOKING.Status itself.
+
+USE MovieBookingSystem;
+
+CREATE TABLE PAYMENT_QUEUE (
+    Job_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Booking_ID INT NOT NULL,
+    Outcome VARCHAR(20) NOT NULL,             -- 'Completed' or 'Failed'
+    Status VARCHAR(20) NOT NULL DEFAULT 'Queued',
+                                              -- Queued, Done, Rejected, Error
+    Attempts INT NOT NULL DEFAULT 0,
+    Last_Error VARCHAR(255) NULL,
+    Created_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Available_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Processed_At DATETIME NULL,
+    UNIQUE KEY unique_payment_job (Booking_ID),
+    INDEX idx_payment_queue_ready (Status, Available_At)
+);
+
+DROP TRIGGER IF EXISTS trg_AfterPaymentUpdate;
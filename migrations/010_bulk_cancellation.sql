@@ -0,0 +1,30 @@
+-- Migration 010: Cancel whole shows in bulk
+--
+-- When a screen goes down every booking for its shows has to be cancelled.
+-- The admin bulk-cancel (cancellations.py) first flags the shows with
+-- SHOWS.Is_Cancelled, which stops new bookings, and then cancels their
+-- bookings in short chunked transactions.
+--
+-- trg_AfterBookingCancel wrote one CANCEL_LOG row per cancelled booking.
+-- The bulk path writes the log with one INSERT ... SELECT per chunk and
+-- sets @skip_cancel_log for its session so the rows are not logged twice.
+-- CANCEL_LOG.Reason records why a show was cancelled.
+
+USE MovieBookingSystem;
+
+ALTER TABLE SHOWS ADD COLUMN Is_Cancelled BOOLEAN NOT NULL DEFAULT FALSE;
+
+ALTER TABLE CANCEL_LOG ADD COLUMN Reason VARCHAR(255) NULL;
+
+DROP TRIGGER IF EXISTS trg_AfterBookingCancel;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterBookingCancel
+AFTER UPDATE ON BOOKING
+FOR EACH ROW
+BEGIN
+    IF NEW.Status = 'Cancelled' AND OLD.Status != 'Cancelled' AND @skip_cancel_log IS NULL THEN
+        INSERT INTO CANCEL_LOG (Booking_ID) VALUES (NEW.Booking_ID);
+    END IF;
+END //
+DELIMITER ;
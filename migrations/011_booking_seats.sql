@@ -0,0 +1,52 @@
+-- Migration 011: Keep seat ownership in SEAT_RESERVATION only
+--
+-- A booking's seats were stored twice: as the comma-joined
+-- BOOKING.Seat_Numbers string and as SEAT_RESERVATION.Booking_ID. The
+-- string capped group bookings at 255 characters and "who holds F7"
+-- could only be answered with string matching. SEAT_RESERVATION is now
+-- the only record: its Booking_ID is indexed, live bookings that only
+-- had Seat_Numbers are backfilled, and the column is dropped.
+-- VIEW_BookingSummary lists the seats from SEAT_RESERVATION, so a
+-- cancelled or expired booking, whose seats were freed, shows none.
+
+USE MovieBookingSystem;
+
+-- Backfill live bookings whose seats were never linked
+UPDATE SEAT_RESERVATION sr
+JOIN BOOKING b ON b.Show_ID = sr.Show_ID AND FIND_IN_SET(sr.Seat_Number, b.Seat_Numbers)
+SET sr.Booking_ID = b.Booking_ID, sr.Is_Booked = TRUE
+WHERE b.Status IN ('Pending', 'Confirmed') AND sr.Booking_ID IS NULL;
+
+-- Newly booked seats change the free-seat counters
+CALL ReconcileAvailableSeats(0, 2147483647);
+
+-- Replaces the index MySQL created for the Booking_ID foreign key and
+-- also covers the seat list of a booking
+CREATE INDEX idx_seat_booking ON SEAT_RESERVATION (Booking_ID, Seat_Number);
+
+ALTER TABLE BOOKING DROP COLUMN Seat_Numbers;
+
+CREATE OR REPLACE VIEW VIEW_BookingSummary AS
+SELECT
+    b.Booking_ID,
+    b.User_ID,
+    u.Name AS User_Name,
+    m.Title AS Movie_Title,
+    sh.Show_Date,
+    sh.Show_Time,
+    t.Name AS Theatre_Name,
+    b.Seats_Booked,
+    (SELECT GROUP_CONCAT(sr.Seat_Number ORDER BY sr.Reservation_ID SEPARATOR ',')
+     FROM SEAT_RESERVATION sr
+     WHERE sr.Booking_ID = b.Booking_ID) AS Seat_Numbers,
+    b.Total_Amount,
+    p.Payment_Mode,
+    p.Payment_State,
+    b.Status AS Booking_Status
+FROM BOOKING b
+JOIN USERS u ON b.User_ID = u.User_ID
+JOIN SHOWS sh ON b.Show_ID = sh.Show_ID
+JOIN MOVIE m ON sh.Movie_ID = m.Movie_ID
+JOIN SCREEN sc ON sh.Screen_ID = sc.Screen_ID
+JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+JOIN PAYMENT p ON b.Booking_ID = p.Booking_ID;
@@ -0,0 +1,76 @@
+-- Migration 012: A version number for the movie/show catalog
+--
+-- The movie list, the shows of a movie and the home page are cached as
+-- rendered HTML and served with ETags keyed on CATALOG_VERSION.Version
+-- (see app.py). Triggers bump it whenever a movie or show is added,
+-- removed or changed, from the app or from anywhere else. Seat bookings
+-- only touch SHOWS.Available_Seats and Seat_Version, which do not count
+-- as catalog changes.
+
+USE MovieBookingSystem;
+
+CREATE TABLE CATALOG_VERSION (
+    Name VARCHAR(20) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 1,
+    Updated_At TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO CATALOG_VERSION (Name) VALUES ('catalog');
+
+DELIMITER //
+CREATE TRIGGER trg_AfterMovieInsertCatalog
+AFTER INSERT ON MOVIE
+FOR EACH ROW
+BEGIN
+    UPDATE CATALOG_VERSION SET Version = Version + 1 WHERE Name = 'catalog';
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterMovieUpdateCatalog
+AFTER UPDATE ON MOVIE
+FOR EACH ROW
+BEGIN
+    UPDATE CATALOG_VERSION SET Version = Version + 1 WHERE Name = 'catalog';
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterMovieDeleteCatalog
+AFTER DELETE ON MOVIE
+FOR EACH ROW
+BEGIN
+    UPDATE CATALOG_VERSION SET Version = Version + 1 WHERE Name = 'catalog';
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterShowInsertCatalog
+AFTER INSERT ON SHOWS
+FOR EACH ROW
+BEGIN
+    UPDATE CATALOG_VERSION SET Version = Version + 1 WHERE Name = 'catalog';
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterShowUpdateCatalog
+AFTER UPDATE ON SHOWS
+FOR EACH ROW
+BEGIN
+    IF NEW.Movie_ID <> OLD.Movie_ID OR NEW.Screen_ID <> OLD.Screen_ID
+       OR NEW.Show_Date <> OLD.Show_Date OR NEW.Show_Time <> OLD.Show_Time
+       OR NEW.Price <> OLD.Price OR NEW.Is_Cancelled <> OLD.Is_Cancelled THEN
+        UPDATE CATALOG_VERSION SET Version = Version + 1 WHERE Name = 'catalog';
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterShowDeleteCatalog
+AFTER DELETE ON SHOWS
+FOR EACH ROW
+BEGIN
+    UPDATE CATALOG_VERSION SET Version = Version + 1 WHERE Name = 'catalog';
+END //
+DELIMITER ;
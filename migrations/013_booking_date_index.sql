@@ -0,0 +1,10 @@
+-- Migration 013: Index for the finance exports
+--
+-- The payments export (exports.py) reads BOOKING by Booking_Date range
+-- in (Booking_Date, Booking_ID) order. With this index MySQL streams the
+-- rows in index order instead of scanning and sorting the whole table
+-- before sending the first one.
+
+USE MovieBookingSystem;
+
+CREATE INDEX idx_booking_date ON BOOKING (Booking_Date);
@@ -0,0 +1,83 @@
+-- Migration 014: Archive the seat rows of finished shows
+--
+-- Every show keeps one SEAT_RESERVATION row per seat forever, so the
+-- table grows by 100-200 rows per show and seat lookups slow down with
+-- it. Once a show is over, only who sat where still matters: the
+-- archiver (archive.py) copies each booking's seat list into one
+-- SEAT_ARCHIVE row, deletes the show's SEAT_RESERVATION rows and flags
+-- the show SHOWS.Is_Archived, in one transaction per batch of shows.
+-- BOOKING, PAYMENT and the rollups are untouched, so booking history
+-- and revenue reports read the same as before.
+--
+-- SEAT_RESERVATION is not range-partitioned by show date instead:
+-- InnoDB does not allow foreign keys on partitioned tables, and every
+-- unique key (unique_seat_show) would have to include the date column.
+--
+-- VIEW_BookingSummary falls back to SEAT_ARCHIVE for the seats of an
+-- archived show. ReconcileAvailableSeats skips archived shows, which no
+-- longer have seat rows to count.
+
+USE MovieBookingSystem;
+
+CREATE TABLE SEAT_ARCHIVE (
+    Booking_ID INT PRIMARY KEY,
+    Show_ID INT NOT NULL,
+    Seat_Numbers TEXT NOT NULL,
+    Archived_On TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (Booking_ID) REFERENCES BOOKING(Booking_ID),
+    INDEX idx_seat_archive_show (Show_ID)
+);
+
+ALTER TABLE SHOWS ADD COLUMN Is_Archived BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- The archiver's "finished and not yet archived" scan
+CREATE INDEX idx_shows_archived_date ON SHOWS (Is_Archived, Show_Date);
+
+CREATE OR REPLACE VIEW VIEW_BookingSummary AS
+SELECT
+    b.Booking_ID,
+    b.User_ID,
+    u.Name AS User_Name,
+    m.Title AS Movie_Title,
+    sh.Show_Date,
+    sh.Show_Time,
+    t.Name AS Theatre_Name,
+    b.Seats_Booked,
+    IF(sh.Is_Archived,
+       (SELECT sa.Seat_Numbers FROM SEAT_ARCHIVE sa WHERE sa.Booking_ID = b.Booking_ID),
+       (SELECT GROUP_CONCAT(sr.Seat_Number ORDER BY sr.Reservation_ID SEPARATOR ',')
+        FROM SEAT_RESERVATION sr
+        WHERE sr.Booking_ID = b.Booking_ID)) AS Seat_Numbers,
+    b.Total_Amount,
+    p.Payment_Mode,
+    p.Payment_State,
+    b.Status AS Booking_Status
+FROM BOOKING b
+JOIN USERS u ON b.User_ID = u.User_ID
+JOIN SHOWS sh ON b.Show_ID = sh.Show_ID
+JOIN MOVIE m ON sh.Movie_ID = m.Movie_ID
+JOIN SCREEN sc ON sh.Screen_ID = sc.Screen_ID
+JOIN THEATRE t ON sc.Theatre_ID = t.Theatre_ID
+JOIN PAYMENT p ON b.Booking_ID = p.Booking_ID;
+
+DROP PROCEDURE IF EXISTS ReconcileAvailableSeats;
+
+DELIMITER //
+CREATE PROCEDURE ReconcileAvailableSeats(IN p_FromShowID INT, IN p_ToShowID INT)
+BEGIN
+    UPDATE SHOWS s
+    JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+    LEFT JOIN (
+        SELECT Show_ID, SUM(Is_Booked = FALSE) as Free_Seats
+        FROM SEAT_RESERVATION
+        WHERE Show_ID BETWEEN p_FromShowID AND p_ToShowID
+        GROUP BY Show_ID
+    ) r ON r.Show_ID = s.Show_ID
+    SET s.Available_Seats = IFNULL(r.Free_Seats, sc.Total_Seats)
+    WHERE s.Show_ID BETWEEN p_FromShowID AND p_ToShowID
+      AND NOT s.Is_Archived
+      AND s.Available_Seats <> IFNULL(r.Free_Seats, sc.Total_Seats);
+
+    SELECT ROW_COUNT() as Corrected;
+END //
+DELIMITER ;
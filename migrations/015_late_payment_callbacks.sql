@@ -0,0 +1,37 @@
+-- Migration 015: Ignore late payment callbacks for finished bookings
+--
+-- UpdatePaymentStatus (migration 004) put a booking back to 'Pending'
+-- on any outcome other than 'Completed' unless it had expired, so a
+-- late 'Failed' callback reopened Cancelled and Failed bookings and
+-- overwrote their 'Refunded' payment. Only bookings still awaiting or
+-- holding a payment ('Pending', 'Confirmed') are updated now; the
+-- payment worker (payments.py) already only touches 'Pending' ones.
+
+USE MovieBookingSystem;
+
+DROP PROCEDURE IF EXISTS UpdatePaymentStatus;
+
+DELIMITER //
+CREATE PROCEDURE UpdatePaymentStatus(IN p_BookingID INT, IN p_State VARCHAR(50))
+BEGIN
+    DECLARE v_Status VARCHAR(50);
+
+    -- Serialises with the hold sweeper, which locks expired bookings
+    SELECT Status INTO v_Status FROM BOOKING
+    WHERE Booking_ID = p_BookingID
+    FOR UPDATE;
+
+    IF p_State = 'Completed' THEN
+        IF v_Status IS NULL OR v_Status NOT IN ('Pending', 'Confirmed') THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Booking is no longer awaiting payment (the seat hold may have expired)';
+        END IF;
+        UPDATE PAYMENT SET Payment_State = p_State WHERE Booking_ID = p_BookingID;
+        UPDATE BOOKING SET Status = 'Confirmed', Hold_Expires_At = NULL
+        WHERE Booking_ID = p_BookingID;
+    ELSEIF v_Status IN ('Pending', 'Confirmed') THEN
+        UPDATE PAYMENT SET Payment_State = p_State WHERE Booking_ID = p_BookingID;
+        UPDATE BOOKING SET Status = 'Pending' WHERE Booking_ID = p_BookingID;
+    END IF;
+END //
+DELIMITER ;
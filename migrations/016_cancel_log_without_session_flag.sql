@@ -0,0 +1,28 @@
+-- Migration 016: Skip bulk-logged cancellations without a session flag
+--
+-- The bulk cancel (cancellations.py) set @skip_cancel_log on a pooled
+-- connection so trg_AfterBookingCancel would not log its bookings twice.
+-- A user variable lives as long as the connection: if resetting it
+-- failed, later single cancellations on that connection went unlogged.
+-- The bulk path now writes its CANCEL_LOG rows before it cancels the
+-- bookings, in the same transaction, and the trigger only logs bookings
+-- that have no CANCEL_LOG row yet.
+
+USE MovieBookingSystem;
+
+-- The trigger's "already logged?" lookup
+CREATE INDEX idx_cancel_log_booking ON CANCEL_LOG (Booking_ID);
+
+DROP TRIGGER IF EXISTS trg_AfterBookingCancel;
+
+DELIMITER //
+CREATE TRIGGER trg_AfterBookingCancel
+AFTER UPDATE ON BOOKING
+FOR EACH ROW
+BEGIN
+    IF NEW.Status = 'Cancelled' AND OLD.Status != 'Cancelled'
+       AND NOT EXISTS (SELECT 1 FROM CANCEL_LOG WHERE Booking_ID = NEW.Booking_ID) THEN
+        INSERT INTO CANCEL_LOG (Booking_ID) VALUES (NEW.Booking_ID);
+    END IF;
+END //
+DELIMITER ;
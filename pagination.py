@@ -0,0 +1,113 @@
+import base64
+import datetime
+import decimal
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class PageError(Exception):
+    """Raised for a malformed page cursor; the message is user-facing."""
+
+
+def page_size(raw, default=DEFAULT_PAGE_SIZE):
+    try:
+        return max(1, min(int(raw), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def plain_value(value):
+    # MySQL hands TIME back as timedelta; keep it as 'HH:MM:SS' so it
+    # compares correctly when sent back as a parameter
+    if isinstance(value, datetime.timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([plain_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise PageError('Invalid page cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise PageError('Invalid page cursor')
+    return values
+
+
+def seek_condition(order, values):
+    """SQL for "comes after ``values`` in ``order``".
+
+    ``order`` is a list of ``(column, 'ASC' | 'DESC')``. The condition is
+    spelled out as ``a > ? OR (a = ? AND b > ?) ...`` behind a leading
+    ``a >= ?``, which MySQL turns into an index range; it does not do that
+    for row constructors like ``(a, b) > (?, ?)`` with mixed directions.
+    """
+    first_column, first_direction = order[0]
+    clauses = []
+    params = []
+    for i, (column, direction) in enumerate(order):
+        parts = [f"{c} = %s" for c, _ in order[:i]]
+        parts.append(f"{column} {'>' if direction == 'ASC' else '<'} %s")
+        clauses.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:i + 1])
+    sql = (f"{first_column} {'>=' if first_direction == 'ASC' else '<='} %s "
+           f"AND ({' OR '.join(clauses)})")
+    return sql, [values[0]] + params
+
+
+def page_query(select, where, params, order, after=None, limit=DEFAULT_PAGE_SIZE):
+    """SQL and parameters for one keyset page of ``select`` (see fetch_page)."""
+    where = list(where)
+    params = list(params)
+    if after is not None:
+        sql, seek_params = seek_condition(order, after)
+        where.append(sql)
+        params.extend(seek_params)
+    query = select
+    if where:
+        query += ' WHERE ' + ' AND '.join(f'({w})' for w in where)
+    query += ' ORDER BY ' + ', '.join(f'{c} {d}' for c, d in order)
+    query += ' LIMIT %s'
+    # One extra row tells whether there is a next page
+    return query, params + [limit + 1]
+
+
+def page_rows(rows, order, limit=DEFAULT_PAGE_SIZE):
+    """Split the rows of page_query() into ``(rows, next_cursor)``."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[column.split('.')[-1]] for column, _ in order])
+    return rows, next_cursor
+
+
+def fetch_page(cursor, select, where, params, order, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Run one keyset page of ``select``.
+
+    ``where`` is a list of SQL conditions (ANDed) with ``params`` in order;
+    ``order`` is the stable sort key as ``(column, direction)`` pairs whose
+    last column is unique. Each row must carry the sort key under the
+    column's bare name (``s.Show_Date`` -> ``Show_Date``). Returns
+    ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    cursor.execute(*page_query(select, where, params, order, after, limit))
+    return page_rows(cursor.fetchall(), order, limit)
+
+
+def jsonable(rows):
+    return [{key: plain_value(value) for key, value in row.items()} for row in rows]
@@ -0,0 +1,232 @@
+import threading
+import time
+import traceback
+from collections import Counter
+
+import mysql.connector
+
+from holds import release_bookings
+
+OUTCOMES = ('Completed', 'Failed')
+# A job that keeps failing backs off 2, 4, 8, ... seconds and is parked
+# as 'Error' after this many attempts
+MAX_ATTEMPTS = 5
+
+
+def enqueue_payment(conn, booking_id, outcome):
+    """Record a payment outcome for the worker; safe to call twice.
+
+    Returns False when the booking already has a job waiting or done.
+    A job parked as 'Error' is queued again.
+    """
+    if outcome not in OUTCOMES:
+        raise ValueError(f'Unknown payment outcome {outcome!r}')
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO PAYMENT_QUEUE (Booking_ID, Outcome) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE
+                Outcome = IF(Status = 'Error', VALUES(Outcome), Outcome),
+                Attempts = IF(Status = 'Error', 0, Attempts),
+                Available_At = IF(Status = 'Error', NOW(), Available_At),
+                Status = IF(Status = 'Error', 'Queued', Status)
+        """, (booking_id, outcome))
+        conn.commit()
+        # 1 = inserted, 2 = requeued, 0 = left alone
+        return cursor.rowcount > 0
+    finally:
+        cursor.close()
+
+
+def _in(ids):
+    return ','.join(['%s'] * len(ids))
+
+
+def apply_payments(conn, batch_size=200, job_ids=None):
+    """Apply one batch of queued payment outcomes in one transaction.
+
+    Completed payments confirm Pending bookings whose hold had not run
+    out when the payment was queued; failed payments release the seats.
+    Outcomes for bookings already in the target state are no-ops, so a
+    batch can be retried safely; anything else is 'Rejected'. Returns
+    ``(job_ids, {show_id: seats_freed})``.
+    """
+    cursor = conn.cursor()
+    try:
+        if job_ids:
+            cursor.execute(f"""
+                SELECT Job_ID, Booking_ID, Outcome, Created_At FROM PAYMENT_QUEUE
+                WHERE Job_ID IN ({_in(job_ids)}) AND Status = 'Queued'
+                FOR UPDATE SKIP LOCKED
+            """, list(job_ids))
+        else:
+            # SKIP LOCKED lets several workers drain the queue side by side
+            cursor.execute("""
+                SELECT Job_ID, Booking_ID, Outcome, Created_At FROM PAYMENT_QUEUE
+                WHERE Status = 'Queued' AND Available_At <= NOW()
+                ORDER BY Job_ID
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (batch_size,))
+        jobs = cursor.fetchall()
+        if not jobs:
+            conn.rollback()
+            return [], {}
+
+        booking_ids = sorted({job[1] for job in jobs})
+        cursor.execute(f"""
+            SELECT Booking_ID, Status, Hold_Expires_At FROM BOOKING
+            WHERE Booking_ID IN ({_in(booking_ids)})
+            ORDER BY Booking_ID
+            FOR UPDATE
+        """, booking_ids)
+        bookings = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        confirm, fail, done, rejected = [], [], [], []
+        for job_id, booking_id, outcome, created_at in jobs:
+            status, hold_expires_at = bookings.get(booking_id, (None, None))
+            if outcome == 'Completed' and status == 'Pending' and (
+                    hold_expires_at is None or created_at <= hold_expires_at):
+                confirm.append(booking_id)
+                done.append(job_id)
+            elif outcome == 'Failed' and status == 'Pending':
+                fail.append(booking_id)
+                done.append(job_id)
+            elif (outcome, status) in (('Completed', 'Confirmed'), ('Failed', 'Failed')):
+                done.append(job_id)
+            else:
+                rejected.append(job_id)
+
+        if confirm:
+            cursor.execute(f"""
+                UPDATE BOOKING SET Status = 'Confirmed', Hold_Expires_At = NULL
+                WHERE Booking_ID IN ({_in(confirm)})
+            """, confirm)
+            cursor.execute(f"""
+                UPDATE PAYMENT SET Payment_State = 'Completed'
+                WHERE Booking_ID IN ({_in(confirm)})
+            """, confirm)
+        freed = release_bookings(cursor, fail, 'Failed', 'Failed') if fail else {}
+
+        for ids, status, note in ((done, 'Done', None),
+                                  (rejected, 'Rejected', 'Booking is no longer awaiting payment')):
+            if ids:
+                cursor.execute(f"""
+                    UPDATE PAYMENT_QUEUE
+                    SET Status = %s, Last_Error = %s, Processed_At = NOW(), Attempts = Attempts + 1
+                    WHERE Job_ID IN ({_in(ids)})
+                """, [status, note] + ids)
+        conn.commit()
+        return [job[0] for job in jobs], freed
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _record_failure(conn, job_ids, err):
+    cursor = conn.cursor()
+    try:
+        # MySQL assigns left to right, so Attempts is still the old value
+        # in the first two expressions
+        cursor.execute(f"""
+            UPDATE PAYMENT_QUEUE
+            SET Status = IF(Attempts + 1 >= %s, 'Error', 'Queued'),
+                Available_At = DATE_ADD(NOW(), INTERVAL POW(2, Attempts + 1) SECOND),
+                Last_Error = %s,
+                Attempts = Attempts + 1
+            WHERE Job_ID IN ({_in(job_ids)}) AND Status = 'Queued'
+        """, [MAX_ATTEMPTS, str(err)[:255]] + list(job_ids))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def _ready_job_ids(conn, batch_size):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT Job_ID FROM PAYMENT_QUEUE
+            WHERE Status = 'Queued' AND Available_At <= NOW()
+            ORDER BY Job_ID
+            LIMIT %s
+        """, (batch_size,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.rollback()
+
+
+class PaymentWorker:
+    """Background thread that drains PAYMENT_QUEUE.
+
+    ``notify()`` wakes it right after a request queues a payment; otherwise
+    it polls every ``idle_interval`` seconds, which also picks up jobs
+    queued by other workers and retries that have backed off. When a
+    whole batch fails, its jobs are retried one by one so a single bad
+    booking cannot hold the others back.
+    """
+
+    def __init__(self, pool, on_release=None, batch_size=200, idle_interval=5):
+        self.pool = pool
+        self.on_release = on_release
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.processed = 0
+        self.failures = 0
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _apply_one_by_one(self, conn, job_ids, released):
+        for job_id in job_ids:
+            try:
+                _, freed = apply_payments(conn, job_ids=[job_id])
+                released.update(freed)
+                self.processed += 1
+            except mysql.connector.Error as err:
+                self.failures += 1
+                print(f"Payment job {job_id} failed: {err}")
+                _record_failure(conn, [job_id], err)
+
+    def drain(self):
+        """Apply every ready job; returns ``{show_id: seats_freed}``."""
+        released = Counter()
+        with self.pool.connection() as conn:
+            while True:
+                try:
+                    job_ids, freed = apply_payments(conn, self.batch_size)
+                except mysql.connector.Error as err:
+                    print(f"Payment batch failed, retrying jobs one by one: {err}")
+                    job_ids = _ready_job_ids(conn, self.batch_size)
+                    self._apply_one_by_one(conn, job_ids, released)
+                    if len(job_ids) < self.batch_size:
+                        break
+                    continue
+                released.update(freed)
+                self.processed += len(job_ids)
+                if len(job_ids) < self.batch_size:
+                    break
+        if released and self.on_release:
+            self.on_release(list(released))
+        return dict(released)
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.idle_interval)
+            self._wakeup.clear()
+            try:
+                self.drain()
+            except Exception:
+                print("Payment worker error:")
+                traceback.print_exc()
+                time.sleep(1)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='payment-worker', daemon=True)
+            self._thread.start()
@@ -0,0 +1,223 @@
+from collections import defaultdict
+
+import mysql.connector
+
+# Named MySQL lock so only one process applies deltas at a time; the
+# totals are adjusted by difference and must not be applied twice
+LOCK_NAME = 'MovieBookingSystem.booking_rollup'
+
+_GROUP_SQL = """
+    SELECT s.Movie_ID, sc.Theatre_ID, s.Show_Date, IFNULL(b.Status, 'Pending') as Status,
+           COUNT(*) as Bookings, SUM(b.Seats_Booked) as Seats, SUM(b.Total_Amount) as Revenue
+    FROM BOOKING b
+    JOIN SHOWS s ON b.Show_ID = s.Show_ID
+    JOIN SCREEN sc ON s.Screen_ID = sc.Screen_ID
+"""
+_GROUP_BY = " GROUP BY s.Movie_ID, sc.Theatre_ID, s.Show_Date, IFNULL(b.Status, 'Pending')"
+
+
+def _acquire(cursor, wait=0):
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, wait))
+    return cursor.fetchone()[0] == 1
+
+
+def _release(cursor):
+    cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    cursor.fetchone()
+
+
+def _upsert_totals(cursor, table, key_column, deltas):
+    rows = [(key, status, b, s, r) for (key, status), (b, s, r) in deltas.items() if b or s or r]
+    if rows:
+        cursor.executemany(f"""
+            INSERT INTO {table} ({key_column}, Status, Bookings, Seats, Revenue)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE Bookings = Bookings + VALUES(Bookings),
+                                    Seats = Seats + VALUES(Seats),
+                                    Revenue = Revenue + VALUES(Revenue)
+        """, rows)
+
+
+def _apply_batch(conn, batch_size):
+    """Recompute the groups named by one batch of BOOKING_CHANGES rows."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT Change_ID, Movie_ID, Theatre_ID, Show_Date FROM BOOKING_CHANGES
+            ORDER BY Change_ID
+            LIMIT %s
+        """, (batch_size,))
+        changes = cursor.fetchall()
+        if not changes:
+            conn.rollback()
+            return 0
+        change_ids = [c[0] for c in changes]
+        groups = {(c[1], c[2], c[3]) for c in changes}
+
+        # Fresh figures for the dirty groups. Filtering on (Movie_ID,
+        # Show_Date) uses idx_shows_movie_date; the theatre is checked here.
+        pairs = sorted({(movie_id, show_date) for movie_id, _, show_date in groups})
+        pair_sql = ','.join(['(%s, %s)'] * len(pairs))
+        cursor.execute(_GROUP_SQL + f" WHERE (s.Movie_ID, s.Show_Date) IN ({pair_sql})" + _GROUP_BY,
+                       [v for pair in pairs for v in pair])
+        fresh = {(m, t, d, status): (b, s, r) for m, t, d, status, b, s, r in cursor.fetchall()
+                 if (m, t, d) in groups}
+
+        group_sql = ','.join(['(%s, %s, %s)'] * len(groups))
+        group_params = [v for group in groups for v in group]
+        cursor.execute(f"""
+            SELECT Movie_ID, Theatre_ID, Show_Date, Status, Bookings, Seats, Revenue
+            FROM BOOKING_ROLLUP
+            WHERE (Movie_ID, Theatre_ID, Show_Date) IN ({group_sql})
+        """, group_params)
+        old = {(m, t, d, status): (b, s, r) for m, t, d, status, b, s, r in cursor.fetchall()}
+
+        movie_deltas = defaultdict(lambda: (0, 0, 0))
+        theatre_deltas = defaultdict(lambda: (0, 0, 0))
+        for key in set(fresh) | set(old):
+            nb, ns, nr = fresh.get(key, (0, 0, 0))
+            ob, os_, or_ = old.get(key, (0, 0, 0))
+            delta = (nb - ob, ns - os_, nr - or_)
+            movie_id, theatre_id, _, status = key
+            for deltas, dim in ((movie_deltas, movie_id), (theatre_deltas, theatre_id)):
+                b, s, r = deltas[(dim, status)]
+                deltas[(dim, status)] = (b + delta[0], s + delta[1], r + delta[2])
+
+        cursor.execute(f"""
+            DELETE FROM BOOKING_ROLLUP
+            WHERE (Movie_ID, Theatre_ID, Show_Date) IN ({group_sql})
+        """, group_params)
+        if fresh:
+            cursor.executemany("""
+                INSERT INTO BOOKING_ROLLUP (Movie_ID, Theatre_ID, Show_Date, Status, Bookings, Seats, Revenue)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [key + value for key, value in fresh.items()])
+        _upsert_totals(cursor, 'MOVIE_BOOKING_TOTALS', 'Movie_ID', movie_deltas)
+        _upsert_totals(cursor, 'THEATRE_BOOKING_TOTALS', 'Theatre_ID', theatre_deltas)
+
+        # Delete exactly what was read: a change row that was still
+        # uncommitted above keeps its place for the next run
+        placeholders = ','.join(['%s'] * len(change_ids))
+        cursor.execute(f"DELETE FROM BOOKING_CHANGES WHERE Change_ID IN ({placeholders})", change_ids)
+        conn.commit()
+        return len(change_ids)
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def refresh_rollups(conn, batch_size=1000):
+    """Apply every pending booking change to the rollups.
+
+    Returns the number of change rows applied, or None when another process
+    holds the rollup lock (it is doing the same work).
+    """
+    cursor = conn.cursor()
+    try:
+        if not _acquire(cursor):
+            return None
+        # GET_LOCK must not pin the snapshot each batch reads from
+        conn.commit()
+        applied = 0
+        try:
+            while True:
+                done = _apply_batch(conn, batch_size)
+                applied += done
+                if done < batch_size:
+                    return applied
+        finally:
+            _release(cursor)
+    finally:
+        cursor.close()
+
+
+def rebuild_rollups(conn):
+    """Recompute all rollups from the raw tables in one transaction.
+
+    Returns True, or None when the rollup lock could not be had within a
+    minute (a delta run must not apply changes underneath the rebuild).
+    """
+    cursor = conn.cursor()
+    try:
+        if not _acquire(cursor, wait=60):
+            return None
+        conn.commit()
+        try:
+            cursor.execute("SELECT IFNULL(MAX(Change_ID), 0) FROM BOOKING_CHANGES")
+            last_change = cursor.fetchone()[0]
+            cursor.execute("DELETE FROM BOOKING_ROLLUP")
+            cursor.execute("DELETE FROM MOVIE_BOOKING_TOTALS")
+            cursor.execute("DELETE FROM THEATRE_BOOKING_TOTALS")
+            cursor.execute("""
+                INSERT INTO BOOKING_ROLLUP (Movie_ID, Theatre_ID, Show_Date, Status, Bookings, Seats, Revenue)
+            """ + _GROUP_SQL + _GROUP_BY)
+            cursor.execute("""
+                INSERT INTO MOVIE_BOOKING_TOTALS (Movie_ID, Status, Bookings, Seats, Revenue)
+                SELECT Movie_ID, Status, SUM(Bookings), SUM(Seats), SUM(Revenue)
+                FROM BOOKING_ROLLUP GROUP BY Movie_ID, Status
+            """)
+            cursor.execute("""
+                INSERT INTO THEATRE_BOOKING_TOTALS (Theatre_ID, Status, Bookings, Seats, Revenue)
+                SELECT Theatre_ID, Status, SUM(Bookings), SUM(Seats), SUM(Revenue)
+                FROM BOOKING_ROLLUP GROUP BY Theatre_ID, Status
+            """)
+            cursor.execute("DELETE FROM BOOKING_CHANGES WHERE Change_ID <= %s", (last_change,))
+            conn.commit()
+            return True
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        finally:
+            _release(cursor)
+    finally:
+        cursor.close()
+
+
+def check_rollups(conn):
+    """Compare the rollups with a fresh aggregate of the raw tables.
+
+    Runs in one consistent snapshot and skips groups that still have
+    pending changes. Returns a list of human-readable mismatches.
+    """
+    if conn.in_transaction:
+        conn.rollback()
+    conn.start_transaction(consistent_snapshot=True, readonly=True)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT DISTINCT Movie_ID, Theatre_ID, Show_Date FROM BOOKING_CHANGES")
+        pending = set(cursor.fetchall())
+
+        cursor.execute(_GROUP_SQL + _GROUP_BY)
+        raw = {row[:4]: tuple(row[4:]) for row in cursor.fetchall()}
+        cursor.execute("SELECT Movie_ID, Theatre_ID, Show_Date, Status, Bookings, Seats, Revenue "
+                       "FROM BOOKING_ROLLUP")
+        rolled = {row[:4]: tuple(row[4:]) for row in cursor.fetchall()
+                  if any(row[4:])}
+
+        mismatches = []
+        for key in sorted(set(raw) | set(rolled), key=str):
+            if key[:3] in pending:
+                continue
+            if raw.get(key) != rolled.get(key):
+                mismatches.append(f"BOOKING_ROLLUP {key}: raw={raw.get(key)} rollup={rolled.get(key)}")
+
+        for table, column, index in (('MOVIE_BOOKING_TOTALS', 'Movie_ID', 0),
+                                     ('THEATRE_BOOKING_TOTALS', 'Theatre_ID', 1)):
+            expected = defaultdict(lambda: (0, 0, 0))
+            for key, (b, s, r) in rolled.items():
+                eb, es, er = expected[(key[index], key[3])]
+                expected[(key[index], key[3])] = (eb + b, es + s, er + r)
+            cursor.execute(f"SELECT {column}, Status, Bookings, Seats, Revenue FROM {table}")
+            actual = {row[:2]: tuple(row[2:]) for row in cursor.fetchall() if any(row[2:])}
+            dims_pending = {group[index] for group in pending}
+            for key in sorted(set(expected) | set(actual), key=str):
+                if key[0] in dims_pending:
+                    continue
+                if tuple(expected.get(key, (0, 0, 0))) != actual.get(key, (0, 0, 0)):
+                    mismatches.append(f"{table} {key}: rollup={expected.get(key)} totals={actual.get(key)}")
+        return mismatches
+    finally:
+        cursor.close()
+        conn.rollback()
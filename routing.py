@@ -0,0 +1,98 @@
+import itertools
+import threading
+import time
+
+import mysql.connector
+
+from db import PoolTimeout
+
+
+def replication_lag(conn, allow_standalone=False):
+    """Seconds the server behind ``conn`` lags its primary, or None.
+
+    None means it cannot serve reads: replication is stopped or broken, or
+    the server is not a replica at all. With ``allow_standalone`` a server
+    that is not replicating counts as current, so a second MySQL loaded
+    from the same dump can stand in for a replica during testing.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.Error:
+            # MySQL before 8.0.22 and MariaDB before 10.5
+            cursor.execute("SHOW SLAVE STATUS")
+        row = cursor.fetchone()
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    if not row:
+        return 0.0 if allow_standalone else None
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return None if lag is None else float(lag)
+
+
+class ReplicaRouter:
+    """Picks the pool a read-only request should use.
+
+    Replicas are used round-robin while their replication lag is at most
+    ``max_lag_seconds``; each one's lag is re-checked at most every
+    ``check_interval`` seconds. When no replica qualifies, reads go to the
+    primary. Anything that writes must use ``primary`` directly.
+    """
+
+    def __init__(self, primary, replicas=(), max_lag_seconds=2.0, check_interval=1.0,
+                 allow_standalone=False):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.allow_standalone = allow_standalone
+
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        # replica index -> (checked_at, lag or None)
+        self._lag = {}
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+
+    def _check(self, index):
+        try:
+            with self.replicas[index].connection() as conn:
+                lag = replication_lag(conn, self.allow_standalone)
+        except (mysql.connector.Error, PoolTimeout) as err:
+            print(f"Replica {index} check failed: {err}")
+            lag = None
+        with self._lock:
+            self._lag[index] = (time.monotonic(), lag)
+        return lag
+
+    def lag(self, index):
+        """Last known lag of replica ``index``, refreshed when due."""
+        with self._lock:
+            checked_at, lag = self._lag.get(index, (None, None))
+            due = checked_at is None or time.monotonic() - checked_at >= self.check_interval
+            if due:
+                # Claim the check so concurrent requests keep the old value
+                self._lag[index] = (time.monotonic(), lag)
+        return self._check(index) if due else lag
+
+    def read_pool(self):
+        """A replica pool that is caught up, or the primary."""
+        if self.replicas:
+            start = next(self._turn)
+            for i in range(len(self.replicas)):
+                index = (start + i) % len(self.replicas)
+                lag = self.lag(index)
+                if lag is not None and lag <= self.max_lag_seconds:
+                    with self._lock:
+                        self.replica_reads += 1
+                    return self.replicas[index]
+            with self._lock:
+                self.primary_fallbacks += 1
+        return self.primary
+
+    def status(self):
+        return [{'replica': i, 'host': pool.db_config.get('host'),
+                 'lag_seconds': self.lag(i), **pool.stats()}
+                for i, pool in enumerate(self.replicas)]
@@ -0,0 +1,81 @@
+import datetime
+import itertools
+import time
+
+# Upper bound on one admin request; a week of 4 shows a day on 30 screens
+# for 5 movies is 4200 shows
+MAX_SHOWS_PER_REQUEST = 10000
+
+
+class ScheduleError(Exception):
+    """Raised for an invalid bulk schedule; the message is user-facing."""
+
+
+def date_range(start, end):
+    if end < start:
+        raise ScheduleError('End date is before start date')
+    return [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def schedule_shows(conn, movie_ids, screen_ids, dates, times, price, chunk_size=500):
+    """Create a show for every movie x screen x date x time and its seat map.
+
+    Each chunk of ``chunk_size`` shows costs two round trips: one
+    multi-row INSERT into SHOWS and one InitializeSeatsForShows() call for
+    the new ID range. Every chunk commits on its own so seat and show
+    locks are only held briefly. Returns a summary with timings.
+    """
+    grid = list(itertools.product(movie_ids, screen_ids, dates, times))
+    if not grid:
+        raise ScheduleError('Pick at least one movie, screen, date and time')
+    if len(grid) > MAX_SHOWS_PER_REQUEST:
+        raise ScheduleError(f'{len(grid)} shows requested; the limit is {MAX_SHOWS_PER_REQUEST} per request')
+
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    created_ids = []
+    seats_created = 0
+    try:
+        placeholders = ','.join(['%s'] * len(screen_ids))
+        cursor.execute(f"SELECT Screen_ID, Total_Seats FROM SCREEN WHERE Screen_ID IN ({placeholders})",
+                       list(screen_ids))
+        screen_seats = dict(cursor.fetchall())
+        unknown = [s for s in screen_ids if s not in screen_seats]
+        if unknown:
+            raise ScheduleError(f'Unknown screen IDs: {unknown}')
+
+        for offset in range(0, len(grid), chunk_size):
+            chunk = grid[offset:offset + chunk_size]
+            values = ','.join(['(%s, %s, %s, %s, %s)'] * len(chunk))
+            params = []
+            for movie_id, screen_id, show_date, show_time in chunk:
+                params.extend((movie_id, screen_id, show_time, show_date, price))
+            cursor.execute(f"""
+                INSERT INTO SHOWS (Movie_ID, Screen_ID, Show_Time, Show_Date, Price)
+                VALUES {values}
+            """, params)
+
+            # A multi-row INSERT with a known row count gets a consecutive
+            # block of AUTO_INCREMENT values, starting at LAST_INSERT_ID()
+            first_id = cursor.lastrowid
+            last_id = first_id + len(chunk) - 1
+            cursor.callproc('InitializeSeatsForShows', (first_id, last_id))
+            conn.commit()
+            seats_created += sum(screen_seats[screen_id] for _, screen_id, _, _ in chunk)
+            created_ids.extend(range(first_id, last_id + 1))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'shows_created': len(created_ids),
+        'seats_created': seats_created,
+        'first_show_id': created_ids[0],
+        'last_show_id': created_ids[-1],
+        'chunks': (len(grid) + chunk_size - 1) // chunk_size,
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'shows_per_second': round(len(created_ids) / elapsed, 1) if elapsed else 0.0,
+    }
@@ -0,0 +1,232 @@
+import bisect
+import heapq
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+
+WORD_PATTERN = re.compile(r'\w+')
+KINDS = ('movie', 'theatre', 'city')
+
+# A very short prefix ("t") can match most of the catalog; only this many
+# documents that pass the kind and facet filters are ranked (and counted
+# in totals and facets) for it
+MAX_CANDIDATES = 500
+
+Document = namedtuple('Document', 'kind key name name_terms other_terms fields')
+
+
+def tokenize(text):
+    """Lower-cased words of ``text`` with accents stripped ('Amélie' -> ['amelie'])."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return WORD_PATTERN.findall(text.casefold())
+
+
+def _score(doc, tokens, phrase):
+    # Per query word: whole word of the name 4, start of a name word 3,
+    # whole genre/language/city word 2, start of one 1; None if a word
+    # matches nothing. Names that start with the query get a bonus.
+    total = 0
+    for token in tokens:
+        best = 0
+        for term in doc.name_terms:
+            if term == token:
+                best = 4
+                break
+            if term.startswith(token):
+                best = 3
+        if best == 0:
+            for term in doc.other_terms:
+                if term == token:
+                    best = 2
+                    break
+                if term.startswith(token):
+                    best = 1
+        if best == 0:
+            return None
+        total += best
+    if ' '.join(doc.name_terms).startswith(phrase):
+        total += 2
+    return total
+
+
+class SearchIndex:
+    """In-process prefix index over movies, theatres and cities.
+
+    Every word of a document maps to the documents containing it; the
+    words themselves are kept sorted, so the words starting with a prefix
+    are one bisect away. A query matches documents having every query
+    word as a word or word prefix, best matches first (see _score).
+    ``load()`` rebuilds it from MySQL; ``add_movie()`` indexes one new
+    movie in place.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terms = []        # sorted distinct words
+        self._postings = {}     # word -> [doc number, ...]
+        self._docs = []         # doc number -> Document, None once replaced
+        self._keys = {}         # (kind, key) -> doc number
+        self.version = None
+
+    @property
+    def built(self):
+        return self.version is not None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _add(self, kind, key, name, other_text, fields, bulk=False):
+        # ``bulk`` leaves sorting the new words to the caller
+        old = self._keys.get((kind, key))
+        if old is not None:
+            self._docs[old] = None
+        # Interned, so each distinct word is stored once however many
+        # documents use it
+        name_terms = tuple(sys.intern(term) for term in tokenize(name))
+        other_terms = tuple(sys.intern(term) for term in tokenize(other_text) if term not in name_terms)
+        number = len(self._docs)
+        self._docs.append(Document(kind, key, name, name_terms, other_terms, fields))
+        self._keys[(kind, key)] = number
+        for term in set(name_terms + other_terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                self._postings[term] = [number]
+                if not bulk:
+                    bisect.insort(self._terms, term)
+            else:
+                postings.append(number)
+
+    def _add_movie(self, movie, bulk=False):
+        self._add('movie', movie['Movie_ID'], movie['Title'],
+                  f"{movie.get('Genre') or ''} {movie.get('Language') or ''}",
+                  {'genre': movie.get('Genre'), 'language': movie.get('Language'),
+                   'rating': movie.get('Rating')}, bulk)
+
+    def add_movie(self, movie):
+        """Index (or re-index) one MOVIE row given as a dict."""
+        with self._lock:
+            self._add_movie(movie)
+
+    def rebuild(self, movies, theatres, version=None):
+        """Replace the contents with MOVIE and THEATRE rows given as dicts."""
+        fresh = SearchIndex()
+        for movie in movies:
+            fresh._add_movie(movie, bulk=True)
+        cities = set()
+        for theatre in theatres:
+            fresh._add('theatre', theatre['Theatre_ID'], theatre['Name'],
+                       f"{theatre.get('Location') or ''} {theatre.get('City') or ''}",
+                       {'city': theatre.get('City'), 'location': theatre.get('Location')}, bulk=True)
+            if theatre.get('City'):
+                cities.add(theatre['City'])
+        for city in cities:
+            fresh._add('city', city, city, '', {'city': city}, bulk=True)
+        fresh._terms = sorted(fresh._postings)
+        with self._lock:
+            self._terms, self._postings = fresh._terms, fresh._postings
+            self._docs, self._keys = fresh._docs, fresh._keys
+            self.version = version
+
+    def load(self, conn, version=None):
+        """Rebuild from MySQL; ``version`` is the catalog version it reflects."""
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT Movie_ID, Title, Genre, Language, Rating FROM MOVIE")
+            movies = cursor.fetchall()
+            cursor.execute("SELECT Theatre_ID, Name, Location, City FROM THEATRE")
+            theatres = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.rebuild(movies, theatres, version)
+
+    def _matches(self, token, cap):
+        # Postings in the token's prefix range, counted up to ``cap``
+        lo = bisect.bisect_left(self._terms, token)
+        hi = bisect.bisect_left(self._terms, token + '\U0010ffff', lo)
+        count = 0
+        for term in self._terms[lo:hi]:
+            count += len(self._postings[term])
+            if count >= cap:
+                break
+        return count, lo, hi
+
+    def _candidates(self, tokens, accept):
+        # Documents for the query word with the fewest of them that pass
+        # ``accept(doc)``; _score checks the other words. Filtering before
+        # the cap keeps a rare facet value from being cut off by common
+        # ones. Returns (numbers, complete): complete is False when the
+        # cap stopped the scan.
+        best = None
+        for token in tokens:
+            ranged = self._matches(token, best[0] if best else MAX_CANDIDATES)
+            if best is None or ranged[0] < best[0]:
+                best = ranged
+        _, lo, hi = best
+        # In sorted order, so the exact word (if indexed) comes first
+        seen = set()
+        found = []
+        for term in self._terms[lo:hi]:
+            for number in self._postings[term]:
+                if number in seen:
+                    continue
+                seen.add(number)
+                doc = self._docs[number]
+                if doc is None or not accept(doc):
+                    continue
+                found.append(number)
+                if len(found) >= MAX_CANDIDATES:
+                    return found, False
+        return found, True
+
+    def search(self, query, kinds=KINDS, limit=10, where=None, facets=()):
+        """Best ``limit`` matches for ``query``.
+
+        ``where(doc)`` can reject documents (facet filters); ``facets``
+        names Document.fields to count over all matches. Returns
+        ``(hits, total, facet_counts, complete)``, hits being Documents
+        best first. ``complete`` is False when the query matched more than
+        MAX_CANDIDATES documents: total and facet counts are then lower
+        bounds.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0, {name: {} for name in facets}, True
+        phrase = ' '.join(tokens)
+        scored = []
+        counts = {name: Counter() for name in facets}
+
+        def accept(doc):
+            return doc.kind in kinds and (where is None or where(doc))
+
+        with self._lock:
+            numbers, complete = self._candidates(tokens, accept)
+            for number in numbers:
+                doc = self._docs[number]
+                score = _score(doc, tokens, phrase)
+                if score is None:
+                    continue
+                scored.append((-score, len(doc.name), doc.name, number))
+                for name in facets:
+                    value = doc.fields.get(name)
+                    if value:
+                        counts[name][value] += 1
+            best = heapq.nsmallest(limit, scored)
+            hits = [self._docs[number] for *_, number in best]
+        return hits, len(scored), {name: dict(counter.most_common()) for name, counter in counts.items()}, complete
+
+    def memory_usage(self):
+        """Approximate bytes held by the index structures."""
+        size = sys.getsizeof
+        with self._lock:
+            total = size(self._terms) + size(self._postings) + size(self._docs) + size(self._keys)
+            total += sum(size(term) + size(postings) for term, postings in self._postings.items())
+            for doc in self._docs:
+                if doc is not None:
+                    total += (size(doc) + size(doc.name) + size(doc.name_terms)
+                              + size(doc.other_terms) + size(doc.fields))
+        return total
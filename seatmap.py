@@ -0,0 +1,302 @@
+import base64
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import statements
+
+SEAT_PATTERN = re.compile(r'^(\D+)(\d+)$')
+
+VERSION_SQL = "SELECT Seat_Version FROM SHOWS WHERE Show_ID = %s"
+SEATS_SQL = "SELECT Seat_Number, Is_Booked FROM SEAT_RESERVATION WHERE Show_ID = %s"
+VERSION_STATEMENT = statements.declare('seat_version', VERSION_SQL)
+SEATS_STATEMENT = statements.declare('seat_map', SEATS_SQL)
+
+
+def _row_sort_key(row):
+    # 'A' < 'B' < ... < 'Z' < 'AA'
+    return (len(row), row)
+
+
+class SeatMap:
+    """Occupancy of one show as a bitmap over a rows x seats-per-row grid.
+
+    Seat ``B3`` lives at grid index ``row_index('B') * seats_per_row + 2``
+    and bit ``index % 8`` of byte ``index // 8`` is set when it is booked.
+    Grid positions without a real seat (normally just the tail of the last
+    row) are listed in ``missing``.
+    """
+
+    def __init__(self, show_id, version, seats):
+        parsed = []
+        for seat_number, is_booked in seats:
+            match = SEAT_PATTERN.match(seat_number)
+            if match:
+                parsed.append((match.group(1), int(match.group(2)), bool(is_booked)))
+
+        self.show_id = show_id
+        self.version = version
+        self.rows = sorted({row for row, _, _ in parsed}, key=_row_sort_key)
+        self.seats_per_row = max((num for _, num, _ in parsed), default=0)
+        self.seat_count = len(parsed)
+        self._row_index = {row: i for i, row in enumerate(self.rows)}
+
+        size = len(self.rows) * self.seats_per_row
+        self.bitmap = bytearray((size + 7) // 8)
+        present = bytearray(size)
+        for row, num, booked in parsed:
+            index = self._row_index[row] * self.seats_per_row + num - 1
+            present[index] = 1
+            if booked:
+                self.bitmap[index >> 3] |= 1 << (index & 7)
+        self.missing = [i for i in range(size) if not present[i]]
+        self._missing = set(self.missing)
+
+        # (from_version, to_version, changed grid indices), oldest first
+        self.history = deque(maxlen=64)
+        # Per row, its runs of adjacent free seats as (offset, length);
+        # None until a recommendation needs that row
+        self._runs = [None] * len(self.rows)
+        self._best = {}
+        self.checked_at = time.monotonic()
+
+    @property
+    def grid_size(self):
+        return len(self.rows) * self.seats_per_row
+
+    def same_layout(self, other):
+        return (self.rows == other.rows and self.seats_per_row == other.seats_per_row
+                and self.missing == other.missing)
+
+    def index_of(self, seat_number):
+        match = SEAT_PATTERN.match(seat_number)
+        if not match or match.group(1) not in self._row_index:
+            return None
+        num = int(match.group(2))
+        if not 1 <= num <= self.seats_per_row:
+            return None
+        index = self._row_index[match.group(1)] * self.seats_per_row + num - 1
+        return None if index in self._missing else index
+
+    def seat_number(self, index):
+        row, offset = divmod(index, self.seats_per_row)
+        return f"{self.rows[row]}{offset + 1}"
+
+    def is_booked(self, index):
+        return bool(self.bitmap[index >> 3] & (1 << (index & 7)))
+
+    def set_booked(self, index, booked):
+        if booked:
+            self.bitmap[index >> 3] |= 1 << (index & 7)
+        else:
+            self.bitmap[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        self._runs[index // self.seats_per_row] = None
+        self._best.clear()
+
+    def free_runs(self, row):
+        """Runs of adjacent free seats in row ``row`` (an index into rows)."""
+        runs = self._runs[row]
+        if runs is None:
+            runs = []
+            start = None
+            base = row * self.seats_per_row
+            for offset in range(self.seats_per_row + 1):
+                index = base + offset
+                free = (offset < self.seats_per_row and index not in self._missing
+                        and not self.bitmap[index >> 3] & (1 << (index & 7)))
+                if free and start is None:
+                    start = offset
+                elif not free and start is not None:
+                    runs.append((start, offset - start))
+                    start = None
+            self._runs[row] = runs
+        return runs
+
+    def reuse_runs(self, older, changed):
+        """Take over ``older``'s free runs for the rows ``changed`` left alone."""
+        touched = {index // self.seats_per_row for index in changed}
+        for row, runs in enumerate(older._runs):
+            if row not in touched:
+                self._runs[row] = runs
+
+    def best_seats(self, party_size, limit=1):
+        """Up to ``limit`` blocks of ``party_size`` adjacent free seats, best first.
+
+        A block is scored by how far it sits from the front centre of the
+        screen: its row (row A is nearest the screen) plus how many seats
+        it is off the middle of the row, so one row back counts the same
+        as one seat sideways. Each run of free seats offers its most
+        central block. Blocks are lists of grid indices.
+        """
+        if not 1 <= party_size <= self.seats_per_row:
+            # Not memoised: ?n= comes from clients, and every distinct
+            # out-of-range value would add an entry
+            return []
+        key = (party_size, limit)
+        if key in self._best:
+            return self._best[key]
+        candidates = []
+        ideal = (self.seats_per_row - party_size) / 2
+        for row in range(len(self.rows)):
+            for start, length in self.free_runs(row):
+                if length >= party_size:
+                    offset = min(max(int(ideal + 0.5), start), start + length - party_size)
+                    candidates.append((row + abs(offset - ideal), row, offset))
+        candidates.sort()
+        blocks = [[row * self.seats_per_row + offset + i for i in range(party_size)]
+                  for _, row, offset in candidates[:limit]]
+        self._best[key] = blocks
+        return blocks
+
+    @property
+    def booked_count(self):
+        return sum(bin(byte).count('1') for byte in self.bitmap)
+
+    @property
+    def free_count(self):
+        return self.seat_count - self.booked_count
+
+    def layout(self):
+        return {'rows': self.rows, 'seats_per_row': self.seats_per_row,
+                'seat_count': self.seat_count, 'missing': self.missing}
+
+    def packed(self):
+        return base64.b64encode(bytes(self.bitmap)).decode('ascii')
+
+    def seat_rows(self):
+        """[(row, [(seat_number, is_booked), ...]), ...] in screen order."""
+        result = []
+        for r, row in enumerate(self.rows):
+            seats = []
+            for offset in range(self.seats_per_row):
+                index = r * self.seats_per_row + offset
+                if index not in self._missing:
+                    seats.append((f"{row}{offset + 1}", self.is_booked(index)))
+            result.append((row, seats))
+        return result
+
+    def booked_seats(self):
+        return [seat for _, seats in self.seat_rows() for seat, booked in seats if booked]
+
+    def seat_list(self):
+        """The original /api/seats row format."""
+        return [{'Seat_Number': seat, 'Is_Booked': int(booked)}
+                for _, seats in self.seat_rows() for seat, booked in seats]
+
+    def diff(self, older):
+        """Grid indices whose state differs from ``older`` (same layout)."""
+        changed = []
+        for i, (a, b) in enumerate(zip(self.bitmap, older.bitmap)):
+            x = a ^ b
+            while x:
+                low = x & -x
+                changed.append(i * 8 + low.bit_length() - 1)
+                x ^= low
+        return changed
+
+    def changes_since(self, since):
+        """Grid indices changed after version ``since``, or None if unknown."""
+        if since == self.version:
+            return []
+        if since > self.version or not self.history or since < self.history[0][0]:
+            return None
+        changed = set()
+        for _, to_version, indices in self.history:
+            if to_version > since:
+                changed.update(indices)
+        return sorted(changed)
+
+
+class SeatMapCache:
+    """Per-process cache of SeatMaps, validated against SHOWS.Seat_Version.
+
+    Every booking and cancellation bumps SHOWS.Seat_Version in the same
+    transaction that changes the seats, so the cached map is reused until
+    that version moves, no matter which worker made the change. Versions
+    are re-checked at most every ``revalidate_after`` seconds per show.
+    At most ``max_shows`` maps are kept; the least recently used go first.
+    """
+
+    def __init__(self, revalidate_after=1.0, max_shows=5000):
+        self.revalidate_after = revalidate_after
+        self.max_shows = max_shows
+        # show_id -> SeatMap, least recently used first
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._maps)
+
+    def _lookup(self, show_id):
+        # Caller holds self._lock
+        seat_map = self._maps.get(show_id)
+        if seat_map is not None:
+            self._maps.move_to_end(show_id)
+        return seat_map
+
+    def cached(self, show_id):
+        """The cached SeatMap if it was validated recently enough, else None."""
+        with self._lock:
+            seat_map = self._lookup(show_id)
+        if seat_map and time.monotonic() - seat_map.checked_at < self.revalidate_after:
+            return seat_map
+        return None
+
+    def revalidate(self, show_id, version):
+        """The cached SeatMap if it is still at ``version``, else None."""
+        with self._lock:
+            seat_map = self._lookup(show_id)
+        # A lagging read replica can report an older version than ours
+        if seat_map and seat_map.version >= version:
+            seat_map.checked_at = time.monotonic()
+            return seat_map
+        return None
+
+    def update(self, show_id, version, seats):
+        """Build the SeatMap for ``version`` from its (seat, booked) rows."""
+        with self._lock:
+            seat_map = self._maps.get(show_id)
+        fresh = SeatMap(show_id, version, seats)
+        if seat_map and seat_map.same_layout(fresh) and seat_map.version < version:
+            changed = fresh.diff(seat_map)
+            fresh.history.extend(seat_map.history)
+            fresh.history.append((seat_map.version, version, changed))
+            fresh.reuse_runs(seat_map, changed)
+
+        with self._lock:
+            current = self._lookup(show_id)
+            if current is None or current.version <= fresh.version:
+                self._maps[show_id] = fresh
+            while len(self._maps) > self.max_shows:
+                self._maps.popitem(last=False)
+                self.evictions += 1
+        return fresh
+
+    def get(self, conn, show_id):
+        """Return the SeatMap for ``show_id``, or None if the show is unknown."""
+        seat_map = self.cached(show_id)
+        if seat_map:
+            return seat_map
+
+        row = statements.fetchone(conn, VERSION_STATEMENT, (show_id,))
+        if row is None:
+            self.invalidate(show_id)
+            return None
+        seat_map = self.revalidate(show_id, row[0])
+        if seat_map:
+            return seat_map
+        seats = statements.fetchall(conn, SEATS_STATEMENT, (show_id,))
+        return self.update(show_id, row[0], seats)
+
+    def expire(self, show_id):
+        """Force a version check on next access, e.g. after a local booking."""
+        with self._lock:
+            seat_map = self._maps.get(show_id)
+            if seat_map:
+                seat_map.checked_at = 0
+
+    def invalidate(self, show_id):
+        with self._lock:
+            self._maps.pop(show_id, None)
@@ -0,0 +1,197 @@
+import datetime
+import random
+import time
+
+# Row counts per preset. 'large' is the production-sized dataset: about
+# 30 million SEAT_RESERVATION rows and 2 million bookings.
+SCALES = {
+    'small': {'theatres': 50, 'screens_per_theatre': 4, 'movies': 200,
+              'users': 5000, 'shows': 5000, 'bookings': 20000},
+    'medium': {'theatres': 500, 'screens_per_theatre': 4, 'movies': 1000,
+               'users': 50000, 'shows': 50000, 'bookings': 300000},
+    'large': {'theatres': 2000, 'screens_per_theatre': 4, 'movies': 3000,
+              'users': 500000, 'shows': 300000, 'bookings': 2000000},
+}
+
+CITIES = ['Bangalore', 'Chennai', 'Mumbai', 'Delhi', 'Hyderabad', 'Pune', 'Kolkata',
+          'Ahmedabad', 'Kochi', 'Jaipur', 'Lucknow', 'Mysore']
+CHAINS = ['PVR Cinemas', 'INOX', 'Cinepolis', 'Carnival', 'Miraj', 'Asian', 'Gold']
+LANGUAGES = ['English', 'Hindi', 'Kannada', 'Tamil', 'Telugu', 'Malayalam']
+GENRES = ['Action', 'Drama', 'Comedy', 'Sci-Fi', 'Thriller', 'Romance', 'Horror', 'Animation']
+WORDS = ['Night', 'Storm', 'Kingdom', 'Shadow', 'River', 'Empire', 'Echo', 'Legend',
+         'Fire', 'Dream', 'Code', 'Hunter', 'City', 'Star', 'Road', 'Silence']
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Ananya', 'Rohan', 'Sneha',
+               'Arjun', 'Priya', 'Vikram', 'Nisha', 'Rahul', 'Kavya', 'Aditya', 'Pooja']
+LAST_NAMES = ['Sharma', 'Rao', 'Iyer', 'Reddy', 'Nair', 'Patel', 'Gupta', 'Kumar',
+              'Menon', 'Shetty', 'Das', 'Singh']
+SHOW_TIMES = ['09:30:00', '12:45:00', '16:00:00', '19:15:00', '22:30:00']
+SEATS_PER_SCREEN = [60, 80, 100, 120, 150]
+PAYMENT_MODES = ['UPI', 'Card', 'NetBanking', 'Wallet']
+
+
+def seat_name(n):
+    """Seat ``n`` (1-based) as InitializeSeatsForShows() names it: ten per row."""
+    return f"{chr(64 + (n + 9) // 10)}{(n - 1) % 10 + 1}"
+
+
+def _next_id(cursor, table, column):
+    cursor.execute(f"SELECT IFNULL(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def _insert(cursor, table, columns, rows):
+    placeholders = ', '.join(['%s'] * len(columns))
+    # executemany() folds simple INSERTs into one multi-row statement
+    cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+def generate(conn, scale='small', seed=42, start_date=None, chunk_size=5000, log=print):
+    """Add a synthetic dataset of the given ``scale`` to the database.
+
+    The same ``seed`` and ``start_date`` always produce the same rows.
+    Shows are spread over 30 days either side of ``start_date`` (today by
+    default). Seat maps come from InitializeSeatsForShows(); booked seats
+    are staged in a temporary table and marked with one UPDATE ... JOIN
+    per chunk, and SHOWS.Available_Seats is rebuilt with
+    ReconcileAvailableSeats() at the end. New rows get IDs above the
+    current maximum, so the sample data stays as it is.
+    """
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    start_date = start_date or datetime.date.today()
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    counts = {}
+
+    def done(table, count):
+        counts[table] = count
+        log(f"{table}: {count} rows ({time.perf_counter() - started:.1f}s)")
+
+    try:
+        # Theatres and screens
+        theatre_id = _next_id(cursor, 'THEATRE', 'Theatre_ID')
+        screen_id = _next_id(cursor, 'SCREEN', 'Screen_ID')
+        theatres, screens, screen_seats = [], [], {}
+        for t in range(theatre_id, theatre_id + sizes['theatres']):
+            city = rng.choice(CITIES)
+            theatres.append((t, f"{rng.choice(CHAINS)} {city} {t}", f"Mall {t}", city))
+            for number in range(1, sizes['screens_per_theatre'] + 1):
+                seats = rng.choice(SEATS_PER_SCREEN)
+                screens.append((screen_id, t, number, seats))
+                screen_seats[screen_id] = seats
+                screen_id += 1
+        _insert(cursor, 'THEATRE', ('Theatre_ID', 'Name', 'Location', 'City'), theatres)
+        _insert(cursor, 'SCREEN', ('Screen_ID', 'Theatre_ID', 'Screen_Number', 'Total_Seats'), screens)
+        conn.commit()
+        done('THEATRE', len(theatres))
+        done('SCREEN', len(screens))
+
+        # Movies
+        movie_id = _next_id(cursor, 'MOVIE', 'Movie_ID')
+        movies = [(m, f"{rng.choice(WORDS)} {rng.choice(WORDS)} {m}", rng.choice(LANGUAGES),
+                   rng.choice(GENRES), rng.randint(90, 180), round(rng.uniform(5.0, 9.5), 1))
+                  for m in range(movie_id, movie_id + sizes['movies'])]
+        for offset in range(0, len(movies), chunk_size):
+            _insert(cursor, 'MOVIE', ('Movie_ID', 'Title', 'Language', 'Genre', 'Duration', 'Rating'),
+                    movies[offset:offset + chunk_size])
+            conn.commit()
+        done('MOVIE', len(movies))
+
+        # Users
+        user_id = _next_id(cursor, 'USERS', 'User_ID')
+        first_user = user_id
+        for offset in range(0, sizes['users'], chunk_size):
+            users = []
+            for u in range(user_id + offset, user_id + min(offset + chunk_size, sizes['users'])):
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                users.append((u, name, f"user{u}@seed.example.com", f"9{u:09d}"[-10:], f"pass{u}"))
+            _insert(cursor, 'USERS', ('User_ID', 'Name', 'Email', 'Phone_No', 'Password'), users)
+            conn.commit()
+        done('USERS', sizes['users'])
+
+        # Shows, each chunk followed by its seat maps
+        show_id = _next_id(cursor, 'SHOWS', 'Show_ID')
+        first_show = show_id
+        screen_ids = list(screen_seats)
+        movie_ids = [m[0] for m in movies]
+        show_info = []   # (screen seats, price, date) per show, indexed from first_show
+        for offset in range(0, sizes['shows'], chunk_size):
+            shows = []
+            for s in range(show_id + offset, show_id + min(offset + chunk_size, sizes['shows'])):
+                screen = rng.choice(screen_ids)
+                price = rng.choice((150, 180, 200, 250, 300, 350))
+                show_date = start_date + datetime.timedelta(days=rng.randint(-30, 30))
+                shows.append((s, rng.choice(movie_ids), screen, rng.choice(SHOW_TIMES), show_date, price))
+                show_info.append((screen_seats[screen], price, show_date))
+            _insert(cursor, 'SHOWS', ('Show_ID', 'Movie_ID', 'Screen_ID', 'Show_Time', 'Show_Date', 'Price'),
+                    shows)
+            cursor.callproc('InitializeSeatsForShows', (shows[0][0], shows[-1][0]))
+            conn.commit()
+        last_show = first_show + sizes['shows'] - 1
+        done('SHOWS', sizes['shows'])
+        done('SEAT_RESERVATION', sum(info[0] for info in show_info))
+
+        # Bookings take the next free seats of a random show. Cancelled ones
+        # keep their row but not their seats.
+        cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS seed_booked_seats (
+                Show_ID INT NOT NULL,
+                Seat_Number VARCHAR(10) NOT NULL,
+                Booking_ID INT NOT NULL,
+                PRIMARY KEY (Show_ID, Seat_Number)
+            )
+        """)
+        booking_id = _next_id(cursor, 'BOOKING', 'Booking_ID')
+        next_seat = [1] * sizes['shows']
+        made = 0
+        while made < sizes['bookings']:
+            bookings, payments, booked = [], [], []
+            for _ in range(min(chunk_size, sizes['bookings'] - made)):
+                party = rng.choice((1, 2, 2, 2, 3, 4, 4, 5, 6))
+                index = rng.randrange(sizes['shows'])
+                seats, price, show_date = show_info[index]
+                if next_seat[index] + party - 1 > seats:
+                    continue
+                first_seat = next_seat[index]
+                next_seat[index] += party
+                names = [seat_name(n) for n in range(first_seat, first_seat + party)]
+                cancelled = rng.random() < 0.08
+                amount = price * party
+                bookings.append((booking_id, first_show + index, rng.randint(first_user, first_user + sizes['users'] - 1),
+                                 party, show_date - datetime.timedelta(days=rng.randint(0, 14)), amount,
+                                 'Cancelled' if cancelled else 'Confirmed'))
+                payments.append((booking_id, amount, rng.choice(PAYMENT_MODES),
+                                 'Refunded' if cancelled else 'Completed'))
+                if not cancelled:
+                    booked.extend((first_show + index, name, booking_id) for name in names)
+                booking_id += 1
+                made += 1
+            if not bookings:
+                # Every show we drew was full; stop rather than spin
+                break
+            _insert(cursor, 'BOOKING', ('Booking_ID', 'Show_ID', 'User_ID', 'Seats_Booked', 'Booking_Date',
+                                        'Total_Amount', 'Status'), bookings)
+            _insert(cursor, 'PAYMENT', ('Booking_ID', 'Amount', 'Payment_Mode', 'Payment_State'), payments)
+            if booked:
+                _insert(cursor, 'seed_booked_seats', ('Show_ID', 'Seat_Number', 'Booking_ID'), booked)
+                cursor.execute("""
+                    UPDATE SEAT_RESERVATION sr
+                    JOIN seed_booked_seats x ON x.Show_ID = sr.Show_ID AND x.Seat_Number = sr.Seat_Number
+                    SET sr.Is_Booked = TRUE, sr.Booking_ID = x.Booking_ID
+                """)
+                cursor.execute("DELETE FROM seed_booked_seats")
+            conn.commit()
+        done('BOOKING', made)
+
+        for from_id in range(first_show, last_show + 1, chunk_size):
+            cursor.callproc('ReconcileAvailableSeats', (from_id, min(from_id + chunk_size - 1, last_show)))
+            conn.commit()
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS seed_booked_seats")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    counts['seconds'] = round(time.perf_counter() - started, 1)
+    return counts
@@ -0,0 +1,153 @@
+from collections import namedtuple
+
+import mysql.connector
+from mysql.connector.errors import get_mysql_exception
+
+from db import TracedCursor
+
+# Sizes an IN list is padded up to, so a seat list of any length up to
+# the last one runs as one of a few prepared statements
+IN_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+Statement = namedtuple('Statement', 'name sql')
+
+# name -> SQL of every declared statement
+REGISTRY = {}
+
+
+def declare(name, sql):
+    """Register ``sql`` to run as a server-side prepared statement."""
+    if REGISTRY.get(name, sql) != sql:
+        raise ValueError(f"Statement '{name}' is already declared with other SQL")
+    REGISTRY[name] = sql
+    return Statement(name, sql)
+
+
+def declared(name):
+    """The statement declared as ``name``."""
+    return Statement(name, REGISTRY[name])
+
+
+class InListStatement:
+    """A statement with one variable-length ``IN ({in})`` list.
+
+    One statement is declared per IN_BUCKETS size; bind() pads a list of
+    values to the next size by repeating its last value, which leaves the
+    set of rows matched unchanged. Longer lists run as plain text.
+    """
+
+    def __init__(self, name, sql, buckets=IN_BUCKETS):
+        self.name = name
+        self.sql = sql
+        self.buckets = buckets
+        self._variants = {size: declare(f'{name}[{size}]', self.expand(size)) for size in buckets}
+
+    def expand(self, size):
+        """The SQL with ``size`` IN placeholders."""
+        return self.sql.replace('{in}', ','.join(['%s'] * size))
+
+    def bind(self, values):
+        """``(statement, padded values)`` for an IN list of ``values``."""
+        values = list(values)
+        if not values:
+            raise ValueError(f"Statement '{self.name}' needs at least one IN value")
+        for size in self.buckets:
+            if size >= len(values):
+                return self._variants[size], values + [values[-1]] * (size - len(values))
+        return Statement(None, self.expand(len(values))), values
+
+
+def _prepared_cursor(conn, statement, dictionary):
+    # One prepared cursor per statement, kept on the connection itself so
+    # the statements live exactly as long as its MySQL session: the pool
+    # never reconnects a connection, it closes it and opens a new one.
+    # mysql-connector re-prepares whenever a cursor sees a different SQL
+    # string, so each cursor only ever runs its one statement.
+    raw = getattr(conn, 'raw', conn)
+    try:
+        cursors = raw.prepared_cursors
+    except AttributeError:
+        cursors = raw.prepared_cursors = {}
+    key = (statement.name, dictionary)
+    cursor = cursors.get(key)
+    if cursor is None:
+        cursor = cursors[key] = raw.cursor(prepared=True, dictionary=dictionary)
+    return cursor
+
+
+def _forget(conn, statement, dictionary):
+    # After an error the statement is prepared afresh on next use, e.g.
+    # when the server lost it to a reconnect
+    cursor = getattr(getattr(conn, 'raw', conn), 'prepared_cursors', {}).pop((statement.name, dictionary), None)
+    if cursor is not None:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+
+def _rows(cursor):
+    return cursor.fetchall()
+
+
+def _rowcount(cursor):
+    return cursor.rowcount
+
+
+def _lastrowid(cursor):
+    return cursor.lastrowid
+
+
+def _run(conn, statement, params, dictionary, result):
+    # ``result(cursor)`` once the statement has run
+    if statement.name is None:
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            cursor.execute(statement.sql, params)
+            return result(cursor)
+        finally:
+            cursor.close()
+
+    cursor = _prepared_cursor(conn, statement, dictionary)
+    # Report to the pool's listeners like any other cursor of this connection
+    listeners = getattr(conn, '_listeners', None)
+    traced = TracedCursor(cursor, listeners) if listeners else cursor
+    try:
+        traced.execute(statement.sql, tuple(params))
+        # Statements with rows are only run through fetchall()/fetchone(),
+        # so the cursor never holds an unread result when used again
+        return result(cursor)
+    except mysql.connector.Error as err:
+        _forget(conn, statement, dictionary)
+        cause = err.__cause__
+        if err.errno == -1 and getattr(cause, 'errno', None):
+            # The C extension reports prepared statement errors without the
+            # server's error code; put it back so callers can still tell a
+            # deadlock (booking.RETRYABLE_ERRORS) from anything else
+            raise get_mysql_exception(cause.errno, cause.msg, cause.sqlstate) from cause
+        raise
+
+
+def fetchall(conn, statement, params=(), dictionary=False):
+    """Rows of a declared statement, prepared on ``conn`` on first use."""
+    return _run(conn, statement, params, dictionary, _rows)
+
+
+def fetchone(conn, statement, params=(), dictionary=False):
+    rows = _run(conn, statement, params, dictionary, _rows)
+    return rows[0] if rows else None
+
+
+def execute(conn, statement, params=()):
+    """Run a declared UPDATE/DELETE; returns the affected row count."""
+    return _run(conn, statement, params, False, _rowcount)
+
+
+def insert(conn, statement, params=()):
+    """Run a declared INSERT; returns the AUTO_INCREMENT id it generated."""
+    return _run(conn, statement, params, False, _lastrowid)
+
+
+def prepared_count(conn):
+    """Number of statements currently prepared on ``conn``."""
+    return len(getattr(getattr(conn, 'raw', conn), 'prepared_cursors', {}))